@@ -0,0 +1,262 @@
+#    This file contains the configuration for computing the detailed top stats in arcdps logs as parsed by Elite Insights.
+#    Copyright (C) 2024 John Long (Drevarr)
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import hashlib
+import json
+import os
+import pickle
+from typing import Optional
+from _version import VERSION
+from log_reader import get_log_name, split_log_path
+
+# Name of the cache directory created next to the logs
+cache_dir_name = ".top_stats_cache"
+cache_index_name = "index.json"
+cache_entry_ext = ".pickle"
+
+# Modules whose code shapes a parsed fight; editing any of them invalidates the cache
+parser_modules = ["parser_functions.py", "intervals.py", "tag_distance.py", "time_series.py", "top_k.py", "log_reader.py", "log_schema.py", "elite_iInsights_log_schema.json", "config.py"]
+
+
+def get_parser_version() -> str:
+	"""
+	Build the version string of the parser code used to key the cache.
+
+	The release version is combined with a hash of the parser modules so that local edits
+	invalidate the cache too. Frozen builds without the sources fall back to the release version.
+
+	Returns:
+		str: The parser version.
+	"""
+	source_hash = hashlib.sha256()
+	module_dir = os.path.dirname(os.path.abspath(__file__))
+	for module in parser_modules:
+		try:
+			with open(os.path.join(module_dir, module), "rb") as f:
+				source_hash.update(f.read())
+		except OSError:
+			return VERSION
+	return f"{VERSION}-{source_hash.hexdigest()[:16]}"
+
+def get_file_hash(file_path: str) -> str:
+	"""
+	Hash the contents of a file.
+
+	Args:
+		file_path (str): The path to the file.
+
+	Returns:
+		str: The sha256 hex digest of the file.
+	"""
+	file_hash = hashlib.sha256()
+	with open(file_path, "rb") as f:
+		for block in iter(lambda: f.read(1 << 20), b""):
+			file_hash.update(block)
+	return file_hash.hexdigest()
+
+def open_fight_cache(input_directory: str, options: dict, max_size_mb: int) -> dict:
+	"""
+	Open the parsed fight cache of an input directory, clearing it when the parser version changed.
+
+	Args:
+		input_directory (str): The directory containing the logs.
+		options (dict): Parse options that change a fight's output, e.g. fight_data_charts.
+		max_size_mb (int): The size cap of the cache in megabytes.
+
+	Returns:
+		dict: The cache state used by the other cache functions.
+	"""
+	cache_dir = os.path.join(input_directory, cache_dir_name)
+	os.makedirs(cache_dir, exist_ok=True)
+	parser_version = get_parser_version()
+
+	index = {}
+	index_path = os.path.join(cache_dir, cache_index_name)
+	if os.path.exists(index_path):
+		try:
+			with open(index_path, encoding="utf-8") as f:
+				index = json.load(f)
+		except (OSError, ValueError):
+			index = {}
+
+	if index.get("parser_version") != parser_version:
+		for filename in os.listdir(cache_dir):
+			if filename.endswith(cache_entry_ext):
+				os.remove(os.path.join(cache_dir, filename))
+		index = {"parser_version": parser_version, "files": {}, "headers": {}}
+
+	return {
+		"dir": cache_dir,
+		"index": index,
+		"options": json.dumps(options, sort_keys=True, default=str),
+		"max_size": max_size_mb * 1024 * 1024,
+		"hits": 0,
+		"misses": 0,
+	}
+
+def get_log_key(cache: dict, file_path: str) -> str:
+	"""
+	Get the content key of a log: the hash of its file, and its name for a log inside an archive.
+
+	The file hash is looked up by size and modification time first so unchanged logs
+	are not read again.
+
+	Args:
+		cache (dict): The cache state from open_fight_cache.
+		file_path (str): The path to the log file, or an archive member path.
+
+	Returns:
+		str: The key of the log.
+	"""
+	# logs inside an archive are keyed by the archive's hash and their name in it
+	source_path, member_name = split_log_path(file_path)
+	file_stat = os.stat(source_path)
+	file_key = os.path.abspath(source_path)
+	known = cache["index"]["files"].get(file_key)
+	if known and known[0] == file_stat.st_size and known[1] == file_stat.st_mtime_ns:
+		file_hash = known[2]
+	else:
+		file_hash = get_file_hash(source_path)
+		cache["index"]["files"][file_key] = [file_stat.st_size, file_stat.st_mtime_ns, file_hash]
+	if member_name is not None:
+		file_hash += "|" + member_name
+	return file_hash
+
+def get_cache_entry_path(cache: dict, file_path: str) -> str:
+	"""
+	Get the path of the cache entry for a log.
+
+	Entries are keyed by the log content, parser version and parse options only, so a log keeps
+	its entry when other logs are added before it and its fight number changes.
+
+	Args:
+		cache (dict): The cache state from open_fight_cache.
+		file_path (str): The path to the log file, or an archive member path.
+
+	Returns:
+		str: The path of the cache entry.
+	"""
+	entry_key = hashlib.sha256(
+		"|".join((get_log_key(cache, file_path), cache["index"]["parser_version"], cache["options"])).encode("utf-8")
+	).hexdigest()
+	return os.path.join(cache["dir"], entry_key + cache_entry_ext)
+
+def load_cached_header(cache: dict, file_path: str) -> Optional[dict]:
+	"""
+	Look up the header of a log read by an earlier run.
+
+	Args:
+		cache (dict): The cache state from open_fight_cache.
+		file_path (str): The path to the log file, or an archive member path.
+
+	Returns:
+		Optional[dict]: The header from read_log_header, or None when it was not cached.
+	"""
+	return cache["index"]["headers"].get(get_log_key(cache, file_path))
+
+def store_cached_header(cache: dict, file_path: str, header: dict) -> None:
+	"""
+	Store the header of a log in the cache index.
+
+	Args:
+		cache (dict): The cache state from open_fight_cache.
+		file_path (str): The path to the log file, or an archive member path.
+		header (dict): The header from read_log_header.
+	"""
+	cache["index"]["headers"][get_log_key(cache, file_path)] = header
+
+def load_cached_fight(cache: dict, file_path: str) -> Optional[dict]:
+	"""
+	Load the parsed partial of a fight from the cache.
+
+	The partial keeps the fight number it was parsed as, merge_fight_partial renumbers it.
+
+	Args:
+		cache (dict): The cache state from open_fight_cache.
+		file_path (str): The path to the log file.
+
+	Returns:
+		Optional[dict]: The cached partial, or None when the fight is not cached.
+	"""
+	entry_path = get_cache_entry_path(cache, file_path)
+	try:
+		with open(entry_path, "rb") as f:
+			partial = pickle.load(f)
+	except FileNotFoundError:
+		cache["misses"] += 1
+		return None
+	except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+		print(f"Discarding unreadable cache entry for {get_log_name(file_path)}")
+		os.remove(entry_path)
+		cache["misses"] += 1
+		return None
+
+	# touch the entry so eviction drops the least recently used fights first
+	os.utime(entry_path)
+	cache["hits"] += 1
+	return partial
+
+def store_cached_fight(cache: dict, file_path: str, partial: dict) -> None:
+	"""
+	Store the parsed partial of a fight in the cache.
+
+	Args:
+		cache (dict): The cache state from open_fight_cache.
+		file_path (str): The path to the log file.
+		partial (dict): The partial returned by parse_fight_partial, before it is merged.
+	"""
+	entry_path = get_cache_entry_path(cache, file_path)
+	temp_path = entry_path + ".tmp"
+	with open(temp_path, "wb") as f:
+		pickle.dump(partial, f, protocol=pickle.HIGHEST_PROTOCOL)
+	os.replace(temp_path, entry_path)
+
+def close_fight_cache(cache: dict) -> None:
+	"""
+	Save the cache index and evict the least recently used entries above the size cap.
+
+	Headers of logs whose file is gone are dropped from the index.
+
+	Args:
+		cache (dict): The cache state from open_fight_cache.
+	"""
+	index_files = cache["index"]["files"]
+	for file_key in list(index_files):
+		if not os.path.exists(file_key):
+			del index_files[file_key]
+	file_hashes = {known[2] for known in index_files.values()}
+	headers = cache["index"]["headers"]
+	for log_key in list(headers):
+		if log_key.split("|", 1)[0] not in file_hashes:
+			del headers[log_key]
+	with open(os.path.join(cache["dir"], cache_index_name), "w", encoding="utf-8") as f:
+		json.dump(cache["index"], f)
+
+	entries = []
+	for filename in os.listdir(cache["dir"]):
+		if filename.endswith(cache_entry_ext):
+			entry_stat = os.stat(os.path.join(cache["dir"], filename))
+			entries.append((entry_stat.st_mtime, entry_stat.st_size, filename))
+	entries.sort()
+	cache_size = sum(entry[1] for entry in entries)
+	for _, entry_size, filename in entries:
+		if cache_size <= cache["max_size"]:
+			break
+		os.remove(os.path.join(cache["dir"], filename))
+		cache_size -= entry_size
+
+	print(f"Fight cache: {cache['hits']} loaded, {cache['misses']} parsed")
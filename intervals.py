@@ -0,0 +1,150 @@
+#    This file contains the configuration for computing the detailed top stats in arcdps logs as parsed by Elite Insights.
+#    Copyright (C) 2024 John Long (Drevarr)
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import bisect
+import operator
+
+
+# Elite Insights buff timelines are lists of [time, value] state changes, the value holding until the next change.
+# Intervals are [start, end] lists, optionally followed by a payload such as the stack count, sorted by start
+# and not overlapping. Every function here is a single pass over its inputs, except state_at which is a
+# binary search of an index built once per timeline.
+
+def to_step_intervals(states: list, end: int) -> list:
+	"""
+	Convert a state timeline to one [start, end, value] interval per state.
+
+	Each state lasts until the next change, the last one until end. Empty intervals, such as
+	states changed twice on the same tick or starting after end, are left out.
+
+	Args:
+		states (list): The [time, value] state changes.
+		end (int): The end of the timeline, usually the fight duration.
+
+	Returns:
+		list: The [start, end, value] intervals.
+	"""
+	states = sorted(states, key=operator.itemgetter(0))
+	intervals = []
+	for (start, value), (stop, _) in zip(states, states[1:]):
+		if stop > end:
+			stop = end
+		if stop > start:
+			intervals.append([start, stop, value])
+	if states and end > states[-1][0]:
+		intervals.append([states[-1][0], end, states[-1][1]])
+	return intervals
+
+def to_active_intervals(states: list, end: int = None) -> list:
+	"""
+	Convert a state timeline to the [start, end] intervals during which its value is above 0.
+
+	Consecutive active states, such as a buff gaining stacks, are merged into one interval.
+
+	Args:
+		states (list): The [time, value] state changes.
+		end (int): The end of the timeline closing a state still active at the last change,
+			or None to leave that state out. Defaults to None.
+
+	Returns:
+		list: The [start, end] intervals.
+	"""
+	intervals = []
+	active_start = None
+	for time, value in sorted(states, key=operator.itemgetter(0)):
+		if value > 0:
+			if active_start is None:
+				active_start = time
+		elif active_start is not None:
+			if time > active_start:
+				intervals.append([active_start, time])
+			active_start = None
+	if active_start is not None and end is not None and end > active_start:
+		intervals.append([active_start, end])
+	return intervals
+
+def intersect(intervals: list, windows: list) -> list:
+	"""
+	Clip intervals to a set of windows, splitting the intervals that span several windows.
+
+	Args:
+		intervals (list): The intervals, their payload is kept.
+		windows (list): The [start, end] windows.
+
+	Returns:
+		list: The [start, end, *payload] parts of the intervals inside the windows, in time order.
+	"""
+	clipped = []
+	interval_index = 0
+	window_index = 0
+	while interval_index < len(intervals) and window_index < len(windows):
+		interval = intervals[interval_index]
+		window_start, window_end = windows[window_index][0], windows[window_index][1]
+		start = max(interval[0], window_start)
+		stop = min(interval[1], window_end)
+		if stop > start:
+			clipped.append([start, stop, *interval[2:]])
+		if interval[1] < window_end:
+			interval_index += 1
+		else:
+			window_index += 1
+	return clipped
+
+def overlap_length(intervals: list, windows: list):
+	"""
+	Get the total time two sets of intervals overlap.
+
+	Args:
+		intervals (list): The first intervals.
+		windows (list): The second intervals.
+
+	Returns:
+		The total length of the overlap.
+	"""
+	return sum(stop - start for start, stop, *_ in intersect(intervals, windows))
+
+def build_state_index(states: list) -> tuple:
+	"""
+	Index a state timeline for state_at lookups.
+
+	A state changed several times on the same tick keeps its last value.
+
+	Args:
+		states (list): The [time, value] state changes.
+
+	Returns:
+		tuple: The sorted change times and the value set at each of them.
+	"""
+	timeline = dict(states)
+	times = sorted(timeline)
+	return times, [timeline[time] for time in times]
+
+def state_at(state_index: tuple, time, default=None):
+	"""
+	Get the value of a state timeline at a given time in O(log n).
+
+	Args:
+		state_index (tuple): The index from build_state_index.
+		time: The time to look up.
+		default: The value before the first change. Defaults to None.
+
+	Returns:
+		The value set by the last change at or before time.
+	"""
+	times, values = state_index
+	position = bisect.bisect_right(times, time)
+	return values[position - 1] if position else default
@@ -0,0 +1,121 @@
+#    This file contains the configuration for computing the detailed top stats in arcdps logs as parsed by Elite Insights.
+#    Copyright (C) 2024 John Long (Drevarr)
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import json
+
+# Optional fast JSON libraries, used when installed
+try:
+	import orjson
+except ImportError:
+	orjson = None
+
+try:
+	import msgspec
+except ImportError:
+	msgspec = None
+
+available_backends = ["json"] + [name for name, module in (("msgspec", msgspec), ("orjson", orjson)) if module is not None]
+
+# Name of the active backend: "orjson", "msgspec" or "json" (standard library)
+json_backend = "orjson" if orjson else "msgspec" if msgspec else "json"
+
+
+def set_json_backend(name: str) -> str:
+	"""
+	Select the JSON backend used to read logs and write outputs.
+
+	Args:
+		name (str): "auto" for the fastest installed backend, or "orjson", "msgspec" or "json".
+
+	Returns:
+		str: The name of the active backend.
+	"""
+	global json_backend
+	if name == "auto":
+		json_backend = "orjson" if orjson else "msgspec" if msgspec else "json"
+	elif name in available_backends:
+		json_backend = name
+	else:
+		print(f"JSON backend {name} is not installed, using {json_backend}")
+	return json_backend
+
+def is_fast_backend() -> bool:
+	"""
+	Returns:
+		bool: Whether a native JSON library is active instead of the standard library.
+	"""
+	return json_backend != "json"
+
+def loads(data):
+	"""
+	Decode a JSON document with the active backend.
+
+	Args:
+		data (str | bytes): The JSON document.
+
+	Returns:
+		The decoded document.
+	"""
+	if json_backend == "orjson":
+		return orjson.loads(data)
+	if json_backend == "msgspec":
+		return msgspec.json.decode(data)
+	return json.loads(data)
+
+def dumps(obj, indent: int = 4, sort_keys: bool = False, compact: bool = False) -> bytes:
+	"""
+	Encode an object to UTF-8 JSON with the active backend.
+
+	Non string dictionary keys are converted to strings like the standard library does.
+	orjson only supports an indent of 2, the other backends honour indent.
+
+	Args:
+		obj: The object to encode.
+		indent (int): The indent of the pretty printed output. Defaults to 4.
+		sort_keys (bool): Whether to sort dictionary keys. Defaults to False.
+		compact (bool): Whether to write without any whitespace. Defaults to False.
+
+	Returns:
+		bytes: The encoded JSON.
+	"""
+	if json_backend == "orjson":
+		option = orjson.OPT_NON_STR_KEYS
+		if sort_keys:
+			option |= orjson.OPT_SORT_KEYS
+		if not compact:
+			option |= orjson.OPT_INDENT_2
+		return orjson.dumps(obj, option=option)
+	if json_backend == "msgspec":
+		encoded = msgspec.json.encode(obj, order="sorted" if sort_keys else None)
+		return encoded if compact else msgspec.json.format(encoded, indent=indent)
+	if compact:
+		return json.dumps(obj, sort_keys=sort_keys, separators=(",", ":")).encode("utf-8")
+	return json.dumps(obj, indent=indent, sort_keys=sort_keys).encode("utf-8")
+
+def dump_to_file(obj, file_path: str, indent: int = 4, sort_keys: bool = False, compact: bool = False) -> None:
+	"""
+	Write an object to a JSON file with the active backend.
+
+	Args:
+		obj: The object to encode.
+		file_path (str): The path of the output file.
+		indent (int): The indent of the pretty printed output. Defaults to 4.
+		sort_keys (bool): Whether to sort dictionary keys. Defaults to False.
+		compact (bool): Whether to write without any whitespace. Defaults to False.
+	"""
+	with open(file_path, 'wb') as outfile:
+		outfile.write(dumps(obj, indent=indent, sort_keys=sort_keys, compact=compact))
@@ -0,0 +1,210 @@
+#    This file contains the configuration for computing the detailed top stats in arcdps logs as parsed by Elite Insights.
+#    Copyright (C) 2024 John Long (Drevarr)
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import datetime
+import multiprocessing
+import tarfile
+import zipfile
+from typing import Optional
+from fight_cache import load_cached_header, store_cached_header
+from log_reader import extracted_archives, read_log_header, set_extracted_archives
+from log_schema import LogValidationError
+
+# Format of timeStart and timeEnd in Elite Insights logs, e.g. 2024-05-04 20:31:10 +02:00
+log_time_format = "%Y-%m-%d %H:%M:%S %z"
+# Formats accepted for the start and end of the date window
+date_bound_formats = ["%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d"]
+
+
+def parse_log_time(value) -> Optional[datetime.datetime]:
+	"""
+	Parse a timeStart or timeEnd value of a log.
+
+	Args:
+		value: The value found in the log header.
+
+	Returns:
+		Optional[datetime.datetime]: The time with the recorder's UTC offset, or None when missing or malformed.
+	"""
+	if not isinstance(value, str):
+		return None
+	try:
+		return datetime.datetime.strptime(value, log_time_format)
+	except ValueError:
+		return None
+
+def parse_date_bound(value: str, end: bool = False) -> Optional[datetime.datetime]:
+	"""
+	Parse the start or end of the date window.
+
+	Args:
+		value (str): A date (YYYY-MM-DD) or date and time (YYYY-MM-DD HH:MM[:SS]), empty for no bound.
+		end (bool): Whether this is the end of the window, a bare date then includes the whole day. Defaults to False.
+
+	Returns:
+		Optional[datetime.datetime]: The bound in the recorder's local time, or None when empty.
+
+	Raises:
+		ValueError: When the value is not in one of the date_bound_formats.
+	"""
+	value = (value or "").strip()
+	if not value:
+		return None
+	for date_format in date_bound_formats:
+		try:
+			bound = datetime.datetime.strptime(value, date_format)
+		except ValueError:
+			continue
+		if end and date_format == "%Y-%m-%d":
+			bound += datetime.timedelta(days=1) - datetime.timedelta(microseconds=1)
+		return bound
+	raise ValueError(f"Invalid date {value}, expected YYYY-MM-DD or YYYY-MM-DD HH:MM")
+
+def scan_log_header(log_file: tuple) -> tuple:
+	"""
+	Read the header of one log, for use with Pool.imap.
+
+	Args:
+		log_file (tuple): The log name and log path.
+
+	Returns:
+		tuple: The log name, log path and header, or the error message instead of the header when the log is unreadable.
+	"""
+	log_name, log_path = log_file
+	try:
+		return log_name, log_path, read_log_header(log_path)
+	except (OSError, EOFError, ValueError, LogValidationError, tarfile.TarError, zipfile.BadZipFile) as error:
+		return log_name, log_path, str(error) or type(error).__name__
+
+def scan_log_headers(log_files: list, workers: int = 1, cache: Optional[dict] = None) -> list:
+	"""
+	Read the headers of a list of logs, in worker processes when workers > 1.
+
+	With a fight cache, the headers read by earlier runs are taken from its index and
+	only the other logs are read, then added to it.
+
+	Args:
+		log_files (list): (log name, log path) for each log.
+		workers (int): The number of worker processes. Defaults to 1.
+		cache (Optional[dict]): The fight cache from open_fight_cache, None to read every header. Defaults to None.
+
+	Returns:
+		list: (log name, log path, header or error message) for each log, in the given order.
+	"""
+	headers = {}
+	if cache is not None:
+		for log_name, log_path in log_files:
+			try:
+				header = load_cached_header(cache, log_path)
+			except OSError:
+				continue
+			if header is not None:
+				headers[log_path] = (log_name, log_path, header)
+
+	unread_logs = [log_file for log_file in log_files if log_file[1] not in headers]
+	if workers > 1 and len(unread_logs) > 1:
+		with multiprocessing.Pool(min(workers, len(unread_logs)), initializer=set_extracted_archives, initargs=(extracted_archives,)) as pool:
+			scanned_logs = list(pool.imap(scan_log_header, unread_logs))
+	else:
+		scanned_logs = [scan_log_header(log_file) for log_file in unread_logs]
+	for log_name, log_path, header in scanned_logs:
+		headers[log_path] = (log_name, log_path, header)
+		if cache is not None and isinstance(header, dict):
+			store_cached_header(cache, log_path, header)
+
+	return [headers[log_path] for _, log_path in log_files]
+
+def has_log_filters(log_filters: dict) -> bool:
+	"""
+	Returns:
+		bool: Whether any of the log filters of plan_log_files is set.
+	"""
+	return any(log_filters.get(name) for name in ("min_fight_duration", "min_squad_size", "date_start", "date_end"))
+
+def plan_log_files(log_files: list, log_filters: dict, workers: int = 1, cache: Optional[dict] = None) -> list:
+	"""
+	Order logs by fight start time and drop the fights excluded by the log filters.
+
+	Only the log headers are read, so skipped fights never pay the full parse. Logs whose header
+	cannot be read are skipped with a warning, logs without a start time keep their name order
+	ahead of the timed fights. Without any filter no header is read and the logs keep their name
+	order, which Elite Insights starts with the fight time.
+
+	Args:
+		log_files (list): (log name, log path) for each log, in name order.
+		log_filters (dict): The filters of the run:
+			min_fight_duration: the minimum fight duration in seconds, 0 to keep all.
+			min_squad_size: the minimum number of squad players, 0 to keep all.
+			date_start / date_end: the date window in the recorder's local time, empty for no bound.
+		workers (int): The number of worker processes reading headers. Defaults to 1.
+		cache (Optional[dict]): The fight cache from open_fight_cache, keeping the headers
+			between runs. Defaults to None.
+
+	Returns:
+		list: (log name, log path) for each log to parse, in fight order.
+	"""
+	if not has_log_filters(log_filters):
+		return list(log_files)
+
+	min_duration_ms = log_filters.get("min_fight_duration", 0) * 1000
+	min_squad_size = log_filters.get("min_squad_size", 0)
+	date_start = parse_date_bound(log_filters.get("date_start", ""))
+	date_end = parse_date_bound(log_filters.get("date_end", ""), end=True)
+
+	planned_logs = []
+	skipped = {"unreadable": 0, "short": 0, "small": 0, "date": 0}
+	for log_name, log_path, header in scan_log_headers(log_files, workers, cache):
+		if not isinstance(header, dict):
+			print(f"Skipping {log_name}: unreadable log header ({header})")
+			skipped["unreadable"] += 1
+			continue
+
+		duration_ms = header["durationMS"]
+		if min_duration_ms and isinstance(duration_ms, (int, float)) and duration_ms < min_duration_ms:
+			skipped["short"] += 1
+			continue
+		if min_squad_size and header["playerCount"] < min_squad_size:
+			skipped["small"] += 1
+			continue
+
+		start_time = parse_log_time(header["timeStart"]) or parse_log_time(header["timeEnd"])
+		if start_time is not None:
+			# the date window is compared to the recorder's clock, like the fight dates shown in the summary
+			local_start = start_time.replace(tzinfo=None)
+			if (date_start and local_start < date_start) or (date_end and local_start > date_end):
+				skipped["date"] += 1
+				continue
+		elif date_start or date_end:
+			skipped["date"] += 1
+			continue
+
+		sort_key = (1, start_time.astimezone(datetime.timezone.utc), log_name) if start_time else (0, None, log_name)
+		planned_logs.append((sort_key, log_name, log_path))
+
+	planned_logs.sort(key=lambda planned_log: planned_log[0])
+
+	skipped_reasons = [
+		f"{count} {reason}" for count, reason in (
+			(skipped["short"], f"shorter than {min_duration_ms / 1000:g}s"),
+			(skipped["small"], f"with fewer than {min_squad_size} squad players"),
+			(skipped["date"], "outside the date window"),
+			(skipped["unreadable"], "unreadable"),
+		) if count
+	]
+	if skipped_reasons:
+		print(f"Planned {len(planned_logs)} of {len(log_files)} logs, skipped " + ", ".join(skipped_reasons))
+	return [(log_name, log_path) for _, log_name, log_path in planned_logs]
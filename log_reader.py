@@ -0,0 +1,881 @@
+#    This file contains the configuration for computing the detailed top stats in arcdps logs as parsed by Elite Insights.
+#    Copyright (C) 2024 John Long (Drevarr)
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import atexit
+import codecs
+import gzip
+import json
+import json_backend
+import os
+import re
+import run_profiler
+import shutil
+import tarfile
+import tempfile
+import time
+import zipfile
+from contextlib import ExitStack
+from json.decoder import scanstring
+from log_schema import LogRecord, LogValidationError, PlayerRecord, TargetRecord
+
+# Optional zstandard support for .zst logs and archives
+try:
+	import zstandard
+except ImportError:
+	zstandard = None
+
+# Log files, plain or compressed, and the archives logs are read from
+log_exts = (".json", ".gz", ".zst")
+archive_exts = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz", ".tar.zst", ".tzst")
+# Joins an archive path and the name of a log inside it
+archive_member_sep = "::"
+# Logs are read and decoded in chunks of this many bytes
+read_chunk_size = 1 << 20
+# A tar member can only be reached by reading the archive from its start, so the logs of a tar archive are
+# extracted to a temporary directory in the single pass that lists them: archive path -> "signature"
+# (size, mtime_ns) of the archive, temporary "directory" and extracted file of each log "members" name
+extracted_archives = {}
+# Whether logs are decoded whole by a native JSON backend and then trimmed, instead of streamed
+# through the projected decoder. Faster, but the whole document is held in memory while it is trimmed
+native_log_decoding = False
+
+# Keys of player, target and minion objects that the parser never reads. Most of them are
+# per second or per target series, so skipping them avoids the bulk of the decoded objects.
+# set_kept_actor_keys decodes some of them again when a setting reads them.
+default_actor_skip_keys = frozenset({
+	"conditionDamage1S", "breakbarDamage1S",
+	"targetConditionDamage1S", "targetBreakbarDamage1S",
+	"powerDamageTaken1S", "conditionDamageTaken1S", "breakbarDamageTaken1S",
+	"barrierPercents", "breakbarPercents",
+	"conditionsStates", "boonsStates", "activeCombatMinions", "commanderTagStates",
+	"buffVolumes", "buffVolumesActive", "selfBuffVolumes", "selfBuffVolumesActive",
+	"groupBuffVolumes", "groupBuffVolumesActive", "offGroupBuffVolumes", "offGroupBuffVolumesActive",
+	"squadBuffVolumes", "squadBuffVolumesActive", "offGroupBuffs", "offGroupBuffsActive",
+	"deathRecap", "consumables", "weapons",
+})
+actor_skip_keys = set(default_actor_skip_keys)
+
+# Projection of an actor object: every key except actor_skip_keys, minions filtered the same way
+actor_projection = {"keep": None, "skip": actor_skip_keys, "fields": {}}
+actor_projection["fields"]["minions"] = {"items": actor_projection}
+
+# Projection of an Elite Insights log: only the top level keys parse_file reads are decoded,
+# and the log, its players and its targets are built as validated schema records
+log_projection = {
+	"keep": {
+		"fightName", "timeEnd", "duration", "durationMS", "uploadLinks", "usedExtensions",
+		"combatReplayMetaData", "players", "targets", "skillMap", "buffMap", "mechanics",
+		"damageModMap", "personalBuffs", "personalDamageMods",
+	},
+	"skip": set(),
+	"fields": {
+		"players": {"items": dict(actor_projection, record=PlayerRecord)},
+		"targets": {"items": dict(actor_projection, record=TargetRecord)},
+	},
+	"record": LogRecord,
+}
+
+# Projection of the header fields used to plan a run. Players are reduced to their squad flag,
+# targets are stepped over, and decoding stops once every kept key has been read
+log_header_projection = {
+	"keep": {"fightName", "timeStart", "timeEnd", "durationMS", "recordedBy", "players"},
+	"skip": set(),
+	"fields": {"players": {"items": {"keep": {"notInSquad"}, "skip": set(), "fields": {}}}},
+	"partial": True,
+}
+log_header_fields = ["fightName", "timeStart", "timeEnd", "durationMS", "recordedBy"]
+
+json_decoder = json.JSONDecoder()
+whitespace_re = re.compile(r'[ \t\n\r]*')
+structural_re = re.compile(r'["\[\]{}]')
+string_re = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+scalar_re = re.compile(r'[^,\]}\s]*')
+# a container holding only scalars and strings, and a comma separated run of them
+flat_container_pattern = r'[\[{](?:[^\[\]{}"]++|"[^"\\]*+(?:\\.[^"\\]*+)*+")*+[\]}]'
+flat_container_re = re.compile(flat_container_pattern, re.DOTALL)
+flat_run_re = re.compile(flat_container_pattern + r'(?:[ \t\n\r]*,[ \t\n\r]*' + flat_container_pattern + r')*', re.DOTALL)
+
+
+def is_log_archive(filename: str) -> bool:
+	"""
+	Returns:
+		bool: Whether the file is an archive of logs (.zip, .tar, compressed .tar).
+	"""
+	return filename.lower().endswith(archive_exts)
+
+def is_log_filename(filename: str) -> bool:
+	"""
+	Returns:
+		bool: Whether the file name is an Elite Insights log, plain or compressed.
+	"""
+	basename = os.path.basename(filename)
+	if "Drag_and_Drop_" in basename or "TW5_top_stats_" in basename:
+		return False
+	return basename.lower().endswith(log_exts) and not is_log_archive(basename)
+
+def split_log_path(log_path: str) -> tuple:
+	"""
+	Split a log path into the file on disk and the archive member, if any.
+
+	Args:
+		log_path (str): A log file path, or an archive path and member joined by archive_member_sep.
+
+	Returns:
+		tuple: The path on disk and the member name, or None for a plain log file.
+	"""
+	if archive_member_sep in log_path:
+		archive_path, member_name = log_path.split(archive_member_sep, 1)
+		return archive_path, member_name
+	return log_path, None
+
+def get_log_name(log_path: str) -> str:
+	"""
+	Returns:
+		str: The file name of a log, without the directory or archive it is stored in.
+	"""
+	file_path, member_name = split_log_path(log_path)
+	return os.path.basename(member_name if member_name is not None else file_path)
+
+def list_archive_logs(archive_path: str) -> list:
+	"""
+	List the logs stored in an archive. Zip members are read in place, the logs of tar archives
+	are extracted once, see extract_tar_logs.
+
+	Args:
+		archive_path (str): The path to the archive.
+
+	Returns:
+		list: (log name, log path) for each log in the archive, in archive order.
+	"""
+	lower_path = archive_path.lower()
+	if lower_path.endswith(".zip"):
+		with zipfile.ZipFile(archive_path) as archive:
+			member_names = [member.filename for member in archive.infolist() if not member.is_dir()]
+	else:
+		member_names = list(extract_tar_logs(archive_path))
+
+	return [
+		(os.path.basename(member_name), archive_path + archive_member_sep + member_name)
+		for member_name in member_names
+		if is_log_filename(member_name)
+	]
+
+def list_log_files(input_directory: str) -> list:
+	"""
+	List the logs of an input directory, including the logs stored in archives.
+
+	Logs are ordered by file name, which Elite Insights starts with the fight time. When the
+	same log is both loose and inside an archive, or in several archives, it is listed once.
+
+	Args:
+		input_directory (str): The directory containing the logs.
+
+	Returns:
+		list: (log name, log path) for each log, in fight order.
+	"""
+	log_files = {}
+	for filename in sorted(os.listdir(input_directory)):
+		file_path = "".join((input_directory, "/", filename))
+		if is_log_archive(filename):
+			try:
+				archive_logs = list_archive_logs(file_path)
+			except (OSError, RuntimeError, tarfile.TarError, zipfile.BadZipFile) as error:
+				print(f"Skipping archive {filename}: {error}")
+				continue
+			for log_name, log_path in archive_logs:
+				log_files.setdefault(log_name, log_path)
+		elif is_log_filename(filename):
+			log_files.setdefault(filename, file_path)
+	return sorted(log_files.items())
+
+def snapshot_log_files(input_directory: str) -> dict:
+	"""
+	Take the size and modification time of the logs and log archives of an input directory.
+
+	Args:
+		input_directory (str): The directory containing the logs.
+
+	Returns:
+		dict: (size, mtime_ns) keyed by file name.
+	"""
+	snapshot = {}
+	with os.scandir(input_directory) as entries:
+		for entry in entries:
+			if (is_log_archive(entry.name) or is_log_filename(entry.name)) and entry.is_file():
+				try:
+					entry_stat = entry.stat()
+				except OSError:
+					continue
+				snapshot[entry.name] = (entry_stat.st_size, entry_stat.st_mtime_ns)
+	return snapshot
+
+def wait_for_new_logs(input_directory: str, known: dict, poll_seconds: float, settle_seconds: float) -> dict:
+	"""
+	Block until logs are added to or changed in an input directory and have finished being written.
+
+	Elite Insights and archive tools write files in several steps, so a new or changed file is only
+	reported once its size and modification time have stayed the same for settle_seconds.
+
+	Args:
+		input_directory (str): The directory containing the logs.
+		known (dict): The snapshot from snapshot_log_files the logs were last read with.
+		poll_seconds (float): The delay between directory scans.
+		settle_seconds (float): How long new files must stay unchanged.
+
+	Returns:
+		dict: The snapshot of the directory once the new files have settled.
+	"""
+	settled_since = None
+	pending = None
+	while True:
+		time.sleep(poll_seconds)
+		snapshot = snapshot_log_files(input_directory)
+		changed = {name: signature for name, signature in snapshot.items() if known.get(name) != signature}
+		if not changed:
+			settled_since = None
+			pending = None
+			continue
+		if changed != pending:
+			pending = changed
+			settled_since = time.monotonic()
+			print(f"Found {len(changed)} new or changed log files, waiting for them to be written")
+		elif time.monotonic() - settled_since >= settle_seconds:
+			return snapshot
+
+def open_tar_archive(archive_path: str, stack: ExitStack) -> tarfile.TarFile:
+	"""
+	Open a tar archive for sequential reading, decompressing .tar.zst archives on the fly.
+
+	Args:
+		archive_path (str): The path to the archive.
+		stack (ExitStack): Closes the archive and its streams.
+
+	Returns:
+		tarfile.TarFile: The archive, opened in stream mode.
+	"""
+	if archive_path.lower().endswith((".tar.zst", ".tzst")):
+		raw_stream = stack.enter_context(open(archive_path, 'rb'))
+		return stack.enter_context(tarfile.open(fileobj=open_zstd_stream(raw_stream), mode="r|"))
+	return stack.enter_context(tarfile.open(archive_path, mode="r|*"))
+
+def extract_tar_logs(archive_path: str) -> dict:
+	"""
+	Extract the logs of a tar archive to a temporary directory, reading the archive once.
+
+	The extraction is kept in extracted_archives and reused until the archive changes.
+	Members are written under generated names, never under their path in the archive.
+
+	Args:
+		archive_path (str): The path to the archive.
+
+	Returns:
+		dict: The path of the extracted file keyed by member name, in archive order.
+	"""
+	archive_stat = os.stat(archive_path)
+	signature = (archive_stat.st_size, archive_stat.st_mtime_ns)
+	extracted = extracted_archives.get(archive_path)
+	if extracted is not None:
+		if extracted["signature"] == signature:
+			return extracted["members"]
+		shutil.rmtree(extracted["directory"], ignore_errors=True)
+		del extracted_archives[archive_path]
+
+	if not extracted_archives:
+		atexit.register(remove_extracted_archives)
+	directory = tempfile.mkdtemp(prefix="tw5_logs_")
+	members = {}
+	try:
+		with ExitStack() as stack:
+			archive = open_tar_archive(archive_path, stack)
+			for member in archive:
+				if not member.isfile() or not is_log_filename(member.name) or member.name in members:
+					continue
+				member_path = os.path.join(directory, f"{len(members)}_{os.path.basename(member.name)}")
+				with archive.extractfile(member) as member_stream, open(member_path, 'wb') as member_file:
+					shutil.copyfileobj(member_stream, member_file, read_chunk_size)
+				members[member.name] = member_path
+	except BaseException:
+		shutil.rmtree(directory, ignore_errors=True)
+		raise
+	extracted_archives[archive_path] = {"signature": signature, "directory": directory, "members": members}
+	return members
+
+def set_extracted_archives(archives: dict) -> None:
+	"""
+	Use the tar archives extracted by another process, for worker processes that do not inherit them.
+
+	Args:
+		archives (dict): The extracted_archives of the main process.
+	"""
+	archives = dict(archives)
+	extracted_archives.clear()
+	extracted_archives.update(archives)
+
+def remove_extracted_archives() -> None:
+	"""
+	Delete the temporary directories of the extracted tar archives.
+	"""
+	for extracted in extracted_archives.values():
+		shutil.rmtree(extracted["directory"], ignore_errors=True)
+	extracted_archives.clear()
+
+def open_zstd_stream(raw_stream):
+	"""
+	Wrap a zstandard compressed stream in a streaming decompressor.
+
+	Args:
+		raw_stream: The compressed binary stream.
+
+	Returns:
+		The decompressed binary stream.
+	"""
+	if zstandard is None:
+		raise RuntimeError("Reading .zst files needs the zstandard package: pip install zstandard")
+	return zstandard.ZstdDecompressor().stream_reader(raw_stream)
+
+def set_kept_actor_keys(keys) -> set:
+	"""
+	Decode actor keys that are skipped by default, e.g. the damage series of a configured debuff.
+
+	The skip set is shared by every actor projection, so it is updated in place.
+
+	Args:
+		keys: The actor keys to decode, the others in default_actor_skip_keys stay skipped.
+
+	Returns:
+		set: The actor keys now skipped.
+	"""
+	actor_skip_keys.clear()
+	actor_skip_keys.update(default_actor_skip_keys.difference(keys))
+	return actor_skip_keys
+
+def set_native_log_decoding(enabled: bool) -> bool:
+	"""
+	Select whether logs are decoded whole by the native JSON backend, see native_log_decoding.
+
+	Args:
+		enabled (bool): Whether to decode logs natively when a native backend is active.
+
+	Returns:
+		bool: Whether logs are decoded natively, False when the JSON backend is the standard library.
+	"""
+	global native_log_decoding
+	native_log_decoding = enabled
+	return native_log_decoding and json_backend.is_fast_backend()
+
+def read_stream(stream, size_hint: int = 0) -> bytearray:
+	"""
+	Read a binary stream to the end into a single buffer.
+
+	When the decompressed size is known the buffer is allocated once and filled in place,
+	so the data is never held twice.
+
+	Args:
+		stream: The binary stream.
+		size_hint (int): The expected size of the data, 0 when unknown. Defaults to 0.
+
+	Returns:
+		bytearray: The data.
+	"""
+	if size_hint > 0:
+		buffer = bytearray(size_hint)
+		view = memoryview(buffer)
+		filled = 0
+		while filled < size_hint:
+			count = stream.readinto(view[filled:])
+			if not count:
+				break
+			filled += count
+		view.release()
+		if filled < size_hint:
+			del buffer[filled:]
+	else:
+		buffer = bytearray()
+	while True:
+		chunk = stream.read(read_chunk_size)
+		if not chunk:
+			return buffer
+		buffer += chunk
+
+def get_gzip_size_hint(raw_file) -> int:
+	"""
+	Read the uncompressed size stored in the trailer of a gzip file.
+
+	Args:
+		raw_file: The compressed file, opened in binary mode and left at its start.
+
+	Returns:
+		int: The uncompressed size modulo 4 GiB, or 0 when it cannot be read.
+	"""
+	try:
+		raw_file.seek(-4, os.SEEK_END)
+		size_hint = int.from_bytes(raw_file.read(4), "little")
+		raw_file.seek(0)
+		return size_hint
+	except OSError:
+		return 0
+
+def open_compressed_log(raw_stream, name: str, stack: ExitStack):
+	"""
+	Wrap the stream of a log in a decompressor for .gz and .zst logs.
+
+	Args:
+		raw_stream: The binary stream of the log file or archive member.
+		name (str): The log file name, used to detect compression.
+		stack (ExitStack): Closes the decompressor.
+
+	Returns:
+		The binary stream of the UTF-8 JSON of the log.
+	"""
+	lower_name = name.lower()
+	if lower_name.endswith(".gz"):
+		return stack.enter_context(gzip.GzipFile(fileobj=raw_stream, mode="rb"))
+	if lower_name.endswith(".zst"):
+		return open_zstd_stream(raw_stream)
+	return raw_stream
+
+def open_log_stream(file_path: str, stack: ExitStack) -> tuple:
+	"""
+	Open the JSON of an Elite Insights log as a binary stream.
+
+	Compressed logs (.gz, .zst) and logs inside archives (.zip, .tar, compressed .tar) are
+	decompressed while they are read, without extracting anything to disk.
+
+	Args:
+		file_path (str): The path to the log file, or an archive member path from list_archive_logs.
+		stack (ExitStack): Closes the log and its archive.
+
+	Returns:
+		tuple: The binary stream of the UTF-8 JSON and its size, 0 when unknown.
+	"""
+	archive_path, member_name = split_log_path(file_path)
+	if member_name is None:
+		raw_file = stack.enter_context(open(file_path, 'rb'))
+		if file_path.lower().endswith(".gz"):
+			size_hint = get_gzip_size_hint(raw_file)
+		elif file_path.lower().endswith(".zst"):
+			size_hint = 0
+		else:
+			size_hint = os.fstat(raw_file.fileno()).st_size
+		return open_compressed_log(raw_file, file_path, stack), size_hint
+
+	# members are read straight from the archive, only plain members have a known size
+	plain_member = not member_name.lower().endswith((".gz", ".zst"))
+	if archive_path.lower().endswith(".zip"):
+		archive = stack.enter_context(zipfile.ZipFile(archive_path))
+		member = archive.getinfo(member_name)
+		raw_stream = stack.enter_context(archive.open(member))
+		return open_compressed_log(raw_stream, member_name, stack), member.file_size if plain_member else 0
+
+	extracted = extracted_archives.get(archive_path)
+	if extracted is not None and member_name in extracted["members"]:
+		raw_file = stack.enter_context(open(extracted["members"][member_name], 'rb'))
+		return open_compressed_log(raw_file, member_name, stack), os.fstat(raw_file.fileno()).st_size if plain_member else 0
+
+	# an archive that was not listed by this process is scanned for the member
+	archive = open_tar_archive(archive_path, stack)
+	for member in archive:
+		if member.name == member_name:
+			return open_compressed_log(archive.extractfile(member), member_name, stack), member.size if plain_member else 0
+	raise FileNotFoundError(f"{member_name} not found in {archive_path}")
+
+def read_log_bytes(file_path: str) -> bytearray:
+	"""
+	Read the whole raw JSON of an Elite Insights log.
+
+	Args:
+		file_path (str): The path to the log file, or an archive member path from list_archive_logs.
+
+	Returns:
+		bytearray: The UTF-8 JSON of the log.
+	"""
+	with ExitStack() as stack:
+		stream, size_hint = open_log_stream(file_path, stack)
+		return read_stream(stream, size_hint)
+
+def load_log_json(file_path: str, projection: dict = log_projection) -> dict:
+	"""
+	Decode an Elite Insights log, keeping only the keys selected by the projection.
+
+	The projected decoder streams the log and skips the unused keys without building them.
+	With native_log_decoding and a native JSON backend, the whole log is decoded at native
+	speed and then trimmed instead, which holds the whole document in memory.
+
+	Args:
+		file_path (str): The path to the log file.
+		projection (dict): The keys to decode, see decode_projected. Defaults to log_projection.
+
+	Returns:
+		dict: The decoded log.
+
+	Raises:
+		LogValidationError: When the log is missing a field the parser needs or a field has the wrong type.
+	"""
+	try:
+		if native_log_decoding and json_backend.is_fast_backend():
+			log_bytes = read_log_bytes(file_path)
+			run_profiler.add_count("log_bytes", len(log_bytes))
+			return project_decoded(json_backend.loads(log_bytes), projection)
+		with ExitStack() as stack:
+			source = JsonSource(open_log_stream(file_path, stack)[0])
+			log_json = decode_source(source, projection)
+		run_profiler.add_count("log_bytes", source.bytes_read)
+		return log_json
+	except LogValidationError as error:
+		raise LogValidationError(f"{os.path.basename(file_path)}: {error}") from None
+
+def read_log_header(file_path: str) -> dict:
+	"""
+	Read the header of an Elite Insights log without decoding its players, targets or series.
+
+	The log is streamed through the projected decoder, which stops reading as soon as the
+	header fields and the players' squad flags are decoded.
+
+	Args:
+		file_path (str): The path to the log file, or an archive member path from list_archive_logs.
+
+	Returns:
+		dict: The log_header_fields found in the log, None for missing ones, and playerCount,
+			the number of squad players.
+	"""
+	with ExitStack() as stack:
+		source = JsonSource(open_log_stream(file_path, stack)[0])
+		header, _ = decode_value(source, skip_whitespace(source, 0), log_header_projection)
+	players = header.get("players") or []
+	log_header = {field: header.get(field) for field in log_header_fields}
+	log_header["playerCount"] = sum(1 for player in players if not player.get("notInSquad", False))
+	return log_header
+
+def project_decoded(value, projection: dict):
+	"""
+	Trim an already decoded JSON value to the keys selected by the projection.
+
+	Args:
+		value: The decoded value.
+		projection (dict): The projection of the value, see decode_projected.
+
+	Returns:
+		The trimmed value.
+	"""
+	if projection is None:
+		return value
+	if "items" in projection:
+		if not isinstance(value, list):
+			return value
+		return [project_decoded(item, projection["items"]) for item in value]
+	if not isinstance(value, dict):
+		return value
+	keep = projection.get("keep")
+	skip = projection.get("skip", ())
+	fields = projection.get("fields", {})
+	obj = {
+		key: project_decoded(item, fields.get(key))
+		for key, item in value.items()
+		if (keep is None or key in keep) and key not in skip
+	}
+	if "record" in projection:
+		return projection["record"].from_dict(obj)
+	return obj
+
+
+class JsonSource:
+	"""
+	The text of a JSON document, read from a binary stream in chunks.
+
+	Only a window of the text is held: positions are absolute in the document, text[0] is at
+	position base, and the text before the position passed to fill is released as the next
+	chunk is read. A source without a stream holds a whole document.
+	"""
+
+	def __init__(self, stream=None, text: str = ""):
+		self.stream = stream
+		self.text = text
+		self.base = 0
+		self.eof = stream is None
+		self.bytes_read = 0
+		self.decoder = codecs.getincrementaldecoder("utf-8")()
+
+	def fill(self, keep_from: int, grow: bool = False) -> bool:
+		"""
+		Read the next chunk of the stream.
+
+		Args:
+			keep_from (int): The first position still needed, the text before it is released.
+			grow (bool): Read at least as much as is kept, so a value that spans many chunks
+				is retried a logarithmic number of times. Defaults to False.
+
+		Returns:
+			bool: False at the end of the stream.
+		"""
+		if self.eof:
+			return False
+		kept = self.text[keep_from - self.base:]
+		self.base = keep_from
+		chunk = self.stream.read(max(read_chunk_size, len(kept)) if grow else read_chunk_size)
+		self.bytes_read += len(chunk)
+		if not chunk:
+			self.eof = True
+			self.text = kept + self.decoder.decode(b"", final=True)
+		else:
+			self.text = kept + self.decoder.decode(chunk)
+		return True
+
+	def error(self, message: str, index: int) -> json.JSONDecodeError:
+		"""
+		Returns:
+			json.JSONDecodeError: The error at an absolute position, reported against the held text.
+		"""
+		return json.JSONDecodeError(message, self.text, min(max(index - self.base, 0), len(self.text)))
+
+
+def skip_whitespace(source: JsonSource, index: int) -> int:
+	"""
+	Step over whitespace, reading the stream until a character follows it or the stream ends.
+
+	Args:
+		source (JsonSource): The JSON document.
+		index (int): The position to start from.
+
+	Returns:
+		int: The position of the next character, at which source.text holds a character unless at the end.
+	"""
+	while True:
+		end = source.base + whitespace_re.match(source.text, index - source.base).end()
+		if end - source.base < len(source.text) or not source.fill(end):
+			return end
+		index = end
+
+def read_char(source: JsonSource, index: int) -> str:
+	"""
+	Returns:
+		str: The character at a position returned by skip_whitespace, "" at the end of the document.
+	"""
+	position = index - source.base
+	return source.text[position] if position < len(source.text) else ""
+
+def read_token(source: JsonSource, index: int, read) -> tuple:
+	"""
+	Read a token with a function of the text, reading more of the stream until the token is complete.
+
+	A token reaching the end of the held text may be cut by the chunk boundary (a number, a string),
+	so it is read again with more text until it ends before the end of the text or the stream ends.
+
+	Args:
+		source (JsonSource): The JSON document.
+		index (int): The position of the token.
+		read: Called with the text and the position in it, returns the value and the position following it,
+			or raises json.JSONDecodeError.
+
+	Returns:
+		tuple: The value and the absolute position following it.
+	"""
+	while True:
+		text, base = source.text, source.base
+		try:
+			value, end = read(text, index - base)
+			if end < len(text) or source.eof:
+				return value, base + end
+		except json.JSONDecodeError:
+			if source.eof:
+				raise
+		source.fill(index, grow=True)
+
+def read_key(text: str, index: int) -> tuple:
+	return scanstring(text, index + 1)
+
+def read_string_end(text: str, index: int) -> tuple:
+	match = string_re.match(text, index)
+	if match is None:
+		raise json.JSONDecodeError("Unterminated string", text, index)
+	return None, match.end()
+
+def read_scalar_end(text: str, index: int) -> tuple:
+	return None, scalar_re.match(text, index).end()
+
+def read_json(source: JsonSource, index: int) -> tuple:
+	"""
+	Decode the JSON value starting at index as is.
+
+	Args:
+		source (JsonSource): The JSON document.
+		index (int): The position of the value, past any whitespace.
+
+	Returns:
+		tuple: The decoded value and the position following it.
+	"""
+	if read_char(source, index) not in '"[{':
+		# a number cut by the end of the text may still decode, like 1.5 cut to 1,
+		# so the text is read up to the delimiter following a number or literal first
+		read_token(source, index, read_scalar_end)
+	return read_token(source, index, json_decoder.raw_decode)
+
+def decode_projected(text: str, projection: dict) -> dict:
+	"""
+	Decode a JSON document, building only the values selected by the projection.
+
+	A projection is None to decode a value as is, {"items": projection} for an array whose
+	items use that projection, or {"keep": set or None, "skip": set, "fields": dict} for an
+	object: keys outside "keep" (any key when None) or inside "skip" are stepped over without
+	being decoded, and "fields" maps keys to the projection of their value. An object projection
+	may also name a SchemaRecord class under "record" to build the object as that record, or set
+	"partial" to stop reading the object as soon as all of its "keep" keys are decoded.
+
+	Args:
+		text (str): The JSON document.
+		projection (dict): The projection of the document's root value.
+
+	Returns:
+		dict: The decoded document.
+	"""
+	return decode_source(JsonSource(text=text), projection)
+
+def decode_source(source: JsonSource, projection: dict) -> dict:
+	"""
+	Decode a whole JSON document from a source, see decode_projected.
+
+	Args:
+		source (JsonSource): The JSON document.
+		projection (dict): The projection of the document's root value.
+
+	Returns:
+		dict: The decoded document.
+	"""
+	value, end = decode_value(source, skip_whitespace(source, 0), projection)
+	end = skip_whitespace(source, end)
+	if read_char(source, end):
+		raise source.error("Extra data", end)
+	return value
+
+def decode_value(source: JsonSource, index: int, projection: dict) -> tuple:
+	"""
+	Decode the JSON value starting at index according to the projection.
+
+	Args:
+		source (JsonSource): The JSON document.
+		index (int): The position of the value, past any whitespace.
+		projection (dict): The projection of the value, see decode_projected.
+
+	Returns:
+		tuple: The decoded value and the position following it.
+	"""
+	if projection is None:
+		return read_json(source, index)
+
+	if "items" in projection:
+		if read_char(source, index) != '[':
+			return read_json(source, index)
+		items = []
+		index = skip_whitespace(source, index + 1)
+		if read_char(source, index) == ']':
+			return items, index + 1
+		while True:
+			item, index = decode_value(source, index, projection["items"])
+			items.append(item)
+			index = skip_whitespace(source, index)
+			char = read_char(source, index)
+			if char == ']':
+				return items, index + 1
+			if char != ',':
+				raise source.error("Expecting ',' delimiter", index)
+			index = skip_whitespace(source, index + 1)
+
+	if read_char(source, index) != '{':
+		return read_json(source, index)
+	keep = projection.get("keep")
+	skip = projection.get("skip", ())
+	fields = projection.get("fields", {})
+	obj = {}
+	index = skip_whitespace(source, index + 1)
+	if read_char(source, index) == '}':
+		if "record" in projection:
+			return projection["record"].from_dict(obj), index + 1
+		return obj, index + 1
+	while True:
+		if read_char(source, index) != '"':
+			raise source.error("Expecting property name enclosed in double quotes", index)
+		key, index = read_token(source, index, read_key)
+		index = skip_whitespace(source, index)
+		if read_char(source, index) != ':':
+			raise source.error("Expecting ':' delimiter", index)
+		index = skip_whitespace(source, index + 1)
+		if (keep is None or key in keep) and key not in skip:
+			obj[key], index = decode_value(source, index, fields.get(key))
+			if projection.get("partial") and keep is not None and len(obj) == len(keep):
+				return obj, index
+		else:
+			index = skip_value(source, index)
+		index = skip_whitespace(source, index)
+		char = read_char(source, index)
+		if char == '}':
+			if "record" in projection:
+				return projection["record"].from_dict(obj), index + 1
+			return obj, index + 1
+		if char != ',':
+			raise source.error("Expecting ',' delimiter", index)
+		index = skip_whitespace(source, index + 1)
+
+def skip_value(source: JsonSource, index: int) -> int:
+	"""
+	Step over the JSON value starting at index without decoding it.
+
+	The text is scanned from one string or bracket to the next, so a value spanning many chunks,
+	like a whole series, is released chunk by chunk as it is stepped over.
+
+	Args:
+		source (JsonSource): The JSON document.
+		index (int): The position of the value, past any whitespace.
+
+	Returns:
+		int: The position following the value.
+	"""
+	char = read_char(source, index)
+	if char == '"':
+		return read_token(source, index, read_string_end)[1]
+	if not char or char not in '[{':
+		return read_token(source, index, read_scalar_end)[1]
+
+	depth = 0
+	while True:
+		text, base = source.text, source.base
+		match = structural_re.search(text, index - base)
+		if match is None:
+			index = base + len(text)
+			if not source.fill(index):
+				raise source.error("Unterminated value", index)
+			continue
+		char = match.group()
+		start = base + match.start()
+		if char == '"':
+			index = read_token(source, start, read_string_end)[1]
+			continue
+		if char in '[{':
+			# containers without nested containers, like the [time, value] pairs of a series or
+			# the casts of a rotation, are stepped over in one match together with their flat siblings.
+			# A run cut by the end of the text stops at its last whole container.
+			flat_match = (flat_run_re if depth else flat_container_re).match(text, match.start())
+			if flat_match:
+				index = base + flat_match.end()
+				if depth == 0:
+					return index
+				continue
+			index = start + 1
+			depth += 1
+			continue
+		index = start + 1
+		depth -= 1
+		if depth == 0:
+			return index
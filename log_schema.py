@@ -0,0 +1,157 @@
+#    This file contains the configuration for computing the detailed top stats in arcdps logs as parsed by Elite Insights.
+#    Copyright (C) 2024 John Long (Drevarr)
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import json
+import os
+
+schema_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "elite_iInsights_log_schema.json")
+
+# Fields parse_file reads unconditionally, compiled into the record classes below.
+# The rest of the log stays reachable through the usual dict access.
+log_record_fields = ["fightName", "timeEnd", "duration", "durationMS", "uploadLinks", "players", "targets", "skillMap", "buffMap"]
+player_record_fields = ["name", "account", "profession", "group", "notInSquad", "hasCommanderTag"]
+target_record_fields = ["name", "isFake"]
+
+# Python types of the JSON schema types
+schema_types = {
+	"string": str,
+	"integer": int,
+	"number": (int, float),
+	"boolean": bool,
+	"array": list,
+	"object": dict,
+}
+
+
+class LogValidationError(ValueError):
+	"""Raised when a log is missing a field the parser needs or holds a value of the wrong type."""
+
+
+class SchemaRecord(dict):
+	"""
+	A decoded log object whose schema fields are validated and also exposed as slotted attributes.
+
+	Records are dicts, so the parser keeps using player['name'] or 'minions' in player for any key,
+	while the hot loops can read the validated fields as attributes.
+	"""
+	__slots__ = ()
+	record_name = "object"
+	schema_fields = {}
+
+	@classmethod
+	def from_dict(cls, data: dict) -> "SchemaRecord":
+		"""
+		Validate a decoded JSON object and build the record.
+
+		Args:
+			data (dict): The decoded object.
+
+		Returns:
+			SchemaRecord: The record.
+
+		Raises:
+			LogValidationError: When a field is missing or does not match the schema.
+		"""
+		record = cls(data)
+		for field, field_schema in cls.schema_fields.items():
+			if field not in data:
+				raise LogValidationError(f"{cls.describe(data)}: missing field '{field}'")
+			value = data[field]
+			check_schema_value(value, field_schema, f"{cls.describe(data)}.{field}")
+			setattr(record, field, value)
+		return record
+
+	@classmethod
+	def describe(cls, data: dict) -> str:
+		"""
+		Returns:
+			str: The record name, with the object's name when it has one.
+		"""
+		name = data.get("name")
+		return f"{cls.record_name} '{name}'" if isinstance(name, str) else cls.record_name
+
+
+def check_schema_value(value, field_schema: dict, location: str) -> None:
+	"""
+	Check a value against the type and bounds of its schema.
+
+	Args:
+		value: The decoded value.
+		field_schema (dict): The schema of the field, may be empty.
+		location (str): The location of the value, used in error messages.
+
+	Raises:
+		LogValidationError: When the value does not match the schema.
+	"""
+	schema_type = field_schema.get("type")
+	if schema_type in schema_types:
+		expected = schema_types[schema_type]
+		if not isinstance(value, expected) or (isinstance(value, bool) and schema_type in ("integer", "number")):
+			raise LogValidationError(f"{location}: expected {schema_type}, got {type(value).__name__}")
+	if "minLength" in field_schema and isinstance(value, str) and len(value) < field_schema["minLength"]:
+		raise LogValidationError(f"{location}: expected at least {field_schema['minLength']} characters")
+	if "minItems" in field_schema and isinstance(value, list) and len(value) < field_schema["minItems"]:
+		raise LogValidationError(f"{location}: expected at least {field_schema['minItems']} items")
+	if "minimum" in field_schema and isinstance(value, (int, float)) and value < field_schema["minimum"]:
+		raise LogValidationError(f"{location}: expected a value of at least {field_schema['minimum']}")
+
+def load_log_schema(path: str = schema_path) -> dict:
+	"""
+	Load the Elite Insights log schema shipped with the parser.
+
+	Args:
+		path (str): The path to the schema. Defaults to elite_iInsights_log_schema.json next to this module.
+
+	Returns:
+		dict: The schema, or an empty schema when the file is missing so only field presence is checked.
+	"""
+	try:
+		with open(path, encoding="utf-8") as f:
+			return json.load(f)
+	except OSError:
+		print(f"Log schema {path} not found, only checking that log fields are present")
+		return {}
+
+def compile_record_class(class_name: str, record_name: str, object_schema: dict, fields: list) -> type:
+	"""
+	Compile a slotted record class for the given fields of an object schema.
+
+	Args:
+		class_name (str): The name of the class.
+		record_name (str): The name of the object used in error messages.
+		object_schema (dict): The schema of the object.
+		fields (list): The fields to validate and expose as attributes.
+
+	Returns:
+		type: The SchemaRecord subclass.
+	"""
+	properties = object_schema.get("properties", {})
+	return type(class_name, (SchemaRecord,), {
+		"__slots__": tuple(fields),
+		"record_name": record_name,
+		"schema_fields": {field: properties.get(field, {}) for field in fields},
+	})
+
+
+log_schema = load_log_schema()
+LogRecord = compile_record_class("LogRecord", "log", log_schema, log_record_fields)
+PlayerRecord = compile_record_class(
+	"PlayerRecord", "player", log_schema.get("properties", {}).get("players", {}).get("items", {}), player_record_fields
+)
+TargetRecord = compile_record_class(
+	"TargetRecord", "target", log_schema.get("properties", {}).get("targets", {}).get("items", {}), target_record_fields
+)
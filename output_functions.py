@@ -14,13 +14,14 @@
 #    You should have received a copy of the GNU General Public License
 #    along with this program.  If not, see <https://www.gnu.org/licenses/>.
 import config
-import json
+import json_backend
 #import os
 import requests
 import sqlite3
 import xlsxwriter
 from glicko2 import Player as GlickoPlayer
 from collections import defaultdict
+from top_k import get_top_k
 
 #list of tid files to output
 tid_list = []
@@ -74,19 +75,19 @@ def append_tid_for_output(input, output):
 	output.append(input)
 	print(input['title']+'.tid has been created.')
 
-def write_tid_list_to_json(tid_list: list, output_filename: str) -> None:
+def write_tid_list_to_json(tid_list: list, output_filename: str, compact: bool = False) -> None:
 	"""
 	Write the list of tid files to a json file
 
 	Args:
 		tid_list (list): The list of tid files.
 		output_filename (str): The name of the output file.
+		compact (bool): Whether to write without whitespace. Defaults to False.
 
 	Returns:
 		None
 	"""
-	with open(output_filename, 'w') as outfile:
-		json.dump(tid_list, outfile, indent=4, sort_keys=True)
+	json_backend.dump_to_file(tid_list, output_filename, indent=4, sort_keys=True, compact=compact)
 
 def convert_duration(milliseconds: int) -> str:
 	"""
@@ -1101,7 +1102,6 @@ def build_debuff_uptime_summary(top_stats: dict, boons: dict, buff_data: dict, c
 
 	# Build the table body
 	for player in top_stats["player"].values():
-		debuff_data = {"b70350": [0.10,'targetDamage1S'], "b70806": [0.10,'targetPowerDamage1S']}
 		account = player["account"]
 		name = player["name"]
 		tt_name = f'<span data-tooltip="{account}">{name}</span>'
@@ -1119,7 +1119,7 @@ def build_debuff_uptime_summary(top_stats: dict, boons: dict, buff_data: dict, c
 				uptime_ms = player["targetBuffs"][boon_id]["uptime_ms"]
 				uptime_percentage = round((uptime_ms / 1000), 3)				
 				uptime_percentage = f"{uptime_percentage:,.0f}"
-				if boon_id in debuff_data:
+				if 'damage_gained' in player['targetBuffs'][boon_id]:
 					damage_gained = player['targetBuffs'][boon_id]['damage_gained']
 					entry = f'<span data-tooltip="Damage Gained: {damage_gained:,.0f}">{uptime_percentage}</span>'
 				else:
@@ -1993,7 +1993,7 @@ def build_high_scores_tid(high_scores: dict, skill_data: dict, buff_data: dict,
 	Build a table of high score statistics for each category.
 
 	Args:
-		high_scores (dict): Dictionary containing high scores for each category.
+		high_scores (dict): Top-K tables of high score records for each category.
 		skill_data (dict): Dictionary containing skill data including name and icon.
 		buff_data (dict): Dictionary containing buff data including name and icon.
 		caption (str): The caption for the table.
@@ -2043,22 +2043,15 @@ def build_high_scores_tid(high_scores: dict, skill_data: dict, buff_data: dict,
 		
 		rows.append(header)
 
-		# Sort high scores for the current category
-		sorted_high_scores = sorted(high_scores[category].items(), key=lambda x: x[1], reverse=True)
-		
-		# Build rows for each player
-		for player in sorted_high_scores:
-			player, score = player
-			player_string = player.split("-")
-			prof_name = player_string[0]
-			acct = player_string[1]
-			fight = player_string[2]
-			fight = fight.split("|")[0]
-
+		# Build rows for each player, highest score first
+		for record in get_top_k(high_scores[category]):
+			prof_name = "{{" + record["profession"] + "}}" + record["name"]
+			acct = record["account"]
+			fight = record["fight"]
+			score = record["value"]
 
-			
 			if category in ["statTarget_max", "totalDamageTaken_max"]:
-				skill_id = player.split("| ")[1]
+				skill_id = record["skill"]
 				if "s" + str(skill_id) in skill_data:
 					skill_name = skill_data["s" + str(skill_id)]['name']
 					skill_icon = skill_data["s" + str(skill_id)]['icon']
@@ -2823,7 +2816,7 @@ def build_on_tag_review(death_on_tag, tid_date_time):
 	rows.append('<div style="overflow-y: auto; width: 100%; overflow-x:auto;">\n\n')
 	rows.append("\n\n|thead-dark table-caption-top table-hover sortable|k")
 	rows.append("| On Tag Review |c")
-	header = "|!Player |!Profession | !Avg Dist| !On-Tag<br>{{deadCount}} | !Off-Tag<br>{{deadCount}} | !After-Tag<br>{{deadCount}} | !Run-Back<br>{{deadCount}} | !Total<br>{{deadCount}} |!OffTag Ranges|h"
+	header = "|!Player |!Profession | !Avg Dist| !On-Tag<br>Time % | !Run-Back<br>Time % | !On-Tag<br>{{deadCount}} | !Off-Tag<br>{{deadCount}} | !After-Tag<br>{{deadCount}} | !Run-Back<br>{{deadCount}} | !Total<br>{{deadCount}} |!OffTag Ranges|h"
 	rows.append(header)
 	for name_prof in death_on_tag:
 		player = death_on_tag[name_prof]['name']
@@ -2833,13 +2826,20 @@ def build_on_tag_review(death_on_tag, tid_date_time):
 			avg_dist = round(sum(death_on_tag[name_prof]['distToTag']) / len(death_on_tag[name_prof]['distToTag']))
 		else:
 			avg_dist = "n/a"
+		# share of the combat time spent within the On_Tag and Run_Back ranges
+		combat_time = death_on_tag[name_prof]['Tag_Combat_Time']
+		if combat_time:
+			on_tag_time = f"{death_on_tag[name_prof]['On_Tag_Time'] / combat_time * 100:.1f}%"
+			run_back_time = f"{death_on_tag[name_prof]['Run_Back_Time'] / combat_time * 100:.1f}%"
+		else:
+			on_tag_time = run_back_time = "n/a"
 		on_tag = death_on_tag[name_prof]['On_Tag']
 		off_tag = death_on_tag[name_prof]['Off_Tag']
 		after_tag = death_on_tag[name_prof]['After_Tag_Death']
 		run_back = death_on_tag[name_prof]['Run_Back']
 		total = death_on_tag[name_prof]['Total']
 		off_tag_ranges = death_on_tag[name_prof]['Ranges']
-		row = f"|<span class='tooltip tooltip-right' data-tooltip=' {account}'> {player} </span> | {{{{{profession}}}}} {profession[:3]} | {avg_dist} | {on_tag} | {off_tag} | {after_tag} | {run_back} | {total} |{off_tag_ranges} |"
+		row = f"|<span class='tooltip tooltip-right' data-tooltip=' {account}'> {player} </span> | {{{{{profession}}}}} {profession[:3]} | {avg_dist} | {on_tag_time} | {run_back_time} | {on_tag} | {off_tag} | {after_tag} | {run_back} | {total} |{off_tag_ranges} |"
 		rows.append(row)
 
 	rows.append("</div>\n\n\n")
@@ -2885,6 +2885,11 @@ def build_dps_stats_tids(DPSStats: dict, tid_date_time: str, tid_list: list) ->
 
 	for tab in tabs.keys():
 		rows = []
+		windows = list(range(1, 11))
+		if tabs[tab] != "chunkDamage":
+			# burst windows longer than the chunk windows are only present when configured in burst_windows
+			window_count = max((len(DPSStats[player_prof][tabs[tab]]) for player_prof in sorted_DPSStats), default=0)
+			windows += [i for i in range(21, window_count) if any(DPSStats[player_prof][tabs[tab]][i] for player_prof in sorted_DPSStats)]
 
 		# Set the title, caption and tags for the table
 		tid_title = f"{tid_date_time}-DPS-Stats-{tab}"
@@ -2895,7 +2900,7 @@ def build_dps_stats_tids(DPSStats: dict, tid_date_time: str, tid_list: list) ->
 		rows.append("\n\n|thead-dark table-caption-top table-hover sortable|k")
 		rows.append(f"| DPS Stats - {tab} |c")
 		header = "|!Player |!Profession | ! <span data-tooltip=`Number of seconds player was in squad logs`>Seconds</span>| !DPS| !Total|"
-		for i in range(1, 11):
+		for i in windows:
 			header += f" !{tab} ({i})s|"
 		header += "h"
 		rows.append(header)
@@ -2907,7 +2912,7 @@ def build_dps_stats_tids(DPSStats: dict, tid_date_time: str, tid_list: list) ->
 			DPS = '<span data-tooltip="'+f"{DPSStats[player_prof]['damageTotal']:,.0f}"+' total damage">'+f"{round(DPSStats[player_prof]['damageTotal'] / fightTime):,.0f}</span>"
 			TOTAL = '<span data-tooltip="'+f"{DPSStats[player_prof]['damageTotal']:,.0f}"+' total damage">'+f"{DPSStats[player_prof]['damageTotal']:,.0f}</span>"
 			row = f"|<span data-tooltip='{account}'>{player}</span> | {{{{{profession}}}}} {profession[:3]}| {fightTime} | {DPS} | {TOTAL}|"
-			for i in range(1, 11):
+			for i in windows:
 				if tab == "Ch-DPS":
 					row += ' <span data-tooltip="'+f"{DPSStats[player_prof][tabs[tab]][i]:,.0f}"+f' chunk({i}) damage">'+f"{round(DPSStats[player_prof][tabs[tab]][i] / fightTime):,.0f}</span>|"
 				elif tab == "Ch-Total":
@@ -4182,9 +4187,9 @@ def build_fight_line_chart(fight_data: dict, tid_date_time: str, tid_list: list)
 	"""
 
 	for fight_num in fight_data:
-		outgoing_damage_data = list(fight_data[fight_num]["damage1S"].values())
-		incoming_damage_data = list(fight_data[fight_num]["damageTaken1S"].values())
-		time_series = list(fight_data[fight_num]["damage1S"].keys())
+		outgoing_damage_data = fight_data[fight_num]["damage1S"].tolist()
+		incoming_damage_data = fight_data[fight_num]["damageTaken1S"].tolist()
+		time_series = list(range(len(outgoing_damage_data)))
 		zf_fight_num = str(fight_num).zfill(2)
 		chart_title = f"Fight-{zf_fight_num}: Damage Output Review"
 		line_chart_config = '```py\nPlayer_Line = players with DPS > 700 for the fight\n```\n\n\n\n<$echarts $text="""\n'
@@ -4275,13 +4280,7 @@ def build_fight_line_chart(fight_data: dict, tid_date_time: str, tid_list: list)
 			#	continue
 
 			player_name = player.split("-")[1][:3]+" - "+player.split("-")[2]
-			player_damage_data = []
-			last_index = 0
-			for index in range(len(fight_data[fight_num]["players"][player]['damage1S'])):
-				cur_damage = fight_data[fight_num]["players"][player]['damage1S'][index] # - fight_data[fight_num]["players"][player]['damage1S'][last_index]
-				
-				player_damage_data.append(cur_damage)
-				last_index = index
+			player_damage_data = fight_data[fight_num]["players"][player]['damage1S'].tolist()
 
 			player_line_chart_config = f""",
 		{{
@@ -4804,43 +4803,31 @@ def write_high_scores_to_db(highscores, fights, skill_data, db_path):
 
 		stat = STAT_NAME_MAP.get(category)
 
-		for player in stat_data:
+		for record in get_top_k(stat_data):
 			stat_info = ""
-			#print(player)
-			if " | " in player:
-				player_data = player.split(" | ")[0]
-				if len(player_data.split("-")) > 3:
-					prof_player, account, fight_num, _ = player_data.split("-")
-				else:
-					prof_player, account, fight_num = player_data.split("-")
-				stat_value = stat_data[player]
-				if "max" in category:
-					skill_id = "s" + player.split(" | ")[1]
-					skill_name = skill_data[skill_id]["name"]
-					skill_icon = skill_data[skill_id]["icon"]
-					stat_info = (
-						f"[img width=24 [{skill_name}|{skill_icon}]] {skill_name}"
-					)
+			if "max" in category and record["skill"] is not None:
+				skill_id = "s" + str(record["skill"])
+				skill_name = skill_data[skill_id]["name"]
+				skill_icon = skill_data[skill_id]["icon"]
+				stat_info = (
+					f"[img width=24 [{skill_name}|{skill_icon}]] {skill_name}"
+				)
 
-			else:
-				prof_player, account, fight_num, _ = player.split("-")
-				stat_value = stat_data[player]
-			profession, player = prof_player.split("}}")
-			profession += "}}"
+			fight_num = record["fight"]
 			fight_time = (
-				f"{fights[int(fight_num)]["fight_date"]} - Fight #{fight_num}"
+				f"{fights[fight_num]["fight_date"]} - Fight #{fight_num}"
 			)
-			fight_link = fights[int(fight_num)]["fight_link"]
+			fight_link = fights[fight_num]["fight_link"]
 			save_high_score(
 				db_path,
-				account,
-				player,
-				profession,
+				record["account"],
+				record["name"],
+				"{{" + record["profession"] + "}}",
 				fight_time,
 				fight_link,
 				stat,
 				stat_info,
-				stat_value,
+				record["value"],
 			)
 
 
@@ -5244,7 +5231,32 @@ def write_data_to_db(top_stats: dict, last_fight: str, db_path: str = "Top_Stats
 	conn.close()
 	print("Database updated.")
 
-def output_top_stats_json(top_stats: dict, buff_data: dict, skill_data: dict, damage_mod_data: dict, high_scores: dict, personal_damage_mod_data: dict, personal_buff_data: dict, fb_pages: dict, mechanics: dict, minions: dict, mesmer_clone_usage: dict, death_on_tag: dict, DPSStats: dict, commander_summary_data: dict, enemy_avg_damage_per_skill: dict, player_damage_mitigation: dict, player_minion_damage_mitigation: dict, stacking_uptime_Table: dict, IOL_revive: dict, fight_data: dict, outfile: str) -> None:
+def get_fight_data_json(fight_data: dict) -> dict:
+	"""
+	Convert the typed per second arrays of fight_data to the {second: damage} layout of the json output.
+
+	Args:
+		fight_data (dict): The fight data.
+
+	Returns:
+		dict: The fight data with each per second array as a dictionary keyed by second.
+	"""
+	fight_data_json = {}
+	for fight_num, fight in fight_data.items():
+		fight_data_json[fight_num] = {
+			"damage1S": dict(enumerate(fight["damage1S"])),
+			"damageTaken1S": dict(enumerate(fight["damageTaken1S"])),
+			"players": {
+				player_id: {
+					"damage1S": dict(enumerate(player_data["damage1S"])),
+					"damageTaken1S": player_data["damageTaken1S"],
+				}
+				for player_id, player_data in fight["players"].items()
+			},
+		}
+	return fight_data_json
+
+def output_top_stats_json(top_stats: dict, buff_data: dict, skill_data: dict, damage_mod_data: dict, high_scores: dict, personal_damage_mod_data: dict, personal_buff_data: dict, fb_pages: dict, mechanics: dict, minions: dict, mesmer_clone_usage: dict, death_on_tag: dict, DPSStats: dict, commander_summary_data: dict, enemy_avg_damage_per_skill: dict, player_damage_mitigation: dict, player_minion_damage_mitigation: dict, stacking_uptime_Table: dict, IOL_revive: dict, fight_data: dict, outfile: str, compact: bool = False) -> None:
 	"""Print the top_stats dictionary as a JSON object to the console."""
 
 	json_dict = {}
@@ -5257,7 +5269,7 @@ def output_top_stats_json(top_stats: dict, buff_data: dict, skill_data: dict, da
 	json_dict["skill_data"] = {key: value for key, value in skill_data.items()}
 	json_dict["damage_mod_data"] = {key: value for key, value in damage_mod_data.items()}
 	json_dict["skill_casts_by_role"] = {key: value for key, value in top_stats["skill_casts_by_role"].items()}
-	json_dict["high_scores"] = {key: value for key, value in high_scores.items()}    
+	json_dict["high_scores"] = {key: get_top_k(value) for key, value in high_scores.items()}
 	json_dict["personal_damage_mod_data"] = {key: value for key, value in personal_damage_mod_data.items()}
 	json_dict['personal_buff_data'] = {key: value for key, value in personal_buff_data.items()}
 	json_dict["fb_pages"] = {key: value for key, value in fb_pages.items()}
@@ -5273,10 +5285,8 @@ def output_top_stats_json(top_stats: dict, buff_data: dict, skill_data: dict, da
 	json_dict["player_minion_damage_mitigation"] = {key: value for key, value in player_minion_damage_mitigation.items()}
 	json_dict["stacking_uptime_Table"] = {key: value for key, value in stacking_uptime_Table.items()}
 	json_dict["IOL_revive"] = {key: value for key, value in IOL_revive.items()}
-	json_dict["fight_data"] = {key: value for key, value in fight_data.items()}
+	json_dict["fight_data"] = get_fight_data_json(fight_data)
 
-	with open(outfile, 'w') as json_file:
-		json.dump(json_dict, json_file, indent=4)
+	json_backend.dump_to_file(json_dict, outfile, indent=4, compact=compact)
 
-		print("JSON File Complete : "+outfile)
-	json_file.close()
+	print("JSON File Complete : "+outfile)
@@ -16,13 +16,46 @@
 
 
 import config
-import gzip
+import copy
 import json
+import json_backend
+import log_reader
 import math
+import multiprocessing
+import os
+import pickle
 import requests
+import run_profiler
 import time
+from array import array
+from itertools import repeat
 from typing import Optional, Dict
+from fight_cache import get_parser_version, load_cached_fight, store_cached_fight
+from intervals import build_state_index, intersect, overlap_length, state_at, to_active_intervals, to_step_intervals
+from log_reader import get_log_name, load_log_json
 from requests.exceptions import RequestException, HTTPError, Timeout, ConnectionError
+from tag_distance import average_tag_distance, build_tag_distance_index, build_tag_distance_index_array, count_in_range, count_samples
+from time_series import add_series, add_to_array, add_window_deltas, moving_average, moving_average_array, to_cumulative, to_deltas, to_deltas_array, window_max, window_max_array, window_sum
+from top_k import new_top_k, push_top_k
+
+# Optional NumPy support for the vectorised DPS stats engine
+try:
+	import numpy as np
+except ImportError:
+	np = None
+
+# Engine used by calculate_dps_stats: "numpy" or "python"
+dps_engine = "numpy" if np is not None else "python"
+# Window lengths in seconds of burstDamage and ch5CaBurstDamage, see set_burst_windows
+burst_windows = list(range(1, 21))
+# Number of high scores kept per stat
+high_score_count = 5
+
+# Target debuffs whose damage increase is credited to their source: [increase per stack, damage series], see set_damage_debuffs
+damage_debuffs = {
+	"b70350": [0.10, 'targetDamage1S'], #Dragonhunter Relic
+	"b70806": [0.10, 'targetPowerDamage1S'] #Isgarren Relic
+}
 
 # Top stats dictionary to store combined log data
 top_stats = config.top_stats
@@ -61,13 +94,89 @@ commander_summary_data = {}
 DPSStats = {}
 stacking_uptime_Table = {}
 IOL_revive = {}
-debuff_damage = {}
 fight_data = {}
 killing_blow_rallies = {
 	"total": 0,
 	'kb_players': {}
 }
 
+# Per fight scratch data handed from parse_file to the session merge
+high_score_candidates = []
+# Actor index of the fight being parsed: id(player) -> identity keys, combat breakpoints, party and commander flag
+fight_actors = {}
+# Stat facts of the fight being parsed, one row per fact in stat_facts: the code of its stat name and its value.
+# The facts added together form a batch. stat_fact_batches holds the fact count of each batch, whether it has float
+# values, and the code of the totals it is added to per rollup level, -1 when the batch skips that rollup. The codes
+# index stat_fact_codes. rollup_stat_facts sums them into top_stats.
+stat_facts = {
+	"stat": array('l'),
+	"value": [],
+}
+stat_fact_batches = {
+	"count": array('l'),
+	"float": array('b'),
+	"player": array('l'),
+	"fight": array('l'),
+	"group": array('l'),
+}
+# Codes of the stat names, of the (name_prof, fight_num or group, category, key) totals of each rollup level,
+# and the stat codes of each tuple of stat names added together
+stat_fact_codes = {
+	"stat": {},
+	"player": {},
+	"fight": {},
+	"group": {},
+	"stat_names": {},
+}
+# Rollup levels of a fact batch: the player totals, the fight and overall totals, the overall totals per squad group
+FACT_PLAYER = 1
+FACT_FIGHT = 2
+FACT_GROUP = 4
+
+# Empty top_stats layout used when resetting the accumulators between fights
+empty_top_stats = copy.deepcopy(top_stats)
+
+# How lists inside each accumulator combine when fights are merged:
+#   "unique" appends unseen items, "extend" appends everything, "add" sums element-wise
+accumulator_list_modes = {
+	"top_stats": "unique",
+	"team_code_missing": "unique",
+	"personal_damage_mod_data": "unique",
+	"personal_buff_data": "unique",
+	"buff_data": "unique",
+	"skill_data": "unique",
+	"damage_mod_data": "unique",
+	"fb_pages": "unique",
+	"mechanics": "unique",
+	"minions": "unique",
+	"mesmer_clone_usage": "unique",
+	"death_on_tag": "extend",
+	"commander_summary_data": "unique",
+	"DPSStats": "add",
+	"stacking_uptime_Table": "add",
+	"IOL_revive": "unique",
+	"fight_data": "unique",
+	"killing_blow_rallies": "unique",
+	"enemy_avg_damage_per_skill": "unique",
+	"player_damage_mitigation": "unique",
+	"player_minion_damage_mitigation": "unique",
+}
+
+# Keys whose 'max' / 'min' stats hold the extreme value instead of a running sum
+merge_extreme_value_keys = {"targetDamageDist", "extHealingStats", "extBarrierStats", "enemy_avg_damage_per_skill"}
+# List keys combined with an element-wise max instead of the accumulator's list mode
+merge_list_max_keys = {"burstDamage", "ch5CaBurstDamage"}
+# Scalar keys that take the newest value when merged instead of being summed
+merge_last_value_keys = {"last_fight", "last_party", "prof"}
+# Scalar keys that keep the first value seen when merged instead of being summed
+merge_first_value_keys = {"team"}
+# Paths of the accumulators keyed by fight number, renumbered when a cached fight is merged under
+# another number. Mechanics are only keyed by fight number outside of WvW
+fight_keyed_accumulators = [
+	("fight_data",), ("mechanics",),
+	("top_stats", "fight"), ("top_stats", "enemies_by_fight"), ("top_stats", "parties_by_fight"),
+]
+
 
 def get_player_account(player):
 	"""
@@ -86,10 +195,35 @@ def get_player_account(player):
 	return account
 
 
+def get_target_damage_per_tick(target_damage: list) -> array:
+	"""
+	Sum a player's damage on each tick over all targets.
+
+	Args:
+		target_damage (list): The player's targetDamage1S, the cumulative damage on each target.
+
+	Returns:
+		array: The damage done on each tick.
+	"""
+	if dps_engine == "numpy":
+		try:
+			series = np.array([target[0] for target in target_damage], dtype=np.int64)
+		except (ValueError, TypeError):
+			series = None
+		if series is not None and series.ndim == 2:
+			return array('q', to_deltas_array(series).sum(axis=0).tobytes())
+
+	damage_per_tick = array('q')
+	for target in target_damage:
+		add_to_array(damage_per_tick, to_deltas(target[0]))
+	return damage_per_tick
+
 def get_fight_data(player, fight_num):
 	"""
 	Get the fight data for a player in a given fight
 
+	The per second damage of the fight and of each player is stored in typed arrays indexed by second.
+
 	Args:
 		player (dict): The player data from the log
 		fight_num (int): The fight number to add the data to
@@ -97,50 +231,50 @@ def get_fight_data(player, fight_num):
 	Returns:
 		None
 	"""
-	account = get_player_account(player)
+	account = get_actor(player)['account']
 	player_id = f"{account}-{player['profession']}-{player['name']}"
 	if fight_num not in fight_data:
 		fight_data[fight_num] = {
-			"damage1S": {},
-			"damageTaken1S": {},
+			"damage1S": array('q'),
+			"damageTaken1S": array('q'),
 			"players": {}
 		}
 
 	if player['dpsAll'][0]['dps'] >= 700:
 		if player_id not in fight_data[fight_num]["players"]:
+			player_damage = get_target_damage_per_tick(player["targetDamage1S"])
 			fight_data[fight_num]["players"][player_id] = {
-				"damage1S": {},
+				"damage1S": player_damage,
 				"damageTaken1S": player["damageTaken1S"][0]
 			}
-			for target in player["targetDamage1S"]:
-				prior_damage = 0
-				for sec_index in range(len(target[0])):
-					cur_damage = target[0][sec_index] - prior_damage
-					fight_data[fight_num]["damage1S"][sec_index] = fight_data[fight_num]["damage1S"].get(sec_index, 0) + cur_damage
-					fight_data[fight_num]["players"][player_id]["damage1S"][sec_index] = fight_data[fight_num]["players"][player_id]["damage1S"].get(sec_index, 0)+cur_damage
-
-					prior_damage = target[0][sec_index]
-					
-	last_index = 0
+			add_to_array(fight_data[fight_num]["damage1S"], player_damage)
 
-	for index in range(len(player["damageTaken1S"][0])):
-		current_damage_taken = player["damageTaken1S"][0][index] - player["damageTaken1S"][0][last_index]
-		fight_data[fight_num]["damageTaken1S"][index] = fight_data[fight_num]["damageTaken1S"].get(index, 0) + current_damage_taken
-		last_index = index
+	# the first tick counts as no damage taken
+	damage_taken = player["damageTaken1S"][0]
+	add_to_array(fight_data[fight_num]["damageTaken1S"], to_deltas(damage_taken, damage_taken[0] if damage_taken else 0))
 
 
 def check_burst1S_high_score(fight_data, player, fight_num):
-	for player_id in fight_data[fight_num]["players"]:
-		account, profession, name = player_id.split("-")
-		max_burst1S_key = max(fight_data[fight_num]["players"][player_id]["damage1S"], key=fight_data[fight_num]["players"][player_id]["damage1S"].get)
-		max_burst1S_value = fight_data[fight_num]["players"][player_id]["damage1S"][max_burst1S_key]
-
-		update_high_score(
-			"burst_damage1S",
-			"{{"+profession+"}}"+name+"-"+account+"-"+str(fight_num)+"-burst1S",
-			round(max_burst1S_value, 2)	
-		)
-			
+	"""
+	Record the highest one second damage of a player in a fight as a high score candidate.
+
+	Args:
+		fight_data (dict): The fight data filled in by get_fight_data
+		player (dict): The player data from the log
+		fight_num (int): The fight number
+	"""
+	account = get_actor(player)['account']
+	player_id = f"{account}-{player['profession']}-{player['name']}"
+	player_data = fight_data[fight_num]["players"].get(player_id)
+	if not player_data or not player_data["damage1S"]:
+		return
+
+	update_high_score(
+		"burst_damage1S",
+		player['profession'], player['name'], account, fight_num,
+		round(max(player_data["damage1S"]), 2)
+	)
+
 
 
 def determine_log_type_and_extract_fight_name(fight_name: str) -> tuple:
@@ -172,29 +306,18 @@ def determine_log_type_and_extract_fight_name(fight_name: str) -> tuple:
 		log_type = "PVE"
 	return log_type, fight_name
 
-def calculate_resist_offset(resist_data: dict, state_data: dict) -> int:
+def calculate_resist_offset(resist_data: list, state_data: list) -> int:
 	"""
 	Calculate the total time a player has resist during a set of states.
 
 	Args:
-		resist_data (dict): A dictionary mapping resist start times to end times.
-		state_data (dict): A dictionary mapping state start times to end times.
+		resist_data (list): The [start, end] intervals of resistance, see get_buff_states.
+		state_data (list): The [start, end] intervals of the condition.
 
 	Returns:
 		int: The total resist offset time.
 	"""
-	total_offset = 0
-	for state_start in state_data:
-		state_end = state_data[state_start]
-		for resist_start in resist_data:
-			resist_end = resist_data[resist_start]
-			if resist_start <= state_end <= resist_end and state_start >= resist_start:
-				total_offset += state_end - state_start
-			elif state_end > resist_end and state_start >= resist_start and state_start <= resist_end:
-				total_offset += resist_end - state_start
-			elif state_end < resist_end and state_end >= resist_start and state_start < resist_start:
-				total_offset += state_end - resist_start
-	return total_offset
+	return overlap_length(state_data, resist_data)
 
 def determine_clone_usage(player, skill_map, mesmer_shatter_skills):
 	"""
@@ -212,13 +335,10 @@ def determine_clone_usage(player, skill_map, mesmer_shatter_skills):
 	Returns:
 		None
 	"""
-	active_clones = {}
 	name_prof = f"{player['name']}_{player['profession']}_{get_player_account(player)}"
 	if name_prof not in mesmer_clone_usage:
 		mesmer_clone_usage[name_prof] = {}
-	if "activeClones" in player:
-		for timestamp in player['activeClones']:
-			active_clones[timestamp[0]] = timestamp[1]
+	active_clones = build_state_index(player.get('activeClones', []))
 	if "rotation" in player:
 		for skill in player["rotation"]:
 			skill_id = f"s{skill['id']}"
@@ -229,50 +349,85 @@ def determine_clone_usage(player, skill_map, mesmer_shatter_skills):
 					mesmer_clone_usage[name_prof][skill_name] = {}
 
 				for item in skill['skills']:
-					cast_time = item['castTime']
-					for key, value in reversed(list(active_clones.items())):
-						if key <= cast_time:
-							mesmer_clone_usage[name_prof][skill_name][value] = mesmer_clone_usage[name_prof][skill_name].get(value, 0) + 1 #value
-							break
+					# clone count at the time of the cast, casts before the first clone change are not counted
+					clones = state_at(active_clones, item['castTime'])
+					if clones is not None:
+						mesmer_clone_usage[name_prof][skill_name][clones] = mesmer_clone_usage[name_prof][skill_name].get(clones, 0) + 1
 
-def get_buff_states(buff_states: list) -> dict:
+def get_buff_states(buff_states: list, fight_duration: int = None) -> list:
 	"""
-	Convert a list of (time, state) pairs into a dictionary mapping start times to end times for a buff.
+	Convert a list of (time, state) pairs into the intervals during which a buff is active.
 
-	:param buff_states: A list of (time, state) pairs where state is 1 when the buff is active and 0 when it is inactive.
-	:return: A dictionary mapping start times to end times for the buff.
+	:param buff_states: A list of (time, state) pairs where state is the number of stacks, 0 when the buff is inactive.
+	:param fight_duration: The fight duration closing a buff still active at the end of the log, or None to leave it out.
+	:return: A list of [start, end] intervals.
 	"""
-	start_times = []
-	end_times = []
+	return to_active_intervals(buff_states, fight_duration)
 
-	for time, state in buff_states:
-		if time == 0 and state == 0:
-			continue
-		elif state == 1:
-			start_times.append(time)
-		elif state == 0:
-			end_times.append(time)
+def set_dps_engine(name: str) -> str:
+	"""
+	Select the engine used to calculate the DPS stats.
+
+	Args:
+		name (str): "auto" for NumPy when it is installed, or "numpy" or "python".
 
-	return dict(zip(start_times, end_times))
+	Returns:
+		str: The name of the active engine.
+	"""
+	global dps_engine
+	if name == "auto":
+		dps_engine = "numpy" if np is not None else "python"
+	elif name == "python" or (name == "numpy" and np is not None):
+		dps_engine = name
+	else:
+		print(f"DPS engine {name} is not available, using {dps_engine}")
+	return dps_engine
 
-def calculate_moving_average(data: list, window_size: int) -> list:
+def set_high_score_count(count: int) -> int:
 	"""
-	Calculate the moving average of a list of numbers with a specified window size.
+	Set the number of high scores kept per stat.
 
 	Args:
-		data (list): The list of numbers to calculate the moving average for.
-		window_size (int): The number of elements to include in the moving average calculation.
+		count (int): The number of high scores, negative values keep none.
 
 	Returns:
-		list: A list of the moving averages for each element in the input list.
+		int: The number of high scores kept.
+	"""
+	global high_score_count
+	high_score_count = max(0, count)
+	return high_score_count
+
+def set_burst_windows(windows: str) -> list:
 	"""
-	ma = []
-	for i in range(len(data)):
-		start_index = max(0, i - window_size)
-		end_index = min(len(data), i + window_size)
-		sub_data = data[start_index:end_index + 1]
-		ma.append(sum(sub_data) / len(sub_data))
-	return ma
+	Select the window lengths of the burst damage stats.
+
+	burstDamage and ch5CaBurstDamage are indexed by window length in seconds, so lengths that
+	are not selected stay 0.
+
+	Args:
+		windows (str): Comma separated seconds and ranges of seconds, e.g. "1-20, 30, 60".
+
+	Returns:
+		list: The selected window lengths, in ascending order.
+	"""
+	selected = set()
+	try:
+		for part in windows.split(","):
+			part = part.strip()
+			if not part:
+				continue
+			if "-" in part:
+				first, last = part.split("-", 1)
+				selected.update(range(int(first), int(last) + 1))
+			else:
+				selected.add(int(part))
+	except ValueError:
+		print(f"Invalid burst windows {windows}, keeping {burst_windows}")
+		return burst_windows
+	selected = sorted(seconds for seconds in selected if seconds > 0)
+	if selected:
+		burst_windows[:] = selected
+	return burst_windows
 
 def find_lowest(dict):
 	"""
@@ -309,89 +464,124 @@ def find_smallest_value(my_dict):
 	min_key = min(my_dict, key=my_dict.get)
 	return min_key
 
-def calculate_damage_during_buff(player, target_idx, buff_start, buff_end, damage_type):
-
+def get_debuff_damage(cumulative: list, intervals: list, increase: float) -> float:
 	"""
-	Calculate the damage a player did to a target during a given buff window.
+	Get the damage a debuff added to a cumulative damage series, with one O(1) window query per interval.
+
+	Intervals are widened to whole seconds, the floor of their start and the ceiling of their end,
+	except where two intervals meet: that boundary is rounded so no second is counted twice.
 
 	Args:
-		player (dict): A dictionary containing information about the player.
-		target_idx (int): The index of the target in the player's targets list.
-		buff_start (float): The start time of the buff window in milliseconds.
-		buff_end (float): The end time of the buff window in milliseconds.
-		damage_type (str): The type of damage to calculate (e.g. "dps", "powerDps", etc.).
+		cumulative (list): The cumulative damage series, e.g. a player's targetDamage1S phase on one target.
+		intervals (list): The [start, end, stacks] intervals of the debuff in milliseconds.
+		increase (float): The damage increase per stack, e.g. 0.10 for 10%.
 
 	Returns:
-		float: The damage the player did to the target during the buff window.
-	"""
-	start_idx = math.floor(buff_start / 1000)
-	end_idx = math.ceil(buff_end / 1000)
-
-	current_damage = player[damage_type][target_idx][0][end_idx] - player[damage_type][target_idx][0][start_idx]
-			
-	return current_damage
+		float: The damage gained from the debuff.
+	"""
+	last_tick = len(cumulative) - 1
+	damage_gained = 0
+	previous_end = None
+	for index, (start, end, stacks) in enumerate(intervals):
+		if start == previous_end:
+			start_tick = round(start / 1000)
+		else:
+			start_tick = math.floor(start / 1000)
+		if index + 1 < len(intervals) and intervals[index + 1][0] == end:
+			end_tick = round(end / 1000)
+		else:
+			end_tick = math.ceil(end / 1000)
+		end_tick = min(end_tick, last_tick)
+		if end_tick > start_tick:
+			damage_gained += window_sum(cumulative, start_tick, end_tick) * increase * stacks
+		previous_end = end
+	return damage_gained
 
-def check_target_for_buff_start_end(targets, players, damage_buff_ids):
+def set_damage_debuffs(debuffs: str) -> dict:
 	"""
-	Check each target for active buffs and calculate the total damage done by players during the buff duration.
+	Select the target debuffs whose damage increase is credited to their source as damage_gained in targetBuffs.
 
-	This function iterates over a list of targets and checks for specific buffs in each target. For each buff found,
-	it calculates the damage done by each player during the active duration of the buff. The damage is accumulated for
-	each player and stored in a global dictionary `debuff_damage`.
+	The damage series of the selected debuffs are decoded from the logs, see log_reader.set_kept_actor_keys.
 
 	Args:
-		targets (list): A list of target dictionaries containing buff information.
-		players (dict): A dictionary containing player information.
-		damage_buff_ids (set): A set of buff IDs that should be checked for damage calculation.
+		debuffs (str): Comma separated buff_id:increase:series entries, the increase being per stack and the series
+			one of targetDamage1S, targetPowerDamage1S or targetConditionDamage1S,
+			e.g. "b70350:0.10:targetDamage1S, b738:0.01:targetDamage1S".
 
 	Returns:
-		None
+		dict: The selected debuffs, [increase per stack, damage series] keyed by buff id.
+	"""
+	selected = {}
+	try:
+		for part in debuffs.split(","):
+			part = part.strip()
+			if not part:
+				continue
+			buff_id, increase, series = (value.strip() for value in part.split(":"))
+			if series not in ('targetDamage1S', 'targetPowerDamage1S', 'targetConditionDamage1S'):
+				raise ValueError(series)
+			if not buff_id.startswith('b'):
+				buff_id = 'b' + buff_id
+			selected[buff_id] = [float(increase), series]
+	except ValueError:
+		print(f"Invalid damage debuffs {debuffs}, keeping {get_damage_debuffs_setting()}")
+		return damage_debuffs
+	damage_debuffs.clear()
+	damage_debuffs.update(selected)
+	# the log reader skips some damage series unless a debuff reads them
+	log_reader.set_kept_actor_keys(series for _, series in damage_debuffs.values())
+	return damage_debuffs
+
+def get_damage_debuffs_setting() -> str:
 	"""
+	Returns:
+		str: The selected damage debuffs in the format read by set_damage_debuffs.
+	"""
+	return ", ".join(f"{buff_id}:{increase}:{series}" for buff_id, (increase, series) in damage_debuffs.items())
 
-	for target in targets:
-		if "buffs" in target:
-			for buff in target["buffs"]:
-				if buff['id'] in damage_buff_ids:
-					for player, phases in buff['statsPerSource'].items():
-						buff_start_time = None
-						total_damage = 0
-						for phase in phases:
-							if phase[1] != 0 and buff_start_time is None:
-								buff_start_time = phase[0]
-							elif phase[1] == 0 and buff_start_time is not None:
-								buff_end_time = phase[0]
-								damage, name_prof = calculate_damage_during_buff(players, target, player, buff_start_time, buff_end_time)
-								total_damage += damage
-								buff_start_time = None
-						if total_damage > 0:
-							if name_prof not in debuff_damage:
-								debuff_damage[name_prof] = {}
-							debuff_damage[name_prof][buff['id']] = debuff_damage[name_prof].get(buff['id'], 0) + total_damage
-
-def update_high_score(stat_name: str, key: str, value: float) -> None:
-	"""
-	Update the high scores dictionary with a new value if it is higher than the current lowest value.
+def update_high_score(stat_name: str, profession: str, name: str, account: str, fight_num: int, value: float, skill_id: int = None, target: int = None) -> None:
+	"""
+	Record a high score candidate for the fight being parsed.
+
+	Candidates are ranked into the high scores tables when the fight is merged
+	into the session, in fight order, so the result does not depend on which worker
+	finished first.
 
 	Args:
 		stat_name (str): The name of the stat to update.
-		key (str): The key to store the value under.
+		profession (str): The profession of the player.
+		name (str): The name of the player.
+		account (str): The account of the player.
+		fight_num (int): The fight number.
 		value (float): The value to store.
+		skill_id (int): The skill the value is for, or None. Defaults to None.
+		target (int): The index of the target the value is for, or None. Defaults to None.
 	"""
+	high_score_candidates.append((stat_name, {
+		"profession": profession,
+		"name": name,
+		"account": account,
+		"fight": fight_num,
+		"target": target,
+		"skill": skill_id,
+		"value": value,
+	}))
 
-	if stat_name not in high_scores:
-		high_scores[stat_name] = {}
+def rank_high_score(scores: dict, stat_name: str, record: dict) -> None:
+	"""
+	Add a high score record to the top high_score_count table of its stat.
 
-	if key in high_scores[stat_name]:
-		if value > high_scores[stat_name][key]:
-			high_scores[stat_name][key] = value
-	elif len(high_scores[stat_name]) < 5:
-		high_scores[stat_name][key] = value
-	else:
-		lowest_key = min(high_scores[stat_name], key=high_scores[stat_name].get)
-		lowest_value = high_scores[stat_name][lowest_key]
-		if value > lowest_value:
-			del high_scores[stat_name][lowest_key]
-			high_scores[stat_name][key] = value
+	A player keeps a single record per fight, target and skill, the highest.
+
+	Args:
+		scores (dict): The top-K tables of the high scores, keyed by stat name.
+		stat_name (str): The name of the stat to update.
+		record (dict): The high score record, see update_high_score.
+	"""
+	if stat_name not in scores:
+		scores[stat_name] = new_top_k(high_score_count)
+	identity = (record["profession"], record["name"], record["account"], record["fight"], record["target"], record["skill"])
+	push_top_k(scores[stat_name], identity, record)
 
 
 def determine_player_role(player_data: dict) -> str:
@@ -456,7 +646,7 @@ def get_commander_tag_data(fight_json):
 
 	for player in fight_json["players"]:
 		if player["hasCommanderTag"] and not player["notInSquad"]:
-			commander_name = f"{player['name']}|{player['profession']}|{get_player_account(player)}"
+			commander_name = get_actor(player)['name_prof']
 			if commander_name not in commander_summary_data:
 				commander_summary_data[commander_name] = {
 					'heal_stats': {},
@@ -482,131 +672,170 @@ def get_commander_tag_data(fight_json):
 
 	return commander_tag_positions, earliest_death_time, has_died
 
+def get_tag_distance_index(players: list, commander_tag_positions: list, inch_to_pixel: float) -> Optional[dict]:
+	"""
+	Build the tag distance index of the squad members with replay positions, keyed by id(player).
+
+	The ranges are On_Tag and Run_Back, in that order.
+
+	Args:
+		players (list): The players of the fight.
+		commander_tag_positions (list): Positions of the commander tag.
+		inch_to_pixel (float): Conversion factor between inches and pixels.
+
+	Returns:
+		Optional[dict]: The index, see tag_distance.py, or None when the fight has no commander positions.
+	"""
+	if not commander_tag_positions:
+		return None
+	tracks = {}
+	for player in players:
+		if player['notInSquad']:
+			continue
+		combat_data = player.get("combatReplayData", {})
+		if combat_data and "positions" in combat_data:
+			tracks[id(player)] = combat_data["positions"]
+	ranges = [On_Tag * inch_to_pixel, Run_Back * inch_to_pixel]
+	if dps_engine == "numpy":
+		return build_tag_distance_index_array(tracks, commander_tag_positions, ranges)
+	return build_tag_distance_index(tracks, commander_tag_positions, ranges)
+
 def get_player_death_on_tag(
-    player,
-    commander_tag_positions,
-    dead_tag_mark,
-    dead_tag,
-    inch_to_pixel,
-    polling_rate,
+	player,
+	commander_tag_positions,
+	tag_distances,
+	dead_tag_mark,
+	dead_tag,
+	inch_to_pixel,
+	polling_rate,
 ):
-    """
-    Calculate the distance to the commander tag for each player in the log,
-    and store it in the death_on_tag dictionary.
+	"""
+	Calculate the distance to the commander tag for each player in the log,
+	and store it in the death_on_tag dictionary.
 
-    Args:
-        player (dict): The player data.
-        commander_tag_positions (list[tuple[float, float]]): Positions of the commander tag.
-        dead_tag_mark (int): The mark at which the commander tag was last alive.
-        dead_tag (bool): Whether the commander tag was dead.
-        inch_to_pixel (float): Conversion factor between inches and pixels.
-        polling_rate (int): The rate at which the combat log is polled.
-    """
+	Also adds the player's combat time, and the part of it spent within the On_Tag
+	and Run_Back ranges of the tag.
 
-    # helpers
-    def safe_position(positions, idx):
-        """Return a valid position from positions with bounds checking."""
-        if not positions:
-            return (0, 0)
-        if idx < len(positions):
-            return positions[idx]
-        elif idx - 1 < len(positions):
-            return positions[idx - 1]
-        return positions[-1]
-
-    def avg_distance(positions, tag_positions, poll, inch_to_pixel):
-        """Return average distance between player and tag up to poll index."""
-        distances = [
-            math.hypot(px - tx, py - ty)
-            for (px, py), (tx, ty) in zip(positions[:poll], tag_positions[:poll])
-        ]
-        if not distances:
-            return 0
-        return round((sum(distances) / len(distances)) / inch_to_pixel)
-
-    # Setup player entry
-    name_prof = f"{player.get('name', 'Unknown')}|{player.get('profession', 'Unknown')}|{get_player_account(player)}"
-    if name_prof not in death_on_tag:
-        death_on_tag[name_prof] = {
-            "name": player.get("name", ""),
-            "profession": player.get("profession", ""),
-            "account": get_player_account(player),
-            "distToTag": [],
-            "On_Tag": 0,
-            "Off_Tag": 0,
-            "Run_Back": 0,
-            "After_Tag_Death": 0,
-            "Total": 0,
-            "Ranges": [],
-        }
-    entry = death_on_tag[name_prof]
-
-    # Distance to commander (static)
-    stats_all = player.get("statsAll", [{}])
-    dist_to_com = stats_all[0].get("distToCom", "Infinity")
-    player_dist_to_tag = 0 if dist_to_com == "Infinity" else round(dist_to_com)
-
-    # Combat replay data
-    combat_data = player.get("combatReplayData", {})
-    if not combat_data or "positions" not in combat_data:
-        return  # nothing to process
-
-    player_positions = combat_data["positions"]
-    player_deaths = dict(combat_data.get("dead", {}))
-    player_downs = dict(combat_data.get("down", {}))
-    player_offset = math.floor(combat_data.get("start", 0) / polling_rate)
-
-    if not (player_deaths and player_downs and commander_tag_positions):
-        return  # no useful data
-
-    # Process deaths
-    for death_key, death_value in player_deaths.items():
-        if death_key < 0:
-            continue  # before squad combat log starts
-
-        position_mark = max(0, math.floor(death_key / polling_rate)) - player_offset
-
-        for down_key, down_value in player_downs.items():
-			
-            if death_key != down_value:
-                continue
-
-            # Player & Tag positions at death
-            x1, y1 = safe_position(player_positions, position_mark)
-            x2, y2 = safe_position(commander_tag_positions, position_mark)
-
-            # Distance at death
-            death_distance = math.hypot(x1 - x2, y1 - y2)
-            death_range = round(death_distance / inch_to_pixel)
-            entry["Total"] += 1
-
-            # Average distance calculation
-            if int(down_key) > int(dead_tag_mark) and dead_tag:
-                # After commander tag death
-                player_dead_poll = max(1, int(dead_tag_mark / polling_rate))
-                player_dist_to_tag = avg_distance(
-                    player_positions, commander_tag_positions, player_dead_poll, inch_to_pixel
-                )
-                entry["After_Tag_Death"] += 1
-            else:
-                # Before tag death
-                player_dead_poll = position_mark
-                player_dist_to_tag = avg_distance(
-                    player_positions, commander_tag_positions, player_dead_poll, inch_to_pixel
-                )
-
-            # Classification
-            if death_range <= On_Tag:
-                entry["On_Tag"] += 1
-            elif death_range <= Run_Back:
-                entry["Off_Tag"] += 1
-                entry["Ranges"].append(death_range)
-            else:
-                entry["Run_Back"] += 1
+	Args:
+		player (dict): The player data.
+		commander_tag_positions (list[tuple[float, float]]): Positions of the commander tag.
+		tag_distances (dict): The tag distance index of the fight, see get_tag_distance_index.
+		dead_tag_mark (int): The mark at which the commander tag was last alive.
+		dead_tag (bool): Whether the commander tag was dead.
+		inch_to_pixel (float): Conversion factor between inches and pixels.
+		polling_rate (int): The rate at which the combat log is polled.
+	"""
+
+	# helpers
+	def safe_position(positions, idx):
+		"""Return a valid position from positions with bounds checking."""
+		if not positions:
+			return (0, 0)
+		if idx < len(positions):
+			return positions[idx]
+		elif idx - 1 < len(positions):
+			return positions[idx - 1]
+		return positions[-1]
+
+	def avg_distance(poll):
+		"""Return average distance between player and tag up to poll index."""
+		# same samples as zipping positions[:poll] with the tag positions
+		samples = len(range(tag_distances["count"][id(player)])[:poll])
+		return round(average_tag_distance(tag_distances, id(player), samples) / inch_to_pixel)
+
+	# Setup player entry
+	actor = get_actor(player)
+	name_prof = actor["name_prof"]
+	if name_prof not in death_on_tag:
+		death_on_tag[name_prof] = {
+			"name": actor["name"],
+			"profession": actor["profession"],
+			"account": actor["account"],
+			"distToTag": [],
+			"On_Tag": 0,
+			"Off_Tag": 0,
+			"Run_Back": 0,
+			"After_Tag_Death": 0,
+			"Total": 0,
+			"Ranges": [],
+			"Tag_Combat_Time": 0,
+			"On_Tag_Time": 0,
+			"Run_Back_Time": 0,
+		}
+	entry = death_on_tag[name_prof]
+
+	# Distance to commander (static)
+	stats_all = player.get("statsAll", [{}])
+	dist_to_com = stats_all[0].get("distToCom", "Infinity")
+	player_dist_to_tag = 0 if dist_to_com == "Infinity" else round(dist_to_com)
+
+	# Combat replay data
+	combat_data = player.get("combatReplayData", {})
+	if not combat_data or "positions" not in combat_data:
+		return  # nothing to process
+
+	player_positions = combat_data["positions"]
+	player_deaths = dict(combat_data.get("dead", {}))
+	player_downs = dict(combat_data.get("down", {}))
+	player_offset = math.floor(combat_data.get("start", 0) / polling_rate)
+
+	# Combat time within range of the tag, sampled every polling rate from the start of the replay
+	if tag_distances is not None:
+		replay_start = combat_data.get("start", 0)
+		for combat_start, combat_end in actor["breakpoints"]:
+			start_poll = math.ceil((combat_start - replay_start) / polling_rate)
+			end_poll = math.ceil((combat_end - replay_start) / polling_rate)
+			entry["Tag_Combat_Time"] += count_samples(tag_distances, id(player), start_poll, end_poll) * polling_rate
+			entry["On_Tag_Time"] += count_in_range(tag_distances, id(player), 0, start_poll, end_poll) * polling_rate
+			entry["Run_Back_Time"] += count_in_range(tag_distances, id(player), 1, start_poll, end_poll) * polling_rate
+
+	if not (player_deaths and player_downs and commander_tag_positions):
+		return  # no useful data
+
+	# Process deaths
+	for death_key, death_value in player_deaths.items():
+		if death_key < 0:
+			continue  # before squad combat log starts
+
+		position_mark = max(0, math.floor(death_key / polling_rate)) - player_offset
 
-    # Record static distance
-    if player_dist_to_tag <= Run_Back:
-        entry["distToTag"].append(player_dist_to_tag)
+		for down_key, down_value in player_downs.items():
+
+			if death_key != down_value:
+				continue
+
+			# Player & Tag positions at death
+			x1, y1 = safe_position(player_positions, position_mark)
+			x2, y2 = safe_position(commander_tag_positions, position_mark)
+
+			# Distance at death
+			death_distance = math.hypot(x1 - x2, y1 - y2)
+			death_range = round(death_distance / inch_to_pixel)
+			entry["Total"] += 1
+
+			# Average distance calculation
+			if int(down_key) > int(dead_tag_mark) and dead_tag:
+				# After commander tag death
+				player_dead_poll = max(1, int(dead_tag_mark / polling_rate))
+				player_dist_to_tag = avg_distance(player_dead_poll)
+				entry["After_Tag_Death"] += 1
+			else:
+				# Before tag death
+				player_dead_poll = position_mark
+				player_dist_to_tag = avg_distance(player_dead_poll)
+
+			# Classification
+			if death_range <= On_Tag:
+				entry["On_Tag"] += 1
+			elif death_range <= Run_Back:
+				entry["Off_Tag"] += 1
+				entry["Ranges"].append(death_range)
+			else:
+				entry["Run_Back"] += 1
+
+	# Record static distance
+	if player_dist_to_tag <= Run_Back:
+		entry["distToTag"].append(player_dist_to_tag)
 
 
 def get_player_fight_dps(dpsTargets: dict, name: str, profession: str, account: str, fight_num: int, fight_time: int) -> None:
@@ -625,7 +854,7 @@ def get_player_fight_dps(dpsTargets: dict, name: str, profession: str, account:
 
 	update_high_score(
 		"fight_dps",
-		"{{"+profession+"}}"+name+"-"+str(account)+"-"+str(fight_num)+"-DPS",
+		profession, name, account, fight_num,
 		target_damage
 		)
 
@@ -728,6 +957,287 @@ def sum_breakpoints(breakpoints):
 		combat_time += end - start
 	return combat_time
 
+def get_actor(player):
+	"""
+	Get the per-fight index entry of a player, building it on first use.
+
+	The entry holds what the parser stages would otherwise recompute for every lookup:
+	the identity keys, the combat time breakpoints and combat time, the party and the commander flag.
+
+	Args:
+		player (dict): The player data from the log
+
+	Returns:
+		dict: The actor entry of the player
+	"""
+	actor = fight_actors.get(id(player))
+	if actor is not None and actor['player'] is player:
+		return actor
+
+	name = player['name']
+	profession = player['profession']
+	account = get_player_account(player)
+	breakpoints = get_combat_time_breakpoints(player)
+	combat_time_ms = sum_breakpoints(breakpoints)
+	actor = {
+		'player': player,
+		'name': name,
+		'profession': profession,
+		'account': account,
+		'name_prof': f"{name}|{profession}|{account}",
+		'dps_key': f"{profession} {name} {account}",
+		'breakpoints': breakpoints,
+		'combat_time_ms': combat_time_ms,
+		'combat_time': round(combat_time_ms / 1000),
+		'group': player.get('group'),
+		'commander': bool(player.get('hasCommanderTag')) and not player.get('notInSquad'),
+	}
+	fight_actors[id(player)] = actor
+	return actor
+
+def build_actor_index(players):
+	"""
+	Build the actor index of a fight for its squad members, replacing the previous fight's index.
+
+	Args:
+		players (list): The players of the fight
+
+	Returns:
+		list: The actor entries of the squad members, in log order
+	"""
+	fight_actors.clear()
+	return [get_actor(player) for player in players if not player['notInSquad']]
+
+def index_actor_names(players):
+	"""
+	Index the players of a fight by character name, for the events that only name their actor.
+
+	When two players share a name the later one is kept.
+
+	Args:
+		players (list): The players of the fight
+
+	Returns:
+		dict: The "profession|name|account" key of each player, keyed by name
+	"""
+	return {player['name']: f"{player['profession']}|{player['name']}|{get_player_account(player)}" for player in players}
+
+def add_stat_facts(fight_num: int, name_prof: str, stat_category: str, key, stats: dict, levels: int = FACT_PLAYER | FACT_FIGHT, group: str = None) -> None:
+	"""
+	Append a player's stats to the fact table of the fight.
+
+	Args:
+		fight_num (int): The fight number.
+		name_prof (str): The name_prof key of the player.
+		stat_category (str): The stat category.
+		key: The skill, buff or modifier id the stats belong to, None for stats stored directly in the category.
+		stats (dict): The stat values keyed by stat name.
+		levels (int): The rollups the stats are added to, see FACT_PLAYER, FACT_FIGHT and FACT_GROUP.
+			Defaults to the player, fight and overall totals.
+		group (str): The squad group of the player, used by FACT_GROUP. Defaults to None.
+	"""
+	if not stats:
+		return
+	stat_names = tuple(stats)
+	batch_stat_codes = stat_fact_codes["stat_names"].get(stat_names)
+	if batch_stat_codes is None:
+		stat_codes = stat_fact_codes["stat"]
+		batch_stat_codes = stat_fact_codes["stat_names"][stat_names] = array('l', [stat_codes.setdefault(stat, len(stat_codes)) for stat in stat_names])
+	stat_facts["stat"].extend(batch_stat_codes)
+	stat_facts["value"].extend(stats.values())
+	stat_fact_batches["count"].append(len(stat_names))
+	stat_fact_batches["float"].append(float in map(type, stats.values()))
+	for level, flag, level_key in (("player", FACT_PLAYER, name_prof), ("fight", FACT_FIGHT, fight_num), ("group", FACT_GROUP, group)):
+		if levels & flag:
+			totals_codes = stat_fact_codes[level]
+			stat_fact_batches[level].append(totals_codes.setdefault((level_key, stat_category, key), len(totals_codes)))
+		else:
+			stat_fact_batches[level].append(-1)
+
+def clear_stat_facts() -> None:
+	"""
+	Empty the fact table of the fight.
+	"""
+	for columns in (stat_facts, stat_fact_batches):
+		for column in columns.values():
+			del column[:]
+	for codes in stat_fact_codes.values():
+		codes.clear()
+
+def group_stat_facts(level: str, columns: dict) -> list:
+	"""
+	Reduce the facts of a rollup level per totals and stat name, with one grouped sum over the fact columns.
+
+	The sums run in fact order, so they match adding the values one at a time, and groups of int values stay int.
+	'max' and 'min' of the categories in merge_extreme_value_keys keep the extreme value, which is only set
+	by a max above 0 or a min of 0 or less.
+
+	Args:
+		level (str): The rollup level, "player", "fight" or "group".
+		columns (dict): The "batch" of each fact, and with the numpy engine the fact "value" and "float" flag arrays.
+
+	Returns:
+		list: A (fact, totals code, stat code, value) tuple per group that sets a value, ordered by the fact that first sets it.
+	"""
+	batch_codes = stat_fact_batches[level]
+	values = stat_facts["value"]
+	stat_names = list(stat_fact_codes["stat"])
+	extreme_totals = [stat_category in merge_extreme_value_keys for _, stat_category, _ in stat_fact_codes[level]]
+	stat_extremes = [1 if stat == 'max' else -1 if stat == 'min' else 0 for stat in stat_names]
+
+	if dps_engine == "numpy":
+		stat_count = len(stat_names)
+		fact_codes = np.asarray(batch_codes)[columns["batch"]]
+		facts = np.flatnonzero(fact_codes >= 0)
+		if not len(facts):
+			return []
+		fact_totals = fact_codes[facts]
+		fact_stats = np.asarray(stat_facts["stat"])[facts]
+		group_codes = fact_totals * stat_count + fact_stats
+		#index the groups by their code directly unless the code space is much larger than the facts
+		code_count = len(extreme_totals) * stat_count
+		if code_count <= 4 * len(facts):
+			codes, inverse = None, group_codes
+			group_count = code_count
+		else:
+			codes, inverse = np.unique(group_codes, return_inverse=True)
+			inverse = inverse.ravel()
+			group_count = len(codes)
+		group_facts = np.full(group_count, len(values))
+		np.minimum.at(group_facts, inverse, facts)
+		group_values = np.bincount(inverse, weights=columns["value"][facts], minlength=group_count)
+		float_groups = np.zeros(group_count, dtype=bool)
+		float_groups[inverse[columns["float"][facts]]] = True
+
+		fact_extremes = np.array(stat_extremes)[fact_stats] * np.array(extreme_totals)[fact_totals]
+		extreme_facts = np.flatnonzero(fact_extremes)
+		if len(extreme_facts):
+			fact_groups = inverse[extreme_facts]
+			fact_values = columns["value"][facts[extreme_facts]]
+			is_max = fact_extremes[extreme_facts] > 0
+			group_values[fact_groups[is_max]] = -np.inf
+			group_values[fact_groups[~is_max]] = np.inf
+			np.maximum.at(group_values, fact_groups[is_max], fact_values[is_max])
+			np.minimum.at(group_values, fact_groups[~is_max], fact_values[~is_max])
+			setting = np.where(is_max, fact_values > 0, fact_values <= 0)
+			group_facts[fact_groups] = len(values)
+			np.minimum.at(group_facts, fact_groups[setting], facts[extreme_facts][setting])
+
+		kept = np.flatnonzero(group_facts < len(values))
+		kept = kept[np.argsort(group_facts[kept])]
+		kept_codes = kept if codes is None else codes[kept]
+		kept_values = group_values[kept]
+		rolled_values = kept_values.astype(np.int64).tolist()
+		for index in np.flatnonzero(float_groups[kept]).tolist():
+			rolled_values[index] = float(kept_values[index])
+		return list(zip(group_facts[kept].tolist(), (kept_codes // stat_count).tolist(), (kept_codes % stat_count).tolist(), rolled_values))
+
+	groups = {}
+	for fact, (batch, stat_code, value) in enumerate(zip(columns["batch"], stat_facts["stat"], values)):
+		totals_code = batch_codes[batch]
+		if totals_code < 0:
+			continue
+		extreme = stat_extremes[stat_code] if extreme_totals[totals_code] else 0
+		group = groups.get((totals_code, stat_code))
+		if group is None:
+			group = groups[(totals_code, stat_code)] = [len(values) if extreme else fact, totals_code, stat_code, value if extreme else 0 + value]
+		elif extreme > 0:
+			group[3] = max(group[3], value)
+		elif extreme < 0:
+			group[3] = min(group[3], value)
+		else:
+			group[3] += value
+		if extreme and fact < group[0] and (value > 0 if extreme > 0 else value <= 0):
+			group[0] = fact
+	return sorted((tuple(group) for group in groups.values() if group[0] < len(values)), key=lambda group: group[0])
+
+def rollup_stat_facts() -> None:
+	"""
+	Materialise the player, fight, overall and group totals of top_stats from the fact table, then empty it.
+
+	Each rollup level is one grouped sum, see group_stat_facts. The totals are written in the order of the
+	fact that first sets them, so top_stats gets the same totals and key order as adding each value as it
+	is read. The overall totals are added from the fight totals.
+	"""
+	batch_counts = stat_fact_batches["count"]
+	if dps_engine == "numpy":
+		values = stat_facts["value"]
+		fact_batches = np.repeat(np.arange(len(batch_counts)), batch_counts)
+		#only the batches with a float value need their facts' types checked
+		float_facts = np.flatnonzero(np.asarray(stat_fact_batches["float"], dtype=bool)[fact_batches])
+		columns = {
+			"batch": fact_batches,
+			"value": np.array(values, dtype=float),
+			"float": np.zeros(len(values), dtype=bool),
+		}
+		columns["float"][float_facts] = [type(values[fact]) is float for fact in float_facts.tolist()]
+	else:
+		columns = {"batch": [batch for batch, count in enumerate(batch_counts) for _ in range(count)]}
+	stat_names = list(stat_fact_codes["stat"])
+
+	player_totals = list(stat_fact_codes["player"])
+	for _, totals_code, stat_code, value in group_stat_facts("player", columns):
+		name_prof, stat_category, key = player_totals[totals_code]
+		add_rollup_value(get_stat_totals(top_stats['player'][name_prof], stat_category, key), stat_names[stat_code], value, stat_category)
+
+	#the overall totals of a category hold both the fight totals and the "group" totals, write them in fact order
+	updates = []
+	for rank, level in enumerate(("fight", "group")):
+		level_totals = list(stat_fact_codes[level])
+		for fact, totals_code, stat_code, value in group_stat_facts(level, columns):
+			updates.append((int(columns["batch"][fact]), rank, fact, level, level_totals[totals_code], stat_names[stat_code], value))
+	updates.sort(key=lambda update: update[:3])
+	for _, _, _, level, (level_key, stat_category, key), stat, value in updates:
+		if level == "fight":
+			add_rollup_value(get_stat_totals(top_stats['fight'][level_key], stat_category, key), stat, value, stat_category)
+			add_rollup_value(get_stat_totals(top_stats['overall'], stat_category, key), stat, value, stat_category)
+		else:
+			group_stats = top_stats['overall'].setdefault(stat_category, {}).setdefault("group", {})
+			add_rollup_value(get_stat_totals(group_stats, level_key, key), stat, value, stat_category)
+
+	clear_stat_facts()
+
+def add_rollup_value(totals: dict, stat: str, value, stat_category: str) -> None:
+	"""
+	Add a rolled up value to totals, keeping the larger 'max' and the smaller 'min' of the categories in merge_extreme_value_keys.
+
+	Args:
+		totals (dict): The totals, updated in place.
+		stat (str): The stat name.
+		value: The rolled up value.
+		stat_category (str): The stat category of the totals.
+	"""
+	if stat_category in merge_extreme_value_keys and stat == 'max':
+		if value > totals.get(stat, 0):
+			totals[stat] = value
+	elif stat_category in merge_extreme_value_keys and stat == 'min':
+		if value <= totals.get(stat, 0):
+			totals[stat] = value
+	else:
+		totals[stat] = totals.get(stat, 0) + value
+
+def get_stat_totals(parent: dict, stat_category: str, key) -> dict:
+	"""
+	Get the totals of a stat category in a parent dict, under key when one is given.
+
+	Args:
+		parent (dict): The player, fight or overall stats, or the group totals of a category.
+		stat_category (str): The stat category, or the squad group.
+		key: The skill, buff or modifier id, or None for the category itself.
+
+	Returns:
+		dict: The totals, created when missing.
+	"""
+	totals = parent.get(stat_category)
+	if totals is None:
+		totals = parent[stat_category] = {}
+	if key is None:
+		return totals
+	key_totals = totals.get(key)
+	if key_totals is None:
+		key_totals = totals[key] = {}
+	return key_totals
+
 def split_boon_states(states, duration):
 	"""
 	Split boon states into individual start/end times and stack counts.
@@ -737,19 +1247,9 @@ def split_boon_states(states, duration):
 		duration (int): Duration of the fight in milliseconds
 
 	Returns:
-		list: List of (start, end, stack_count) tuples
+		list: List of (start, end, stack_count) tuples, each state ending at the next one or at the duration
 	"""
-	split_states = []
-	num_states = len(states) - 1
-	for index, (start, stacks) in enumerate(states):
-		# If this is the last state, end at the duration
-		if index == num_states:
-			if start < duration:
-				split_states.append([start, duration, stacks])
-		else:
-			# Otherwise, end at the next state's start time
-			split_states.append([start, min(states[index + 1][0], duration), stacks])
-	return split_states
+	return to_step_intervals(states, duration)
 
 def split_boon_states_by_combat_breakpoints(states, breakpoints, duration):
 	"""
@@ -766,41 +1266,7 @@ def split_boon_states_by_combat_breakpoints(states, breakpoints, duration):
 	if not breakpoints:
 		return []
 
-	breakpoints_copy = breakpoints[:]
-	split_states = split_boon_states(states, duration)
-	new_states = []
-
-	while(len(breakpoints_copy) > 0 and len(split_states) > 0):
-		[combat_start, combat_end] = breakpoints_copy.pop(0)
-		[start_state, end_state, stacks] = split_states.pop(0)
-
-		while(end_state < combat_start):
-			if len(split_states) == 0:
-				break
-			[start_state, end_state, stacks] = split_states.pop(0)
-
-		if end_state < combat_start:
-			break
-
-		new_start = combat_start if combat_start > start_state else start_state
-		new_end = combat_end if combat_end < end_state else end_state
-		if new_end > new_start:
-			new_states.append([new_start, new_end, stacks])
-
-		while(len(split_states) > 0 and split_states[0][1] <= combat_end):
-			[start_state, end_state, stacks] = split_states.pop(0)
-
-			new_start = combat_start if combat_start > start_state else start_state
-			new_end = combat_end if combat_end < end_state else end_state
-
-			if new_end > new_start:
-				new_states.append([
-					combat_start if combat_start > start_state else start_state,
-					combat_end if combat_end < end_state else end_state,
-					stacks
-				])
-
-	return new_states
+	return intersect(split_boon_states(states, duration), breakpoints)
 
 def get_stacking_uptime_data(player, damagePS, duration, fight_ticks):
 	"""
@@ -813,11 +1279,12 @@ def get_stacking_uptime_data(player, damagePS, duration, fight_ticks):
 		'b1122': "Stability", 'b719': "Swiftness", 'b26980': "Resistance", 'b873': "Resolution"
 	}
 
-	player_prof_name = f"{player['name']}|{player['profession']}|{get_player_account(player)}"
+	actor = get_actor(player)
+	player_prof_name = actor['name_prof']
 
 	if player_prof_name not in stacking_uptime_Table:
 		stacking_uptime_Table[player_prof_name] = {}
-		stacking_uptime_Table[player_prof_name]["account"] = get_player_account(player)
+		stacking_uptime_Table[player_prof_name]["account"] = actor['account']
 		stacking_uptime_Table[player_prof_name]["name"] = player['name']
 		stacking_uptime_Table[player_prof_name]["profession"] = player['profession']
 		stacking_uptime_Table[player_prof_name]["duration_Might"] = 0
@@ -828,29 +1295,66 @@ def get_stacking_uptime_data(player, damagePS, duration, fight_ticks):
 			buff_name = boons[buff_id]
 			stacking_uptime_Table[player_prof_name]["damage_with_"+buff_name] = [0] * 26 if buff_name == 'Might' else [0] * 2
 		
-	player_damage = damagePS
-	player_damage_per_tick = [player_damage[0]]
-	for fight_tick in range(fight_ticks - 1):
-		player_damage_per_tick.append(player_damage[fight_tick + 1] - player_damage[fight_tick])
-
-	player_combat_breakpoints = get_combat_time_breakpoints(player)
+	player_combat_breakpoints = actor['breakpoints']
 
+	boon_states = []
 	for item in player['buffUptimesActive']:
 		buffId = "b"+str(item['id'])	
 		if buffId not in boons:
 			continue
 
-		buff_name = boons[buffId]
-
 		states = split_boon_states_by_combat_breakpoints(item['states'], player_combat_breakpoints, duration*1000)
+		boon_states.append((boons[buffId], states))
+
+	# the damage of every state of every tracked boon, in a single pass over the cumulative damage
+	state_damage = get_boon_state_damage([states for _, states in boon_states], damagePS[:fight_ticks])
 
+	for (buff_name, states), damage_by_state in zip(boon_states, state_damage):
 		total_time = 0
-		for idx, [state_start, state_end, stacks] in enumerate(states):
+		for [state_start, state_end, stacks], damage_with_stacks in zip(states, damage_by_state):
 			if buff_name in ['Stability', 'Might']:
 				uptime = state_end - state_start
 				total_time += uptime
 				stacking_uptime_Table[player_prof_name][buff_name][min(stacks, 25)] += uptime
 
+			if buff_name == 'Might':
+				stacking_uptime_Table[player_prof_name]["damage_with_"+buff_name][min(stacks, 25)] += damage_with_stacks
+			else:
+				stacking_uptime_Table[player_prof_name]["damage_with_"+buff_name][min(stacks, 1)] += damage_with_stacks
+
+		if buff_name in ['Stability', 'Might']:
+			stacking_uptime_Table[player_prof_name]["duration_"+buff_name] += total_time
+
+def get_boon_state_damage(boon_states: list, player_damage: list) -> list:
+	"""
+	Attribute a player's damage to the states of several boons at once.
+
+	Damage is spread evenly over each second of the cumulative series, so the damage of an interval is
+	read from the cumulative series in O(1) instead of summing the seconds it spans. The first state of a
+	boon also gets the damage done before it, the last state the damage done after it, and a state
+	followed by a gap, usually a death, the damage done during the gap.
+
+	Args:
+		boon_states (list): The [start, end, stacks] states of each boon, split by combat breakpoints.
+		player_damage (list): The player's cumulative damage per second.
+
+	Returns:
+		list: The damage done during each state, for each boon in order.
+	"""
+	if dps_engine == "numpy" and any(boon_states):
+		return get_boon_state_damage_array(boon_states, player_damage)
+
+	# damage_before[tick] is the damage done before the tick, damage_per_tick[tick] the damage done on it
+	damage_before = [0]
+	damage_before.extend(player_damage)
+	damage_per_tick = to_deltas(player_damage)
+	fight_damage = damage_before[-1]
+
+	boon_damage = []
+	for states in boon_states:
+		state_damage = []
+		last_idx = len(states) - 1
+		for idx, [state_start, state_end, stacks] in enumerate(states):
 			start_sec = state_start / 1000
 			end_sec = state_end / 1000
 
@@ -860,41 +1364,302 @@ def get_stacking_uptime_data(player, damagePS, duration, fight_ticks):
 			end_sec_int = int(end_sec)
 			end_sec_rem = end_sec - end_sec_int
 
-			damage_with_stacks = 0
 			if start_sec_int == end_sec_int:
-				damage_with_stacks = player_damage_per_tick[start_sec_int] * (end_sec - start_sec)
+				damage_with_stacks = damage_per_tick[start_sec_int] * (end_sec - start_sec)
 			else:
-				damage_with_stacks = player_damage_per_tick[start_sec_int] * (1.0 - start_sec_rem)
-				damage_with_stacks += sum(player_damage_per_tick[start_sec_int + s] for s in range(1, end_sec_int - start_sec_int))
-				damage_with_stacks += player_damage_per_tick[end_sec_int] * end_sec_rem
+				damage_with_stacks = damage_per_tick[start_sec_int] * (1.0 - start_sec_rem)
+				damage_with_stacks += damage_before[end_sec_int] - damage_before[start_sec_int + 1]
+				damage_with_stacks += damage_per_tick[end_sec_int] * end_sec_rem
 
 			if idx == 0:
 				# Get any damage before we have boon states
-				damage_with_stacks += player_damage_per_tick[start_sec_int] * (start_sec_rem)
-				damage_with_stacks += sum(player_damage_per_tick[s] for s in range(0, start_sec_int))
-			if idx == len(states) - 1:
+				damage_with_stacks += damage_per_tick[start_sec_int] * (start_sec_rem)
+				damage_with_stacks += damage_before[start_sec_int]
+			if idx == last_idx:
 				# leave this as if, not elif, since we can have 1 state which is both the first and last
 				# Get any damage after we have boon states
-				damage_with_stacks += player_damage_per_tick[end_sec_int] * (1.0 - end_sec_rem)
-				damage_with_stacks += sum(player_damage_per_tick[s] for s in range(end_sec_int + 1, len(player_damage_per_tick)))
-			elif len(states) > 1 and state_end != states[idx + 1][0]:
+				damage_with_stacks += damage_per_tick[end_sec_int] * (1.0 - end_sec_rem)
+				damage_with_stacks += fight_damage - damage_before[end_sec_int + 1]
+			elif state_end != states[idx + 1][0]:
 				# Get any damage between deaths, this is usually a small amount of condis that are still ticking after death
-				next_state_start = states[idx + 1][0]
-				next_state_sec = next_state_start / 1000
+				next_state_sec = states[idx + 1][0] / 1000
 				next_start_sec_int = int(next_state_sec)
 				next_start_sec_rem = next_state_sec - next_start_sec_int
 
-				damage_with_stacks += player_damage_per_tick[end_sec_int] * (1.0 - end_sec_rem)
-				damage_with_stacks += sum(player_damage_per_tick[s] for s in range(end_sec_int + 1, next_start_sec_int))
-				damage_with_stacks += player_damage_per_tick[next_start_sec_int] * (next_start_sec_rem)
+				damage_with_stacks += damage_per_tick[end_sec_int] * (1.0 - end_sec_rem)
+				if next_start_sec_int > end_sec_int + 1:
+					damage_with_stacks += damage_before[next_start_sec_int] - damage_before[end_sec_int + 1]
+				damage_with_stacks += damage_per_tick[next_start_sec_int] * (next_start_sec_rem)
+			state_damage.append(damage_with_stacks)
+		boon_damage.append(state_damage)
+	return boon_damage
 
-			if buff_name == 'Might':
-				stacking_uptime_Table[player_prof_name]["damage_with_"+buff_name][min(stacks, 25)] += damage_with_stacks
-			else:
-				stacking_uptime_Table[player_prof_name]["damage_with_"+buff_name][min(stacks, 1)] += damage_with_stacks
+def get_boon_state_damage_array(boon_states: list, player_damage: list) -> list:
+	"""
+	Calculate the same state damage as get_boon_state_damage for all states of all boons in one NumPy pass.
 
-		if buff_name in ['Stability', 'Might']:
-			stacking_uptime_Table[player_prof_name]["duration_"+buff_name] += total_time
+	Args:
+		boon_states (list): The [start, end, stacks] states of each boon, split by combat breakpoints.
+		player_damage (list): The player's cumulative damage per second.
+
+	Returns:
+		list: The damage done during each state, for each boon in order.
+	"""
+	damage_before = np.concatenate(([0], np.asarray(player_damage, dtype=np.int64)))
+	damage_per_tick = to_deltas_array(damage_before[1:])
+	fight_ticks = len(damage_per_tick)
+
+	state_counts = [len(states) for states in boon_states]
+	states = np.array([state for boon in boon_states for state in boon], dtype=np.int64).reshape(-1, 3)
+	starts = states[:, 0]
+	ends = states[:, 1]
+	lasts = np.zeros(len(states), dtype=bool)
+	lasts[np.cumsum(state_counts)[np.array(state_counts) > 0] - 1] = True
+	firsts = np.zeros(len(states), dtype=bool)
+	firsts[np.concatenate(([0], np.cumsum(state_counts)[:-1]))[np.array(state_counts) > 0]] = True
+	next_starts = np.where(lasts, ends, np.roll(starts, -1))
+	gaps = ~lasts & (ends != next_starts)
+
+	start_sec = starts / 1000
+	end_sec = ends / 1000
+	next_sec = next_starts / 1000
+	start_sec_int = start_sec.astype(np.int64)
+	end_sec_int = end_sec.astype(np.int64)
+	next_sec_int = next_sec.astype(np.int64)
+	start_sec_rem = start_sec - start_sec_int
+	end_sec_rem = end_sec - end_sec_int
+	next_sec_rem = next_sec - next_sec_int
+	after_end = np.minimum(end_sec_int + 1, fight_ticks)
+
+	start_tick_damage = damage_per_tick[start_sec_int]
+	end_tick_damage = damage_per_tick[end_sec_int]
+	# the terms are added in the order of get_boon_state_damage so both engines give the same floats
+	damage = np.where(
+		start_sec_int == end_sec_int,
+		start_tick_damage * (end_sec - start_sec),
+		start_tick_damage * (1.0 - start_sec_rem) + (damage_before[end_sec_int] - damage_before[np.minimum(start_sec_int + 1, end_sec_int)]) + end_tick_damage * end_sec_rem,
+	)
+	damage = damage + np.where(firsts, start_tick_damage * start_sec_rem, 0.0)
+	damage = damage + np.where(firsts, damage_before[start_sec_int], 0)
+	damage = damage + np.where(lasts | gaps, end_tick_damage * (1.0 - end_sec_rem), 0.0)
+	damage = damage + np.where(lasts, damage_before[-1] - damage_before[after_end], 0)
+	damage = damage + np.where(gaps & (next_sec_int > after_end), damage_before[next_sec_int] - damage_before[np.minimum(after_end, next_sec_int)], 0)
+	damage = damage + np.where(gaps, damage_per_tick[next_sec_int] * next_sec_rem, 0.0)
+
+	damage = damage.tolist()
+	boon_damage = []
+	position = 0
+	for count in state_counts:
+		boon_damage.append(damage[position:position + count])
+		position += count
+	return boon_damage
+
+def add_window_damage(window_damage, target_damage, windows: list) -> None:
+	"""
+	Add each player's per tick damage on a target during a set of [start, end) tick windows.
+
+	Ticks covered by several windows are added once per window, like adding the windows one by one.
+
+	Args:
+		window_damage (np.ndarray): The per tick damage to add to, one row per player.
+		target_damage (np.ndarray): Cumulative damage on the target per tick, one row per player.
+		windows (list): [start, end) tick index pairs.
+	"""
+	coverage = np.zeros(target_damage.shape[1], dtype=np.int64)
+	for start, end in windows:
+		if end > start:
+			coverage[start] += 1
+			coverage[end] -= 1
+	coverage = np.cumsum(coverage)[:-1]
+	if coverage.any():
+		window_damage[:, :-1] += to_deltas_array(target_damage)[:, 1:] * coverage
+
+def calculate_dps_stats_numpy(fight_json) -> bool:
+	"""
+	Calculate the DPS stats of calculate_dps_stats with array operations.
+
+	The cumulative damage of every squad player on every enemy target is loaded into a
+	players x targets x ticks array once. Damage is integer, so every sum gives exactly the
+	numbers of the Python engine; the only float stat, coordination damage, is accumulated
+	tick by tick in the same order.
+
+	Args:
+		fight_json (dict): The fight log.
+
+	Returns:
+		bool: Whether the stats were calculated, False when the damage series cannot be loaded
+			as an integer array and the Python engine has to be used.
+	"""
+	CHUNK_DAMAGE_SECONDS = 21
+	players = fight_json['players']
+	targets = fight_json['targets']
+	fight_ticks = len(players[0]["damage1S"][0])
+	duration = round(fight_json['durationMS']/1000)
+
+	enemy_indexes = [index for index, target in enumerate(targets) if 'enemyPlayer' in target]
+	squad_actors = [get_actor(player) for player in players if not player['notInSquad']]
+	squad_players = [actor['player'] for actor in squad_actors]
+	if not enemy_indexes or not squad_players:
+		return False
+	try:
+		target_damage = np.array([
+			[player["targetDamage1S"][index][0] for index in enemy_indexes]
+			for player in squad_players
+		])
+	except ValueError:
+		return False
+	if target_damage.dtype.kind not in "iu" or target_damage.shape[2] != fight_ticks:
+		return False
+	enemy_positions = {index: position for position, index in enumerate(enemy_indexes)}
+
+	# players sharing a name, profession and account share their damage, like the keyed lists of the Python engine
+	player_keys = [actor['dps_key'] for actor in squad_actors]
+	key_rows = {}
+	player_rows = np.array([key_rows.setdefault(key, len(key_rows)) for key in player_keys])
+	damage_ps = np.zeros((len(key_rows), fight_ticks), dtype=np.int64)
+	np.add.at(damage_ps, player_rows, target_damage.sum(axis=1))
+
+	combat_times = [actor['combat_time'] for actor in squad_actors]
+	active = [position for position, combat_time in enumerate(combat_times) if combat_time]
+	active_rows = player_rows[active]
+
+	squad_damage_per_tick = to_deltas_array(damage_ps[active_rows].sum(axis=0))[1:]
+	squad_damage_total = int(squad_damage_per_tick.sum())
+	squad_damage_per_tick_ma = moving_average_array(squad_damage_per_tick, 1)
+	squad_damage_ma_total = sum(squad_damage_per_tick_ma.tolist())
+
+	if squad_damage_ma_total:
+		squad_damage_percent = squad_damage_per_tick_ma / squad_damage_ma_total
+	else:
+		squad_damage_percent = np.zeros(len(squad_damage_per_tick_ma))
+
+	ch5_ca_damage_1s = np.zeros((len(key_rows), fight_ticks), dtype=np.int64)
+
+	for position in active:
+		player = squad_players[position]
+		player_prof_name = player_keys[position]
+		combat_time = combat_times[position]
+		if player_prof_name not in DPSStats:
+			DPSStats[player_prof_name] = {
+				"account": squad_actors[position]['account'],
+				"name": player["name"],
+				"profession": player["profession"],
+				"duration": 0,
+				"combatTime": 0,
+				"coordinationDamage": 0,
+				"chunkDamage": [0] * CHUNK_DAMAGE_SECONDS,
+				"chunkDamageTotal": [0] * CHUNK_DAMAGE_SECONDS,
+				"carrionDamage": 0,
+				"carrionDamageTotal": 0,
+				"damageTotal": 0,
+				"squadDamageTotal": 0,
+				"burstDamage": [0] * (max(burst_windows) + 1),
+				"ch5CaBurstDamage": [0] * (max(burst_windows) + 1),
+				"downs": 0,
+				"kills": 0,
+			}
+
+		player_damage = damage_ps[player_rows[position]]
+
+		DPSStats[player_prof_name]["duration"] += duration
+		DPSStats[player_prof_name]["combatTime"] += combat_time
+		DPSStats[player_prof_name]["damageTotal"] += int(player_damage[fight_ticks - 1])
+		DPSStats[player_prof_name]["squadDamageTotal"] += squad_damage_total
+
+		for stats_target in player["statsTargets"]:
+			DPSStats[player_prof_name]["downs"] += stats_target[0]['downed']
+			DPSStats[player_prof_name]["kills"] += stats_target[0]['killed']
+
+		# Coordination_Damage: Damage weighted by coordination with squad
+		player_damage_per_tick = to_deltas_array(player_damage)
+		player_damage_ma = moving_average_array(player_damage_per_tick, 1)[:fight_ticks - 1]
+		coordinated = (player_damage_ma != 0) & (squad_damage_per_tick_ma != 0)
+		if coordinated.any():
+			coordination_damage = player_damage_ma[coordinated] * squad_damage_percent[coordinated] * duration
+			# accumulate tick by tick so the float sum is the same as the Python engine's
+			DPSStats[player_prof_name]["coordinationDamage"] = float(
+				np.cumsum(np.concatenate(([DPSStats[player_prof_name]["coordinationDamage"]], coordination_damage)))[-1]
+			)
+
+		get_stacking_uptime_data(player, player_damage.tolist(), duration, fight_ticks)
+
+	active_names = [player_keys[position] for position in active]
+
+	# Chunk damage: Damage done within X seconds of target down
+	for index, target in enumerate(fight_json['targets']):
+		if 'enemyPlayer' in target and target['enemyPlayer'] == True and 'combatReplayData' in target and len(target['combatReplayData']['down']):
+			damage_on_target = target_damage[active, enemy_positions[index]]
+			targetDowns = list(dict(target['combatReplayData']['down']))
+			ch5_windows = []
+			for chunk_damage_seconds in range(1, CHUNK_DAMAGE_SECONDS):
+				down_indexes = []
+				start_indexes = []
+				for targetDownsIndex, downKey in enumerate(targetDowns):
+					downIndex = math.floor(downKey / 1000)
+					startIndex = max(0, downIndex - chunk_damage_seconds)
+					if targetDownsIndex > 0:
+						lastDownIndex = math.floor(targetDowns[targetDownsIndex - 1] / 1000)
+						if lastDownIndex == downIndex:
+							# Probably an ele in mist form
+							continue
+						startIndex = max(startIndex, lastDownIndex)
+					down_indexes.append(downIndex)
+					start_indexes.append(startIndex)
+					if chunk_damage_seconds == 5:
+						ch5_windows.append((startIndex, downIndex))
+				if not down_indexes:
+					continue
+
+				chunk_damage = (damage_on_target[:, down_indexes] - damage_on_target[:, start_indexes]).sum(axis=1).tolist()
+				squad_damage_on_target = sum(chunk_damage)
+				for player_prof_name, player_chunk_damage in zip(active_names, chunk_damage):
+					DPSStats[player_prof_name]["chunkDamage"][chunk_damage_seconds] += player_chunk_damage
+				for player_prof_name in active_names:
+					DPSStats[player_prof_name]["chunkDamageTotal"][chunk_damage_seconds] += squad_damage_on_target
+
+			if ch5_windows:
+				ch5_player_damage = np.zeros((len(active), fight_ticks), dtype=np.int64)
+				add_window_damage(ch5_player_damage, damage_on_target, ch5_windows)
+				np.add.at(ch5_ca_damage_1s, active_rows, ch5_player_damage)
+
+	# Carrion damage: damage to downs that die
+	for index, target in enumerate(fight_json['targets']):
+		if 'enemyPlayer' in target and target['enemyPlayer'] == True and 'combatReplayData' in target and len(target['combatReplayData']['dead']):
+			targetDeaths = dict(target['combatReplayData']['dead'])
+			targetDowns = dict(target['combatReplayData']['down'])
+			carrion_windows = []
+			for deathKey, deathValue in targetDeaths.items():
+				for downKey, downValue in targetDowns.items():
+					if deathKey == downValue:
+						carrion_windows.append((math.ceil(downKey / 1000), math.ceil(deathKey / 1000)))
+			if not carrion_windows:
+				continue
+
+			damage_on_target = target_damage[active, enemy_positions[index]]
+			dmg_starts = [dmgStart for dmgStart, _ in carrion_windows]
+			dmg_ends = [dmgEnd for _, dmgEnd in carrion_windows]
+			carrion_damage = damage_on_target[:, dmg_ends] - damage_on_target[:, dmg_starts]
+			total_carrion_damage = carrion_damage.sum(axis=0).tolist()
+			for player_prof_name, player_carrion_damage in zip(active_names, carrion_damage.sum(axis=1).tolist()):
+				DPSStats[player_prof_name]["carrionDamage"] += player_carrion_damage
+			for player_prof_name in active_names:
+				for window_carrion_damage in total_carrion_damage:
+					DPSStats[player_prof_name]["carrionDamageTotal"] += window_carrion_damage
+
+			carrion_player_damage = np.zeros((len(active), fight_ticks), dtype=np.int64)
+			add_window_damage(carrion_player_damage, damage_on_target, carrion_windows)
+			np.add.at(ch5_ca_damage_1s, active_rows, carrion_player_damage)
+
+	# Burst damage: max damage done in n seconds
+	burst_damage = window_max_array(damage_ps[active_rows], burst_windows)
+	ch5_ca_burst_damage = window_max_array(np.cumsum(ch5_ca_damage_1s[active_rows], axis=1), burst_windows)
+	for player_index, player_prof_name in enumerate(active_names):
+		for seconds, window_burst, window_ch5_ca_burst in zip(burst_windows, burst_damage, ch5_ca_burst_damage):
+			if window_burst is not None:
+				DPSStats[player_prof_name]["burstDamage"][seconds] = max(window_burst[player_index], DPSStats[player_prof_name]["burstDamage"][seconds])
+				DPSStats[player_prof_name]["ch5CaBurstDamage"][seconds] = max(window_ch5_ca_burst[player_index], DPSStats[player_prof_name]["ch5CaBurstDamage"][seconds])
+
+	return True
 
 def calculate_dps_stats(fight_json):
 	"""
@@ -910,115 +1675,104 @@ def calculate_dps_stats(fight_json):
 	* Calculates the burst damage, which is the maximum damage done by each player in X seconds
 	* Calculates the ch5Ca burst damage, which is the maximum damage done by each player in X seconds, but only counting damage done while Ch5Ca is active
 
+	The NumPy engine computes the same numbers with array operations when NumPy is installed.
 	"""
+	if dps_engine == "numpy" and calculate_dps_stats_numpy(fight_json):
+		return
+
 	fight_ticks = len(fight_json['players'][0]["damage1S"][0])
 	duration = round(fight_json['durationMS']/1000)
+	squad_actors = [get_actor(player) for player in fight_json['players'] if not player['notInSquad']]
+	# squad members without combat time are left out of every squad total
+	active_actors = [actor for actor in squad_actors if actor['combat_time']]
 
 	damage_ps = {}
 	for index, target in enumerate(fight_json['targets']):
 		if 'enemyPlayer' in target:	#and target['enemyPlayer'] == True
-			for player in fight_json['players']:
-				if player['notInSquad']:
-					continue
-				player_prof_name = player['profession'] + " " + player['name'] + " " + get_player_account(player)
+			for actor in squad_actors:
+				player_prof_name = actor['dps_key']
 				if player_prof_name not in damage_ps:
 					damage_ps[player_prof_name] = [0] * fight_ticks
 
-				damage_on_target = player["targetDamage1S"][index][0]
-				for i in range(fight_ticks):
-					damage_ps[player_prof_name][i] += damage_on_target[i]
+				add_series(damage_ps[player_prof_name], actor['player']["targetDamage1S"][index][0])
 
-	squad_damage_per_tick = []
-	for fight_tick in range(fight_ticks - 1):
-		squad_damage_on_tick = 0
-		for player in fight_json['players']:
-			if player['notInSquad']:
-				continue
-			combat_time = round(sum_breakpoints(get_combat_time_breakpoints(player)) / 1000)
-			if combat_time:
-				player_prof_name = player['profession'] + " " + player['name'] + " " + get_player_account(player)
-				player_damage = damage_ps[player_prof_name]
-				squad_damage_on_tick += player_damage[fight_tick + 1] - player_damage[fight_tick]
-		squad_damage_per_tick.append(squad_damage_on_tick)
+	squad_damage = [0] * fight_ticks
+	for actor in active_actors:
+		add_series(squad_damage, damage_ps[actor['dps_key']])
+	squad_damage_per_tick = to_deltas(squad_damage)[1:]
 
 	squad_damage_total = sum(squad_damage_per_tick)
-	squad_damage_per_tick_ma = calculate_moving_average(squad_damage_per_tick, 1)
+	squad_damage_per_tick_ma = moving_average(squad_damage_per_tick, 1)
 	squad_damage_ma_total = sum(squad_damage_per_tick_ma)
 
 	CHUNK_DAMAGE_SECONDS = 21
 	ch5_ca_damage_1s = {}
 
-	for player in fight_json['players']:
-		if player['notInSquad']:
-			continue
-		player_prof_name = player['profession'] + " " + player['name']+ " " + get_player_account(player)
-		combat_time = round(sum_breakpoints(get_combat_time_breakpoints(player)) / 1000)
-		if combat_time:
-			if player_prof_name not in DPSStats:
-				DPSStats[player_prof_name] = {
-					"account": get_player_account(player),
-					"name": player["name"],
-					"profession": player["profession"],
-					"duration": 0,
-					"combatTime": 0,
-					"coordinationDamage": 0,
-					"chunkDamage": [0] * CHUNK_DAMAGE_SECONDS,
-					"chunkDamageTotal": [0] * CHUNK_DAMAGE_SECONDS,
-					"carrionDamage": 0,
-					"carrionDamageTotal": 0,
-					"damageTotal": 0,
-					"squadDamageTotal": 0,
-					"burstDamage": [0] * CHUNK_DAMAGE_SECONDS,
-					"ch5CaBurstDamage": [0] * CHUNK_DAMAGE_SECONDS,
-					"downs": 0,
-					"kills": 0,
-				}
-				
-			ch5_ca_damage_1s[player_prof_name] = [0] * fight_ticks
-				
-			player_damage = damage_ps[player_prof_name]
+	for actor in active_actors:
+		player = actor['player']
+		player_prof_name = actor['dps_key']
+		if player_prof_name not in DPSStats:
+			DPSStats[player_prof_name] = {
+				"account": actor['account'],
+				"name": actor['name'],
+				"profession": actor['profession'],
+				"duration": 0,
+				"combatTime": 0,
+				"coordinationDamage": 0,
+				"chunkDamage": [0] * CHUNK_DAMAGE_SECONDS,
+				"chunkDamageTotal": [0] * CHUNK_DAMAGE_SECONDS,
+				"carrionDamage": 0,
+				"carrionDamageTotal": 0,
+				"damageTotal": 0,
+				"squadDamageTotal": 0,
+				"burstDamage": [0] * (max(burst_windows) + 1),
+				"ch5CaBurstDamage": [0] * (max(burst_windows) + 1),
+				"downs": 0,
+				"kills": 0,
+			}
 			
-			DPSStats[player_prof_name]["duration"] += duration
-			DPSStats[player_prof_name]["combatTime"] += combat_time
-			DPSStats[player_prof_name]["damageTotal"] += player_damage[fight_ticks - 1]
-			DPSStats[player_prof_name]["squadDamageTotal"] += squad_damage_total
-
-			for stats_target in player["statsTargets"]:
-				DPSStats[player_prof_name]["downs"] += stats_target[0]['downed']
-				DPSStats[player_prof_name]["kills"] += stats_target[0]['killed']
-
-			# Coordination_Damage: Damage weighted by coordination with squad
-			player_damage_per_tick = [player_damage[0]]
-			for fight_tick in range(fight_ticks - 1):
-				player_damage_per_tick.append(player_damage[fight_tick + 1] - player_damage[fight_tick])
-
-			player_damage_ma = calculate_moving_average(player_damage_per_tick, 1)
-
-			for fight_tick in range(fight_ticks - 1):
-				player_damage_on_tick = player_damage_ma[fight_tick]
-				if player_damage_on_tick == 0:
-					continue
+		ch5_ca_damage_1s[player_prof_name] = [0] * fight_ticks
+			
+		player_damage = damage_ps[player_prof_name]
+		
+		DPSStats[player_prof_name]["duration"] += duration
+		DPSStats[player_prof_name]["combatTime"] += actor['combat_time']
+		DPSStats[player_prof_name]["damageTotal"] += player_damage[fight_ticks - 1]
+		DPSStats[player_prof_name]["squadDamageTotal"] += squad_damage_total
+
+		for stats_target in player["statsTargets"]:
+			DPSStats[player_prof_name]["downs"] += stats_target[0]['downed']
+			DPSStats[player_prof_name]["kills"] += stats_target[0]['killed']
+
+		# Coordination_Damage: Damage weighted by coordination with squad
+		player_damage_per_tick = to_deltas(player_damage)
+		player_damage_ma = moving_average(player_damage_per_tick, 1)
+
+		for fight_tick in range(fight_ticks - 1):
+			player_damage_on_tick = player_damage_ma[fight_tick]
+			if player_damage_on_tick == 0:
+				continue
 
-				squad_damage_on_tick = squad_damage_per_tick_ma[fight_tick]
-				if squad_damage_on_tick == 0:
-					continue
+			squad_damage_on_tick = squad_damage_per_tick_ma[fight_tick]
+			if squad_damage_on_tick == 0:
+				continue
 
-				squad_damage_percent = squad_damage_on_tick / squad_damage_ma_total
+			squad_damage_percent = squad_damage_on_tick / squad_damage_ma_total
 
-				DPSStats[player_prof_name]["coordinationDamage"] += player_damage_on_tick * squad_damage_percent * duration
-			
-			get_stacking_uptime_data(player, player_damage, duration, fight_ticks)
+			DPSStats[player_prof_name]["coordinationDamage"] += player_damage_on_tick * squad_damage_percent * duration
+		
+		get_stacking_uptime_data(player, player_damage, duration, fight_ticks)
 
 	# Chunk damage: Damage done within X seconds of target down
 	for index, target in enumerate(fight_json['targets']):
 		if 'enemyPlayer' in target and target['enemyPlayer'] == True and 'combatReplayData' in target and len(target['combatReplayData']['down']):
+			targetDowns = list(dict(target['combatReplayData']['down']).items())
 			for chunk_damage_seconds in range(1, CHUNK_DAMAGE_SECONDS):
-				targetDowns = dict(target['combatReplayData']['down'])
-				for targetDownsIndex, (downKey, downValue) in enumerate(targetDowns.items()):
+				for targetDownsIndex, (downKey, downValue) in enumerate(targetDowns):
 					downIndex = math.floor(downKey / 1000)
 					startIndex = max(0, downIndex - chunk_damage_seconds)
 					if targetDownsIndex > 0:
-						lastDownKey, lastDownValue = list(targetDowns.items())[targetDownsIndex - 1]
+						lastDownKey, lastDownValue = targetDowns[targetDownsIndex - 1]
 						lastDownIndex = math.floor(lastDownKey / 1000)
 						if lastDownIndex == downIndex:
 							# Probably an ele in mist form
@@ -1026,31 +1780,19 @@ def calculate_dps_stats(fight_json):
 						startIndex = max(startIndex, lastDownIndex)
 
 					squad_damage_on_target = 0
-					for player in fight_json['players']:
-						if player['notInSquad']:
-							continue
-						combat_time = round(sum_breakpoints(get_combat_time_breakpoints(player)) / 1000)
-						if combat_time:
-							player_prof_name = player['profession'] + " " + player['name'] + " " + get_player_account(player)	
-							damage_on_target = player["targetDamage1S"][index][0]
-							player_damage = damage_on_target[downIndex] - damage_on_target[startIndex]
-							#player_damage = player["targetDamage1S"][downIndex][0] - player["targetDamage1S"][startIndex][0]
-
-							DPSStats[player_prof_name]["chunkDamage"][chunk_damage_seconds] += player_damage
-							squad_damage_on_target += player_damage
-
-							if chunk_damage_seconds == 5:
-								for i in range(startIndex, downIndex):
-									ch5_ca_damage_1s[player_prof_name][i] += damage_on_target[i + 1] - damage_on_target[i]
-
-					for player in fight_json['players']:
-						if player['notInSquad']:
-							continue
-						combat_time = round(sum_breakpoints(get_combat_time_breakpoints(player)) / 1000)
-						if combat_time:
-							player_prof_name = player['profession'] + " " + player['name'] + " " + get_player_account(player)
+					for actor in active_actors:
+						player_prof_name = actor['dps_key']
+						damage_on_target = actor['player']["targetDamage1S"][index][0]
+						player_damage = window_sum(damage_on_target, startIndex, downIndex)
 
-							DPSStats[player_prof_name]["chunkDamageTotal"][chunk_damage_seconds] += squad_damage_on_target
+						DPSStats[player_prof_name]["chunkDamage"][chunk_damage_seconds] += player_damage
+						squad_damage_on_target += player_damage
+
+						if chunk_damage_seconds == 5:
+							add_window_deltas(ch5_ca_damage_1s[player_prof_name], damage_on_target, startIndex, downIndex)
+
+					for actor in active_actors:
+						DPSStats[actor['dps_key']]["chunkDamageTotal"][chunk_damage_seconds] += squad_damage_on_target
 
 	# Carrion damage: damage to downs that die 
 	for index, target in enumerate(fight_json['targets']):
@@ -1064,58 +1806,34 @@ def calculate_dps_stats(fight_json):
 						dmgStart = math.ceil(downKey / 1000)
 
 						total_carrion_damage = 0
-						for player in fight_json['players']:
-							if player['notInSquad']:
-								continue
-							combat_time = round(sum_breakpoints(get_combat_time_breakpoints(player)) / 1000)
-							if combat_time:
-								player_prof_name = player['profession'] + " " + player['name'] + " " + get_player_account(player)
-								damage_on_target = player["targetDamage1S"][index][0]
-								carrion_damage = damage_on_target[dmgEnd] - damage_on_target[dmgStart]
-
-								DPSStats[player_prof_name]["carrionDamage"] += carrion_damage
-								total_carrion_damage += carrion_damage
-
-								for i in range(dmgStart, dmgEnd):
-									ch5_ca_damage_1s[player_prof_name][i] += damage_on_target[i + 1] - damage_on_target[i]
-
-						for player in fight_json['players']:
-							if player['notInSquad']:
-								continue
-							combat_time = round(sum_breakpoints(get_combat_time_breakpoints(player)) / 1000)
-							if combat_time:
-								player_prof_name = player['profession'] + " " + player['name'] + " " + get_player_account(player)
-								DPSStats[player_prof_name]["carrionDamageTotal"] += total_carrion_damage
+						for actor in active_actors:
+							player_prof_name = actor['dps_key']
+							damage_on_target = actor['player']["targetDamage1S"][index][0]
+							carrion_damage = window_sum(damage_on_target, dmgStart, dmgEnd)
+
+							DPSStats[player_prof_name]["carrionDamage"] += carrion_damage
+							total_carrion_damage += carrion_damage
+
+							add_window_deltas(ch5_ca_damage_1s[player_prof_name], damage_on_target, dmgStart, dmgEnd)
+
+						for actor in active_actors:
+							DPSStats[actor['dps_key']]["carrionDamageTotal"] += total_carrion_damage
 
 	# Burst damage: max damage done in n seconds
-	for player in fight_json['players']:
-		if player['notInSquad']:
-			continue
-		combat_time = round(sum_breakpoints(get_combat_time_breakpoints(player)) / 1000)
-		if combat_time:
-			player_prof_name = player['profession'] + " " + player['name'] + " " + get_player_account(player)
-			player_damage = damage_ps[player_prof_name]
-			for i in range(1, CHUNK_DAMAGE_SECONDS):
-				for fight_tick in range(i, fight_ticks):
-					dmg = player_damage[fight_tick] - player_damage[fight_tick - i]
-					DPSStats[player_prof_name]["burstDamage"][i] = max(dmg, DPSStats[player_prof_name]["burstDamage"][i])
+	for actor in active_actors:
+		player_prof_name = actor['dps_key']
+		player_damage = damage_ps[player_prof_name]
+		for seconds, window_burst in zip(burst_windows, window_max(player_damage, burst_windows)):
+			if window_burst is not None:
+				DPSStats[player_prof_name]["burstDamage"][seconds] = max(window_burst, DPSStats[player_prof_name]["burstDamage"][seconds])
 
 	# Ch5Ca Burst damage: max damage done in n seconds
-	for player in fight_json['players']:
-		if player['notInSquad']:
-			continue
-		combat_time = round(sum_breakpoints(get_combat_time_breakpoints(player)) / 1000)
-		if combat_time:
-			player_prof_name = player['profession'] + " " + player['name'] + " " + get_player_account(player)
-			player_damage_ps = ch5_ca_damage_1s[player_prof_name]
-			player_damage = [0] * len(player_damage_ps)
-			player_damage[0] = player_damage_ps[0]
-			for i in range(1, len(player_damage)):
-				player_damage[i] = player_damage[i - 1] + player_damage_ps[i]
-			for i in range(1, CHUNK_DAMAGE_SECONDS):
-				for fight_tick in range(i, fight_ticks):
-					dmg = player_damage[fight_tick] - player_damage[fight_tick - i]
-					DPSStats[player_prof_name]["ch5CaBurstDamage"][i] = max(dmg, DPSStats[player_prof_name]["ch5CaBurstDamage"][i])
+	for actor in active_actors:
+		player_prof_name = actor['dps_key']
+		player_damage = to_cumulative(ch5_ca_damage_1s[player_prof_name])
+		for seconds, window_burst in zip(burst_windows, window_max(player_damage, burst_windows)):
+			if window_burst is not None:
+				DPSStats[player_prof_name]["ch5CaBurstDamage"][seconds] = max(window_burst, DPSStats[player_prof_name]["ch5CaBurstDamage"][seconds])
 
 def get_player_stats_targets(statsTargets: dict, name: str, profession: str, account: str, fight_num: int, fight_time: int) -> None:
 	"""
@@ -1141,7 +1859,7 @@ def get_player_stats_targets(statsTargets: dict, name: str, profession: str, acc
 
 		fight_stat_value = round(fight_stat_value / fight_time, 3)
 
-		update_high_score(f"statTarget_{stat}", "{{"+profession+"}}"+name+"-"+str(account)+"-"+str(fight_num)+"-"+stat, fight_stat_value)	
+		update_high_score(f"statTarget_{stat}", profession, name, account, fight_num, fight_stat_value)
 
 def get_total_shield_damage(fight_data: dict) -> int:
 	"""
@@ -1392,6 +2110,7 @@ def get_stat_by_key(fight_num: int, player: dict, stat_category: str, name_prof:
 	"""
 	player_stats = player[stat_category][0]
 	active_time_seconds = player['activeTimes'][0] / 1000 if player['activeTimes'] else 0
+	stats = {}
 
 	for stat, value in player_stats.items():
 		if stat in ['boonStripsTime', 'condiCleanseTime', 'condiCleanseTimeSelf'] and value > 999999:
@@ -1403,21 +2122,21 @@ def get_stat_by_key(fight_num: int, player: dict, stat_category: str, name_prof:
 			high_score_value = round(value / active_time_seconds, 3) if active_time_seconds > 0 else 0
 			update_high_score(
 				f"{stat_category}_{stat}",
-				f"{{{{{player['profession']}}}}}{player['name']}-{get_player_account(player)}-{str(fight_num)} | {stat}",
+				player['profession'], player['name'], get_player_account(player), fight_num,
 				high_score_value
 			)
-		top_stats['player'][name_prof][stat_category][stat] = top_stats['player'][name_prof][stat_category].get(stat, 0) + value
-		top_stats['fight'][fight_num][stat_category][stat] = top_stats['fight'][fight_num][stat_category].get(stat, 0) + value
-		top_stats['overall'][stat_category][stat] = top_stats['overall'][stat_category].get(stat, 0) + value
+		stats[stat] = value
 
 		if player.get('hasCommanderTag'):
-			commander_name = f"{player['name']}|{player['profession']}|{get_player_account(player)}"
+			commander_name = get_actor(player)['name_prof']
 			if commander_name not in commander_summary_data:
 				commander_summary_data[commander_name] = {stat_category: {}}
 			elif stat_category not in commander_summary_data[commander_name]:
 				commander_summary_data[commander_name][stat_category] = {}
 			commander_summary_data[commander_name][stat_category][stat] = commander_summary_data[commander_name][stat_category].get(stat, 0) + value
 
+	add_stat_facts(fight_num, name_prof, stat_category, None, stats)
+
 
 def get_defense_hits_and_glances(fight_num: int, player: dict, stat_category: str, name_prof: str) -> None:
 	"""
@@ -1430,12 +2149,7 @@ def get_defense_hits_and_glances(fight_num: int, player: dict, stat_category: st
 		name_prof (str): The name of the profession.
 	"""
 	direct_hits, glancing_hits = calculate_defensive_hits_and_glances(player)
-	top_stats['player'][name_prof][stat_category]['directHits'] = top_stats['player'][name_prof][stat_category].get('directHits', 0) + direct_hits
-	top_stats['player'][name_prof][stat_category]['glanceCount'] = top_stats['player'][name_prof][stat_category].get('glanceCount', 0) + glancing_hits	
-	top_stats['fight'][fight_num][stat_category]['directHits'] = top_stats['fight'][fight_num][stat_category].get('directHits', 0) + direct_hits
-	top_stats['fight'][fight_num][stat_category]['glanceCount'] = top_stats['fight'][fight_num][stat_category].get('glanceCount', 0) + glancing_hits
-	top_stats['overall'][stat_category]['directHits'] = top_stats['overall'][stat_category].get('directHits', 0) + direct_hits
-	top_stats['overall'][stat_category]['glanceCount'] = top_stats['overall'][stat_category].get('glanceCount', 0) + glancing_hits
+	add_stat_facts(fight_num, name_prof, stat_category, None, {'directHits': direct_hits, 'glanceCount': glancing_hits})
 
 def get_stat_by_target_and_skill(fight_num: int, player: dict, stat_category: str, name_prof: str) -> None:
 	"""
@@ -1451,32 +2165,11 @@ def get_stat_by_target_and_skill(fight_num: int, player: dict, stat_category: st
 		if target[0]:
 			for skill in target[0]:
 				skill_id = skill['id']
+				if 'max' in skill:
+					update_high_score("statTarget_max", player["profession"], player["name"], get_player_account(player), fight_num, skill['max'], skill_id=skill_id, target=index)
 
-				if skill_id not in top_stats['player'][name_prof][stat_category]:
-					top_stats['player'][name_prof][stat_category][skill_id] = {}
-				if skill_id not in top_stats['fight'][fight_num][stat_category]:
-					top_stats['fight'][fight_num][stat_category][skill_id] = {}
-				if skill_id not in top_stats['overall'][stat_category]:
-					top_stats['overall'][stat_category][skill_id] = {}
-					
-				for stat, value in skill.items():
-					if stat == 'max':
-						update_high_score(f"statTarget_{stat}", "{{"+player["profession"]+"}}"+player["name"]+"-"+get_player_account(player)+"-"+str(fight_num)+"-"+str(index)+" | "+str(skill_id), value)
-						if value > top_stats['player'][name_prof][stat_category][skill_id].get(stat, 0):
-							top_stats['player'][name_prof][stat_category][skill_id][stat] = value
-							top_stats['fight'][fight_num][stat_category][skill_id][stat] = value
-							top_stats['overall'][stat_category][skill_id][stat] = value
-					elif stat == 'min':
-						if value <= top_stats['player'][name_prof][stat_category][skill_id].get(stat, 0):
-							top_stats['player'][name_prof][stat_category][skill_id][stat] = value
-							top_stats['fight'][fight_num][stat_category][skill_id][stat] = value
-							top_stats['overall'][stat_category][skill_id][stat] = value
-					elif stat not in ['id', 'max', 'min']:
-						top_stats['player'][name_prof][stat_category][skill_id][stat] = top_stats['player'][name_prof][stat_category][skill_id].get(
-							stat, 0) + value
-						top_stats['fight'][fight_num][stat_category][skill_id][stat] = top_stats['fight'][fight_num][stat_category][skill_id].get(
-							stat, 0) + value
-						top_stats['overall'][stat_category][skill_id][stat] = top_stats['overall'][stat_category][skill_id].get(stat, 0) + value
+				# 'max' and 'min' keep the extreme value, see rollup_stat_facts
+				add_stat_facts(fight_num, name_prof, stat_category, skill_id, {stat: value for stat, value in skill.items() if stat != 'id'})
 
 def get_stat_by_target(fight_num: int, player: dict, stat_category: str, name_prof: str) -> None:
 	"""
@@ -1493,10 +2186,7 @@ def get_stat_by_target(fight_num: int, player: dict, stat_category: str, name_pr
 
 	for target in player[stat_category]:
 		if target[0]:
-			for stat, value in target[0].items():
-				top_stats['player'][name_prof][stat_category][stat] = top_stats['player'][name_prof][stat_category].get(stat, 0) + value
-				top_stats['fight'][fight_num][stat_category][stat] = top_stats['fight'][fight_num][stat_category].get(stat, 0) + value
-				top_stats['overall'][stat_category][stat] = top_stats['overall'][stat_category].get(stat, 0) + value
+			add_stat_facts(fight_num, name_prof, stat_category, None, target[0])
 
 def get_stat_by_skill(fight_num: int, player: dict, stat_category: str, name_prof: str) -> None:
 	"""
@@ -1518,18 +2208,7 @@ def get_stat_by_skill(fight_num: int, player: dict, stat_category: str, name_pro
 			continue
 
 		skill_id = skill["id"]
-
-		# Ensure dict structure exists
-		for level in ("player", "fight", "overall"):
-			if level == "player":
-				container = top_stats[level][name_prof][stat_category]
-			elif level == "fight":
-				container = top_stats[level][fight_num][stat_category]
-			else:  # "overall"
-				container = top_stats[level][stat_category]
-
-			if skill_id not in container:
-				container[skill_id] = {}
+		stats = {}
 
 		# Process each stat for this skill
 		for stat, value in skill.items():
@@ -1540,30 +2219,25 @@ def get_stat_by_skill(fight_num: int, player: dict, stat_category: str, name_pro
 			if stat == "max":
 				update_high_score(
 					f"{stat_category}_{stat}",
-					f"{{{{{player['profession']}}}}}{player['name']}-{get_player_account(player)}-{fight_num} | {skill_id}",
+					player['profession'], player['name'], get_player_account(player), fight_num,
 					value,
+					skill_id=skill_id,
 				)
 
-			# Aggregate into top_stats
-			top_stats["player"][name_prof][stat_category][skill_id][stat] = (
-				top_stats["player"][name_prof][stat_category][skill_id].get(stat, 0) + value
-			)
-			top_stats["fight"][fight_num][stat_category][skill_id][stat] = (
-				top_stats["fight"][fight_num][stat_category][skill_id].get(stat, 0) + value
-			)
-			top_stats["overall"][stat_category][skill_id][stat] = (
-				top_stats["overall"][stat_category][skill_id].get(stat, 0) + value
-			)
+			stats[stat] = value
 
 			# Commander-specific summary
 			if player.get("hasCommanderTag"):
-				commander_name = f"{player['name']}|{player['profession']}|{get_player_account(player)}"
+				commander_name = get_actor(player)['name_prof']
 				if skill_id not in commander_summary_data[commander_name][stat_category]:
 					commander_summary_data[commander_name][stat_category][skill_id] = {}
 
 				commander_summary_data[commander_name][stat_category][skill_id][stat] = (
 					commander_summary_data[commander_name][stat_category][skill_id].get(stat, 0) + value
-				) 
+				)
+
+		# Aggregate into top_stats
+		add_stat_facts(fight_num, name_prof, stat_category, skill_id, stats)
 
 def get_buff_uptimes(fight_num: int, player: dict, group: str, stat_category: str, name_prof: str, fight_duration: int, active_time: int) -> None:
 	"""
@@ -1581,12 +2255,12 @@ def get_buff_uptimes(fight_num: int, player: dict, group: str, stat_category: st
 		None
 	"""
 	ResistanceBuff = [26980, 'b26980']
-	resist_data = {}
+	resist_data = []
 	for buff in player[stat_category]:
 		buff_id = 'b'+str(buff['id'])
 		if buff_id in ResistanceBuff:
 			resist_state = buff['states']
-			resist_data = get_buff_states(resist_state)
+			resist_data = get_buff_states(resist_state, fight_duration)
 			break
 
 	for buff in player[stat_category]:
@@ -1594,21 +2268,6 @@ def get_buff_uptimes(fight_num: int, player: dict, group: str, stat_category: st
 		buff_uptime_ms = buff['buffData'][0]['uptime'] * fight_duration / 100
 		buff_presence = buff['buffData'][0]['presence']
 		state_changes = len(buff['states'])//2
-		buff_state = buff['states']
-		state_data = get_buff_states(buff_state)
-
-		if buff_id not in top_stats['player'][name_prof][stat_category]:
-			top_stats['player'][name_prof][stat_category][buff_id] = {}
-		if buff_id not in top_stats['fight'][fight_num][stat_category]:
-			top_stats['fight'][fight_num][stat_category][buff_id] = {}
-		if buff_id not in top_stats['overall'][stat_category]:
-			top_stats['overall'][stat_category][buff_id] = {}
-		if "group" not in top_stats['overall'][stat_category]:
-			top_stats['overall'][stat_category]["group"] = {}
-		if group not in top_stats['overall'][stat_category]["group"]:
-			top_stats['overall'][stat_category]["group"][group] = {}
-		if buff_id not in top_stats['overall'][stat_category]["group"][group]:
-			top_stats['overall'][stat_category]["group"][group][buff_id] = {}
 
 		if stat_category == 'buffUptimes':
 			stat_value = buff_presence * fight_duration / 100 if buff_presence else buff_uptime_ms
@@ -1627,100 +2286,84 @@ def get_buff_uptimes(fight_num: int, player: dict, group: str, stat_category: st
 		]
 		resist_offset = 0
 		if buff_id in non_damaging_conditions and resist_data:
-			resist_offset += calculate_resist_offset(resist_data, state_data)
+			resist_offset += calculate_resist_offset(resist_data, get_buff_states(buff['states'], fight_duration))
 
-		top_stats['player'][name_prof][stat_category][buff_id]['uptime_ms'] = top_stats['player'][name_prof][stat_category][buff_id].get('uptime_ms', 0) + stat_value
-		top_stats['player'][name_prof][stat_category][buff_id]['state_changes'] = top_stats['player'][name_prof][stat_category][buff_id].get('state_changes', 0) + state_changes
-		top_stats['fight'][fight_num][stat_category][buff_id]['uptime_ms'] = top_stats['fight'][fight_num][stat_category][buff_id].get('uptime_ms', 0) + stat_value
-		top_stats['overall'][stat_category][buff_id]['uptime_ms'] = top_stats['overall'][stat_category][buff_id].get('uptime_ms', 0) + stat_value
-		top_stats['overall'][stat_category]["group"][group][buff_id]['uptime_ms'] = top_stats['overall'][stat_category]["group"][group][buff_id].get('uptime_ms', 0) + stat_value
-		top_stats['player'][name_prof][stat_category][buff_id]['resist_reduction'] = top_stats['player'][name_prof][stat_category][buff_id].get('resist_reduction', 0) + resist_offset
-		top_stats['fight'][fight_num][stat_category][buff_id]['resist_reduction'] = top_stats['fight'][fight_num][stat_category][buff_id].get('resist_reduction', 0) + resist_offset
-		top_stats['overall'][stat_category][buff_id]['resist_reduction'] = top_stats['overall'][stat_category][buff_id].get('resist_reduction', 0) + resist_offset
-		top_stats['overall'][stat_category]["group"][group][buff_id]['resist_reduction'] = top_stats['overall'][stat_category]["group"][group][buff_id].get('resist_reduction', 0) + resist_offset
+		# state changes are only kept per player
+		add_stat_facts(fight_num, name_prof, stat_category, buff_id, {'uptime_ms': stat_value}, FACT_PLAYER | FACT_FIGHT | FACT_GROUP, group)
+		add_stat_facts(fight_num, name_prof, stat_category, buff_id, {'state_changes': state_changes}, FACT_PLAYER)
+		add_stat_facts(fight_num, name_prof, stat_category, buff_id, {'resist_reduction': resist_offset}, FACT_PLAYER | FACT_FIGHT | FACT_GROUP, group)
 
-def get_target_buff_data(fight_num: int, player: dict, targets: dict, stat_category: str, name_prof: str) -> None:
+def get_target_buff_sources(targets: list, players: list, fight_duration: int) -> dict:
 	"""
-	Calculate buff uptime stats for a target caused by squad player
+	Walk the buffs of every target once and collect the uptime caused by each squad member.
 
 	Args:
-		filename (str): The filename of the fight.
+		targets (list): The targets of the fight.
+		players (list): The players of the fight.
+		fight_duration (int): The duration of the fight in milliseconds, closing the debuffs still on at the end.
+
+	Returns:
+		dict: For each squad member's name, the [target_idx, buff_id, uptime_ms, applied_counts, debuff_intervals]
+			entries of the buffs they applied, in target then buff order. debuff_intervals are the
+			[start, end, stacks] intervals of the damage_debuffs, otherwise None.
+	"""
+	squad_names = {player['name'] for player in players if not player['notInSquad']}
+	target_buff_sources = {}
+	for target_idx, target in enumerate(targets):
+		if 'buffs' not in target:
+			continue
+		for buff in target['buffs']:
+			buff_id = 'b'+str(buff['id'])
+			is_damage_debuff = buff_id in damage_debuffs
+			for name, states in buff['statesPerSource'].items():
+				if name not in squad_names:
+					continue
+				buffTime = 0
+				buffOn = 0
+				firstTime = 0
+				appliedCounts = 0
+				for stateChange in states:
+					if stateChange[0] == 0:
+						continue
+					elif stateChange[1] >=1 and buffOn == 0:
+						if stateChange[1] > buffOn:
+							appliedCounts += 1
+						buffOn = stateChange[1]
+						firstTime = stateChange[0]
+
+					elif stateChange[1] == 0 and buffOn:
+						buffOn = 0
+						secondTime = stateChange[0]
+						buffTime = secondTime - firstTime
+				debuff_intervals = None
+				if is_damage_debuff:
+					debuff_intervals = [interval for interval in to_step_intervals(states, fight_duration) if interval[2] > 0]
+				target_buff_sources.setdefault(name, []).append([target_idx, buff_id, buffTime, appliedCounts, debuff_intervals])
+	return target_buff_sources
+
+def get_target_buff_data(fight_num: int, player: dict, target_buff_sources: dict, stat_category: str, name_prof: str) -> None:
+	"""
+	Add the buff uptime stats a squad player caused on the targets, see get_target_buff_sources.
+
+	Args:
+		fight_num (int): The number of the fight.
 		player (dict): The player dictionary.
-		targets (dict): The targets dictionary.
+		target_buff_sources (dict): The target buffs of the fight by source, from get_target_buff_sources.
 		stat_category (str): The category of stats to collect.
 		name_prof (str): The name of the profession.
-		fight_duration (int): The duration of the fight in milliseconds.
 
 	Returns:
 		None
 	"""
-	x =  {"b70350": 0.10, "b70806": 0.10}
-	debuff_data = {
-		"b70350": [0.10,'targetDamage1S'], #Dragonhunter Relic
-		"b70806": [0.10,'targetPowerDamage1S'] #Isgarren Relic
-	}
-	target_idx = 0
-	for target in targets:
-		if 'buffs' in target:
-			for buff in target['buffs']:
-				buff_id = 'b'+str(buff['id'])
-
-				if player['name'] in buff['statesPerSource']:
-					name = player['name']
-					buffTime = 0
-					buffOn = 0
-					firstTime = 0
-					conditionTime = 0
-					appliedCounts = 0
-					damage_with_buff = 0
-					for stateChange in buff['statesPerSource'][name]:
-						if stateChange[0] == 0:
-							continue
-						elif stateChange[1] >=1 and buffOn == 0:
-							if stateChange[1] > buffOn:
-								appliedCounts += 1
-							buffOn = stateChange[1]
-							firstTime = stateChange[0]
-
-						elif stateChange[1] == 0 and buffOn:
-							buffOn = 0
-							secondTime = stateChange[0]
-							buffTime = secondTime - firstTime
-							if buff_id in debuff_data:
-								damage_with_buff = calculate_damage_during_buff(player, target_idx, firstTime, secondTime, debuff_data[buff_id][1])
-					conditionTime += buffTime
-
-					#if buff_id not in top_stats['player'][name_prof][stat_category]:
-					if buff_id not in top_stats['player'][name_prof][stat_category]:
-						top_stats['player'][name_prof][stat_category][buff_id] = {
-							'uptime_ms': 0,
-							'applied_counts': 0,
-						}
-						if buff_id in debuff_data:
-							top_stats['player'][name_prof][stat_category][buff_id]['damage_gained'] = 0
-					if buff_id not in top_stats['fight'][fight_num][stat_category]:
-						top_stats['fight'][fight_num][stat_category][buff_id] = {
-							'uptime_ms': 0,
-							'applied_counts': 0,
-						}
-					if buff_id not in top_stats['overall'][stat_category]:
-						top_stats['overall'][stat_category][buff_id] = {
-							'uptime_ms': 0,
-							'applied_counts': 0,
-						}
-
-					top_stats['player'][name_prof][stat_category][buff_id]['uptime_ms'] += conditionTime
-					top_stats['player'][name_prof][stat_category][buff_id]['applied_counts'] += appliedCounts
-					if buff_id in debuff_data:
-						top_stats['player'][name_prof][stat_category][buff_id]['damage_gained'] += damage_with_buff * debuff_data[buff_id][0]
-
-					top_stats['fight'][fight_num][stat_category][buff_id]['uptime_ms'] += conditionTime
-					top_stats['fight'][fight_num][stat_category][buff_id]['applied_counts'] += appliedCounts
-
-					top_stats['overall'][stat_category][buff_id]['uptime_ms'] += conditionTime
-					top_stats['overall'][stat_category][buff_id]['applied_counts'] += appliedCounts
-
-		target_idx += 1
+	for target_idx, buff_id, uptime_ms, applied_counts, debuff_intervals in target_buff_sources.get(player['name'], []):
+		add_stat_facts(fight_num, name_prof, stat_category, buff_id, {'uptime_ms': uptime_ms, 'applied_counts': applied_counts})
+		# the damage gained from the damage debuffs, over all their windows, is only kept per player
+		if debuff_intervals is not None:
+			increase, series = damage_debuffs[buff_id]
+			damage_gained = 0
+			if series in player and target_idx < len(player[series]):
+				damage_gained = get_debuff_damage(player[series][target_idx][0], debuff_intervals, increase)
+			add_stat_facts(fight_num, name_prof, stat_category, buff_id, {'damage_gained': damage_gained}, FACT_PLAYER)
 
 def get_buff_generation(fight_num: int, player: dict, stat_category: str, name_prof: str, duration: int, buff_data: dict, squad_count: int, group_count: int) -> None:
 	"""
@@ -1740,13 +2383,6 @@ def get_buff_generation(fight_num: int, player: dict, stat_category: str, name_p
 		buff_id = 'b'+str(buff['id'])
 		buff_stacking = buff_data[buff_id].get('stacking', False)
 
-		if buff_id not in top_stats['player'][name_prof][stat_category]:
-			top_stats['player'][name_prof][stat_category][buff_id] = {}
-		if buff_id not in top_stats['fight'][fight_num][stat_category]:
-			top_stats['fight'][fight_num][stat_category][buff_id] = {}
-		if buff_id not in top_stats['overall'][stat_category]:
-			top_stats['overall'][stat_category][buff_id] = {}
-
 		buff_generation = buff['buffData'][0].get('generation', 0)
 		buff_wasted = buff['buffData'][0].get('wasted', 0)
 
@@ -1772,15 +2408,8 @@ def get_buff_generation(fight_num: int, player: dict, stat_category: str, name_p
 				buff_generation = (buff_generation / 100) * duration
 				buff_wasted = (buff_wasted / 100) * duration
 
-				
-		top_stats['player'][name_prof][stat_category][buff_id]['generation'] = top_stats['player'][name_prof][stat_category][buff_id].get('generation', 0) + buff_generation
-		top_stats['player'][name_prof][stat_category][buff_id]['wasted'] = top_stats['player'][name_prof][stat_category][buff_id].get('wasted', 0) + buff_wasted
-
-		top_stats['fight'][fight_num][stat_category][buff_id]['generation'] = top_stats['fight'][fight_num][stat_category][buff_id].get('generation', 0) + buff_generation
-		top_stats['fight'][fight_num][stat_category][buff_id]['wasted'] = top_stats['fight'][fight_num][stat_category][buff_id].get('wasted', 0) + buff_wasted
 
-		top_stats['overall'][stat_category][buff_id]['generation'] = top_stats['overall'][stat_category][buff_id].get('generation', 0) + buff_generation
-		top_stats['overall'][stat_category][buff_id]['wasted'] = top_stats['overall'][stat_category][buff_id].get('wasted', 0) + buff_wasted
+		add_stat_facts(fight_num, name_prof, stat_category, buff_id, {'generation': buff_generation, 'wasted': buff_wasted})
 
 def get_skill_cast_by_prof_role(active_time, player: dict, stat_category: str, name_prof: str) -> None:
 	"""
@@ -1811,7 +2440,7 @@ def get_skill_cast_by_prof_role(active_time, player: dict, stat_category: str, n
 			'ActiveTime': 0,
 			'total': 0,
 			'total_no_auto': 0,
-			'account': get_player_account(player),
+			'account': get_actor(player)['account'],
 			'Skills': {}
 		}
 
@@ -1946,7 +2575,7 @@ def get_healStats_data(fight_num: int, player: dict, players: dict, stat_categor
 				top_stats['overall'][stat_category]['downed_healing'] = (
 					top_stats['overall'][stat_category].get('downed_healing', 0) + downed_healing
 				)
-		update_high_score(f"{stat_category}_Healing", "{{"+player["profession"]+"}}"+player["name"]+"-"+get_player_account(player)+"-"+str(fight_num)+" | Healing", round(fight_healing/(fight_time/1000), 2))	
+		update_high_score(f"{stat_category}_Healing", player["profession"], player["name"], get_player_account(player), fight_num, round(fight_healing/(fight_time/1000), 2))
 
 	fight_barrier = 0
 	if stat_category == 'extBarrierStats' and 'extBarrierStats' in player:
@@ -2020,7 +2649,7 @@ def get_healStats_data(fight_num: int, player: dict, players: dict, stat_categor
 				top_stats['overall'][stat_category]['outgoing_barrier'] = (
 					top_stats['overall'][stat_category].get('outgoing_barrier', 0) + outgoing_barrier
 				)
-		update_high_score(f"{stat_category}_Barrier", "{{"+player["profession"]+"}}"+player["name"]+"-"+get_player_account(player)+"-"+str(fight_num)+" | Barrier", round(fight_barrier/(fight_time/1000), 2))
+		update_high_score(f"{stat_category}_Barrier", player["profession"], player["name"], get_player_account(player), fight_num, round(fight_barrier/(fight_time/1000), 2))
 
 def get_healing_skill_data(player: dict, stat_category: str, name_prof: str) -> None:
 	"""
@@ -2144,63 +2773,20 @@ def get_damage_mod_by_player(fight_num: int, player: dict, name_prof: str) -> No
 
 				# Update commander summary data if the player has a commander tag
 				if commander_tag:
-					commander_name = f"{player['name']}|{player['profession']}|{get_player_account(player)}"
+					commander_name = get_actor(player)['name_prof']
 					if mod_id == 'd-58':
 						commander_summary_data[commander_name]['prot_mods']['hitCount'] += mod_hit_count
 						commander_summary_data[commander_name]['prot_mods']['totalHitCount'] += mod_total_hit_count
 						commander_summary_data[commander_name]['prot_mods']['damageGain'] += mod_damage_gain
 						commander_summary_data[commander_name]['prot_mods']['totalDamage'] += mod_total_damage
 
-				# Update player's damage modifier statistics
-				if mod_id not in top_stats['player'][name_prof]['damageModifiers']:
-					top_stats['player'][name_prof]['damageModifiers'][mod_id] = {}
-
-				top_stats['player'][name_prof]['damageModifiers'][mod_id]['hitCount'] = (
-					top_stats['player'][name_prof]['damageModifiers'][mod_id].get('hitCount', 0) + mod_hit_count
-				)
-				top_stats['player'][name_prof]['damageModifiers'][mod_id]['totalHitCount'] = (
-					top_stats['player'][name_prof]['damageModifiers'][mod_id].get('totalHitCount', 0) + mod_total_hit_count
-				)
-				top_stats['player'][name_prof]['damageModifiers'][mod_id]['damageGain'] = (
-					top_stats['player'][name_prof]['damageModifiers'][mod_id].get('damageGain', 0) + mod_damage_gain
-				)
-				top_stats['player'][name_prof]['damageModifiers'][mod_id]['totalDamage'] = (
-					top_stats['player'][name_prof]['damageModifiers'][mod_id].get('totalDamage', 0) + mod_total_damage
-				)
-
-				# Update fight-specific damage modifier statistics
-				if mod_id not in top_stats['fight'][fight_num]['damageModifiers']:
-					top_stats['fight'][fight_num]['damageModifiers'][mod_id] = {}
-
-				top_stats['fight'][fight_num]['damageModifiers'][mod_id]['hitCount'] = (
-					top_stats['fight'][fight_num]['damageModifiers'][mod_id].get('hitCount', 0) + mod_hit_count
-				)
-				top_stats['fight'][fight_num]['damageModifiers'][mod_id]['totalHitCount'] = (
-					top_stats['fight'][fight_num]['damageModifiers'][mod_id].get('totalHitCount', 0) + mod_total_hit_count
-				)
-				top_stats['fight'][fight_num]['damageModifiers'][mod_id]['damageGain'] = (
-					top_stats['fight'][fight_num]['damageModifiers'][mod_id].get('damageGain', 0) + mod_damage_gain
-				)
-				top_stats['fight'][fight_num]['damageModifiers'][mod_id]['totalDamage'] = (
-					top_stats['fight'][fight_num]['damageModifiers'][mod_id].get('totalDamage', 0) + mod_total_damage
-				)
-
-				# Update overall damage modifier statistics
-				if mod_id not in top_stats['overall']['damageModifiers']:
-					top_stats['overall']['damageModifiers'][mod_id] = {}
-
-				top_stats['overall']['damageModifiers'][mod_id]['hitCount'] = (
-					top_stats['overall']['damageModifiers'][mod_id].get('hitCount', 0) + mod_hit_count
-				)
-				top_stats['overall']['damageModifiers'][mod_id]['totalHitCount'] = (
-					top_stats['overall']['damageModifiers'][mod_id].get('totalHitCount', 0) + mod_total_hit_count
-				)
-				top_stats['overall']['damageModifiers'][mod_id]['damageGain'] = (
-					top_stats['overall']['damageModifiers'][mod_id].get('damageGain', 0) + mod_damage_gain
-				)
-				top_stats['overall']['damageModifiers'][mod_id]['totalDamage'] = (
-					top_stats['overall']['damageModifiers'][mod_id].get('totalDamage', 0) + mod_total_damage
-				)
+				# Update player, fight and overall damage modifier statistics
+				add_stat_facts(fight_num, name_prof, 'damageModifiers', mod_id, {
+					'hitCount': mod_hit_count,
+					'totalHitCount': mod_total_hit_count,
+					'damageGain': mod_damage_gain,
+					'totalDamage': mod_total_damage,
+				})
 
 def get_firebrand_pages(player, name_prof, name, account, fight_duration_ms):
 	"""
@@ -2238,14 +2824,14 @@ def get_firebrand_pages(player, name_prof, name, account, fight_duration_ms):
 				pages_data = fb_pages[name_prof]["firebrand_pages"]
 				pages_data[skill_id] = pages_data.get(skill_id, 0) + len(rotation_skill['skills'])
 
-def get_mechanics_by_fight(fight_number, mechanics_map: dict, players: dict, log_type: str) -> None:
+def get_mechanics_by_fight(fight_number, mechanics_map: dict, actor_names: dict, log_type: str) -> None:
 	"""
 	Collects mechanics data from a fight and stores it in a dictionary.
 
 	Args:
 		fight_number (int): The fight number for the data.
 		mechanics_map (dict): The dictionary of mechanics data.
-		players (dict): The players data.
+		actor_names (dict): The players of the fight indexed by name, see index_actor_names.
 		log_type (str): The type of log, either PVE or WVW.
 	"""
 	if log_type == "PVE":
@@ -2282,12 +2868,7 @@ def get_mechanics_by_fight(fight_number, mechanics_map: dict, players: dict, log
 		# Loop through each data item for the mechanic
 		for data_item in mechanic_data['mechanicsData']:
 			actor = data_item['actor']
-			prof_name = None
-			# Loop through each player in the fight
-			for player in players:
-				if player['name'] == actor:
-					# Get the player's profession and name
-					prof_name = player['profession'] + "|" + player['name'] + "|" + get_player_account(player)
+			prof_name = actor_names.get(actor)
 
 			# If the actor is a player, add it to the player list
 			if prof_name:
@@ -2308,63 +2889,119 @@ def get_mechanics_by_fight(fight_number, mechanics_map: dict, players: dict, log
 				else:
 					mechanics[fight_number][mechanic_name]['enemy_data'][actor] += 1
 
-def get_rally_mechanics_by_fight(mechanics_map, players):
+def get_rally_mechanics_by_fight(mechanics_map, actor_names):
 	"""
 	Get the number of rallies by fight from the mechanics map.
 
+	A got-up and a killing blow on a player at the same time make a rally. Both are counted by
+	time in one pass over the mechanics and then joined on the time, so the cost is linear in
+	the number of events.
+
 	Args:
 		mechanics_map (dict): The mechanics map from the log.
-		players (list): A list of player data from the log.
+		actor_names (dict): The players of the fight indexed by name, see index_actor_names.
 
 	Returns:
 		int: The number of rallies by fight.
 	"""
-	got_ups = {}
 	got_up_cnts = {}
-	killing_blows = {}
 	killing_blows_cnts = {}
 	rallies = 0
 
 	for mechanic_data in mechanics_map:
 		mechanic_name = mechanic_data['name']
 		if "Got" in mechanic_name:
-			got_ups = mechanic_data['mechanicsData']
-			for entry in got_ups:
+			for entry in mechanic_data['mechanicsData']:
 				gu_time = entry['time']
-				if gu_time not in got_up_cnts:
-					got_up_cnts[gu_time] = 0
-				got_up_cnts[gu_time] += 1
+				got_up_cnts[gu_time] = got_up_cnts.get(gu_time, 0) + 1
 
 		if mechanic_name == "Kllng.Blw.Player":
-			killing_blows = mechanic_data['mechanicsData']
-			for entry in killing_blows:
-				kb_time = entry['time']
-				kb_actor = entry['actor']
-				kb_key = f"{kb_time}|{kb_actor}"
-				if kb_key not in killing_blows_cnts:
-					killing_blows_cnts[kb_key] = 0
-				killing_blows_cnts[kb_key] += 1		
-
-	for gu_entry in got_up_cnts:
-		rally_time = gu_entry
-		for kb_entry in killing_blows_cnts:
-			kb_time, kb_actor = kb_entry.split('|')
-			for player in players:
-				if player['name'] == kb_actor:
-					kb_actor = f"{player['profession']}|{player['name']}|{get_player_account(player)}"
-			if str(kb_time) == str(rally_time):
-				rally_count = got_up_cnts[gu_entry] if got_up_cnts[gu_entry] < killing_blows_cnts[kb_entry] else killing_blows_cnts[kb_entry]
-				killing_blow_rallies['total'] += rally_count
-				rallies += rally_count
-				if kb_actor not in killing_blow_rallies['kb_players']:
-					killing_blow_rallies['kb_players'][kb_actor] = 0
-				killing_blow_rallies['kb_players'][kb_actor] = killing_blow_rallies['kb_players'].get(kb_actor,0) + rally_count
+			for entry in mechanic_data['mechanicsData']:
+				kb_key = (str(entry['time']), entry['actor'])
+				killing_blows_cnts[kb_key] = killing_blows_cnts.get(kb_key, 0) + 1
+
+	# killing blows by time, in the order they were first seen
+	killing_blows_by_time = {}
+	for (kb_time, kb_actor), kb_count in killing_blows_cnts.items():
+		killing_blows_by_time.setdefault(kb_time, []).append((actor_names.get(kb_actor, kb_actor), kb_count))
+
+	for rally_time, gu_count in got_up_cnts.items():
+		for kb_actor, kb_count in killing_blows_by_time.get(str(rally_time), ()):
+			rally_count = min(gu_count, kb_count)
+			killing_blow_rallies['total'] += rally_count
+			rallies += rally_count
+			killing_blow_rallies['kb_players'][kb_actor] = killing_blow_rallies['kb_players'].get(kb_actor, 0) + rally_count
 
 	return rallies
 
+def get_mitigation_skill_name(skill_id: int, skill_data: dict, buff_data: dict) -> str:
+	"""
+	Get the name damage mitigation stats are kept under for a skill.
+
+	Args:
+		skill_id (int): The skill id.
+		skill_data (dict): The skill data.
+		buff_data (dict): The buff data.
+
+	Returns:
+		str: The skill or buff name, or "Unknown Skill <id>".
+	"""
+	if f"s{skill_id}" in skill_data:
+		return skill_data[f"s{skill_id}"]['name']
+	if f"b{skill_id}" in buff_data:
+		return buff_data[f"b{skill_id}"]['name']
+	return f"Unknown Skill {skill_id}"
+
+def new_damage_mitigation_entry() -> dict:
+	"""
+	Returns:
+		dict: The damage mitigation stats of one incoming skill, all 0.
+	"""
+	return {
+		'blocked': 0,
+		'blocked_dmg': 0,
+		'evaded': 0,
+		'evaded_dmg': 0,
+		'glanced': 0,
+		'glanced_dmg': 0,
+		'missed': 0,
+		'missed_dmg': 0,
+		'invulned': 0,
+		'invulned_dmg': 0,
+		'interrupted': 0,
+		'interrupted_dmg': 0,
+		'total_dmg': 0,
+		'skill_hits': 0,
+		'total_hits': 0,
+		'avg_dmg': 0,
+		'min_dmg': 0,
+		'avoided_damage': 0,
+		'min_avoided_damage': 0
+	}
+
+def add_damage_mitigation_counts(entry: dict, skill: dict) -> None:
+	"""
+	Add the avoided hits of an incoming skill to its damage mitigation stats.
+
+	Args:
+		entry (dict): The damage mitigation stats, see new_damage_mitigation_entry.
+		skill (dict): The skill of a totalDamageTaken or totalDamageTakenDist list.
+	"""
+	entry['blocked'] += skill['blocked']
+	entry['evaded'] += skill['evaded']
+	entry['glanced'] += skill['glance']
+	entry['missed'] += skill['missed']
+	entry['invulned'] += skill['invulned']
+	entry['interrupted'] += skill['interrupted']
+	entry['skill_hits'] += skill['hits']
+
 def get_damage_mitigation_data(fight_num: int, players: dict, targets: dict, skill_data: dict, buff_data: dict) -> None:
 	"""
-	Collects damage mitigation data from a fight and stores it in a dictionary.
+	Collect the enemy skill damage and the hits avoided by the squad in a fight.
+
+	The enemy damage of each skill is kept as running aggregates: the total damage and connected
+	hits, and the count, sum and lowest value of its per target minimum hit. The avoided damage
+	is only estimated by calculate_damage_mitigation, once every fight has been merged.
 
 	Args:
 		fight_num (int): The fight number for the data.
@@ -2376,111 +3013,35 @@ def get_damage_mitigation_data(fight_num: int, players: dict, targets: dict, ski
 	for target in targets:
 		if 'totalDamageDist' in target:
 			for skill in target['totalDamageDist'][0]:
-				skill_id = skill['id']
-				if f"s{skill_id}" in skill_data:
-					skill_name = skill_data[f"s{skill_id}"]['name']
-				elif f"b{skill_id}" in buff_data:
-					skill_name = buff_data[f"b{skill_id}"]['name']
-				else:
-					skill_name = f"Unknown Skill {skill_id}"
+				skill_name = get_mitigation_skill_name(skill['id'], skill_data, buff_data)
 				if skill_name not in enemy_avg_damage_per_skill:
 					enemy_avg_damage_per_skill[skill_name] = {
 						'dmg': 0,
 						'hits': 0,
-						'min': []
+						'count': 0,
+						'min_sum': 0,
+						'min': 0
 					}
-				enemy_avg_damage_per_skill[skill_name]['dmg'] += skill['totalDamage']
-				enemy_avg_damage_per_skill[skill_name]['hits'] += skill['connectedHits']
-				enemy_avg_damage_per_skill[skill_name]['min'].append(skill['min'])
+				enemy_skill = enemy_avg_damage_per_skill[skill_name]
+				enemy_skill['dmg'] += skill['totalDamage']
+				enemy_skill['hits'] += skill['connectedHits']
+				enemy_skill['count'] += 1
+				enemy_skill['min_sum'] += skill['min']
+				# a 'min' of 0 counts as unset when the fights are merged
+				if skill['min'] and (not enemy_skill['min'] or skill['min'] < enemy_skill['min']):
+					enemy_skill['min'] = skill['min']
 
 	for player in players:
 		if player['notInSquad']:
 			continue
-		name_prof = f"{player['name']}|{player['profession']}|{get_player_account(player)}"
+		name_prof = get_actor(player)['name_prof']
 		if 'totalDamageTaken' in player:
-			if name_prof not in player_damage_mitigation:
-				player_damage_mitigation[name_prof] = {}
+			player_skills = player_damage_mitigation.setdefault(name_prof, {})
 			for skill in player['totalDamageTaken'][0]:
-				skill_id = skill['id']
-				if f"s{skill_id}" in skill_data:
-					skill_name = skill_data[f"s{skill_id}"]['name']
-				elif f"b{skill_id}" in buff_data:
-					skill_name = buff_data[f"b{skill_id}"]['name']
-				else:
-					skill_name = f"Unknown Skill {skill_id}"
-				if skill_name not in player_damage_mitigation[name_prof]:
-					player_damage_mitigation[name_prof][skill_name] = {
-						'blocked': 0,
-						'blocked_dmg': 0,
-						'evaded': 0,
-						'evaded_dmg': 0,
-						'glanced': 0,
-						'glanced_dmg': 0,
-						'missed': 0,
-						'missed_dmg': 0,
-						'invulned': 0,
-						'invulned_dmg': 0,
-						'interrupted': 0,
-						'interrupted_dmg': 0,
-						'total_dmg': 0,
-						'skill_hits': 0,
-						'total_hits': 0,
-						'avg_dmg': 0,
-						'min_dmg': 0,
-						'avoided_damage': 0,
-						'min_avoided_damage': 0
-					}
-
-				if skill_name not in enemy_avg_damage_per_skill:
-					enemy_avg_dmg = 1
-					enemy_min_dmg = 1
-				else:
-					enemy_min_dmg = sum(enemy_avg_damage_per_skill[skill_name]['min']) / len(enemy_avg_damage_per_skill[skill_name]['min']) if skill_name in enemy_avg_damage_per_skill else 0
-					enemy_avg_dmg = enemy_avg_damage_per_skill[skill_name]['dmg'] / enemy_avg_damage_per_skill[skill_name]['hits'] if enemy_avg_damage_per_skill[skill_name]['hits'] > 0 else 0
-				player_damage_mitigation[name_prof][skill_name]['blocked'] += skill['blocked']
-				player_damage_mitigation[name_prof][skill_name]['evaded'] += skill['evaded']
-				player_damage_mitigation[name_prof][skill_name]['glanced'] += skill['glance']
-				player_damage_mitigation[name_prof][skill_name]['missed'] += skill['missed']
-				player_damage_mitigation[name_prof][skill_name]['invulned'] += skill['invulned']
-				player_damage_mitigation[name_prof][skill_name]['interrupted'] += skill['interrupted']
-				player_damage_mitigation[name_prof][skill_name]['total_dmg'] = enemy_avg_damage_per_skill[skill_name]['dmg'] if skill_name in enemy_avg_damage_per_skill else 0
-				player_damage_mitigation[name_prof][skill_name]['skill_hits'] += skill['hits']
-				player_damage_mitigation[name_prof][skill_name]['total_hits'] = enemy_avg_damage_per_skill[skill_name]['hits'] if skill_name in enemy_avg_damage_per_skill else 0
-				if player_damage_mitigation[name_prof][skill_name]['total_hits'] > 0:
-					player_damage_mitigation[name_prof][skill_name]['avg_dmg'] = enemy_avg_dmg
-					player_damage_mitigation[name_prof][skill_name]['min_dmg'] = enemy_min_dmg
-					avoided_damage = (
-						player_damage_mitigation[name_prof][skill_name]['glanced'] * player_damage_mitigation[name_prof][skill_name]['avg_dmg'] / 2
-						+ (
-							(
-							player_damage_mitigation[name_prof][skill_name]['blocked']
-							+ player_damage_mitigation[name_prof][skill_name]['evaded']
-							+ player_damage_mitigation[name_prof][skill_name]['missed']
-							+ player_damage_mitigation[name_prof][skill_name]['invulned']
-							+ player_damage_mitigation[name_prof][skill_name]['interrupted']
-						) * player_damage_mitigation[name_prof][skill_name]['avg_dmg']
-						)
-					)
-					min_avoided_damage = (
-						player_damage_mitigation[name_prof][skill_name]['glanced'] * player_damage_mitigation[name_prof][skill_name]['min_dmg'] / 2
-						+ (
-							(
-							player_damage_mitigation[name_prof][skill_name]['blocked']
-							+ player_damage_mitigation[name_prof][skill_name]['evaded']
-							+ player_damage_mitigation[name_prof][skill_name]['missed']
-							+ player_damage_mitigation[name_prof][skill_name]['invulned']
-							+ player_damage_mitigation[name_prof][skill_name]['interrupted']
-						) * player_damage_mitigation[name_prof][skill_name]['min_dmg']
-						)
-					)
-					player_damage_mitigation[name_prof][skill_name]['blocked_dmg'] += player_damage_mitigation[name_prof][skill_name]['blocked'] * player_damage_mitigation[name_prof][skill_name]['avg_dmg']
-					player_damage_mitigation[name_prof][skill_name]['evaded_dmg'] += player_damage_mitigation[name_prof][skill_name]['evaded'] * player_damage_mitigation[name_prof][skill_name]['avg_dmg']
-					player_damage_mitigation[name_prof][skill_name]['glanced_dmg'] += player_damage_mitigation[name_prof][skill_name]['glanced'] * (player_damage_mitigation[name_prof][skill_name]['avg_dmg']/2)
-					player_damage_mitigation[name_prof][skill_name]['missed_dmg'] += player_damage_mitigation[name_prof][skill_name]['missed'] * player_damage_mitigation[name_prof][skill_name]['avg_dmg']
-					player_damage_mitigation[name_prof][skill_name]['invulned_dmg'] += player_damage_mitigation[name_prof][skill_name]['invulned'] * player_damage_mitigation[name_prof][skill_name]['avg_dmg']
-					player_damage_mitigation[name_prof][skill_name]['interrupted_dmg'] += player_damage_mitigation[name_prof][skill_name]['interrupted'] * player_damage_mitigation[name_prof][skill_name]['avg_dmg']
-					player_damage_mitigation[name_prof][skill_name]['avoided_damage'] += avoided_damage
-					player_damage_mitigation[name_prof][skill_name]['min_avoided_damage'] += min_avoided_damage
+				skill_name = get_mitigation_skill_name(skill['id'], skill_data, buff_data)
+				if skill_name not in player_skills:
+					player_skills[skill_name] = new_damage_mitigation_entry()
+				add_damage_mitigation_counts(player_skills[skill_name], skill)
 
 		if "minions" in player:
 			for minion in player["minions"]:
@@ -2490,97 +3051,62 @@ def get_damage_mitigation_data(fight_num: int, players: dict, targets: dict, ski
 				if "UNKNOWN" in minion_name:
 					minion_name = "Unknown"
 				for skill in minion['totalDamageTakenDist'][0]:
-					skill_id = skill['id']
-					if f"s{skill_id}" in skill_data:
-						skill_name = skill_data[f"s{skill_id}"]['name']
-					elif f"b{skill_id}" in buff_data:
-						skill_name = buff_data[f"b{skill_id}"]['name']
-					else:
-						skill_name = f"Unknown Skill {skill_id}"
-
-					if name_prof not in player_minion_damage_mitigation:
-						player_minion_damage_mitigation[name_prof] = {}
-					if minion_name not in player_minion_damage_mitigation[name_prof]:
-						player_minion_damage_mitigation[name_prof][minion_name] = {}
-					if skill_name not in player_minion_damage_mitigation[name_prof][minion_name]:
-						player_minion_damage_mitigation[name_prof][minion_name][skill_name] = {
-							'blocked': 0,
-							'blocked_dmg': 0,
-							'evaded': 0,
-							'evaded_dmg': 0,
-							'glanced': 0,
-							'glanced_dmg': 0,
-							'missed': 0,
-							'missed_dmg': 0,
-							'invulned': 0,
-							'invulned_dmg': 0,
-							'interrupted': 0,
-							'interrupted_dmg': 0,
-							'total_dmg': 0,
-							'skill_hits': 0,
-							'total_hits': 0,
-							'avg_dmg': 0,
-							'min_dmg': 0,
-							'avoided_damage': 0,
-							'min_avoided_damage': 0							
-						}
-					if skill_name not in enemy_avg_damage_per_skill:
-						enemy_avg_dmg = 1
-						enemy_min_dmg = 1
+					skill_name = get_mitigation_skill_name(skill['id'], skill_data, buff_data)
+					minion_skills = player_minion_damage_mitigation.setdefault(name_prof, {}).setdefault(minion_name, {})
+					if skill_name not in minion_skills:
+						minion_skills[skill_name] = new_damage_mitigation_entry()
+					add_damage_mitigation_counts(minion_skills[skill_name], skill)
+
+def set_avoided_damage(entry: dict, avg_dmg: float, min_dmg: float) -> None:
+	"""
+	Estimate the damage avoided against one incoming skill from its average and minimum hit.
+
+	Glancing hits count as half a hit, the other avoided hits as a full one.
+
+	Args:
+		entry (dict): The damage mitigation stats, updated in place.
+		avg_dmg (float): The average enemy hit of the skill.
+		min_dmg (float): The average minimum enemy hit of the skill.
+	"""
+	entry['avg_dmg'] = avg_dmg
+	entry['min_dmg'] = min_dmg
+	avoided_hits = entry['blocked'] + entry['evaded'] + entry['missed'] + entry['invulned'] + entry['interrupted']
+	entry['avoided_damage'] = entry['glanced'] * avg_dmg / 2 + avoided_hits * avg_dmg
+	entry['min_avoided_damage'] = entry['glanced'] * min_dmg / 2 + avoided_hits * min_dmg
+	entry['blocked_dmg'] = entry['blocked'] * avg_dmg
+	entry['evaded_dmg'] = entry['evaded'] * avg_dmg
+	entry['glanced_dmg'] = entry['glanced'] * (avg_dmg / 2)
+	entry['missed_dmg'] = entry['missed'] * avg_dmg
+	entry['invulned_dmg'] = entry['invulned'] * avg_dmg
+	entry['interrupted_dmg'] = entry['interrupted'] * avg_dmg
+
+def calculate_damage_mitigation() -> None:
+	"""
+	Estimate the damage the squad and their minions avoided, from the enemy averages of the whole session.
+
+	Runs once after the fights are merged, so every fight is scored against the same averages
+	whatever order the fights were parsed in.
+	"""
+	for player_skills in player_damage_mitigation.values():
+		for skill_name, entry in player_skills.items():
+			enemy_skill = enemy_avg_damage_per_skill.get(skill_name)
+			entry['total_dmg'] = enemy_skill['dmg'] if enemy_skill else 0
+			entry['total_hits'] = enemy_skill['hits'] if enemy_skill else 0
+			if entry['total_hits'] > 0:
+				set_avoided_damage(entry, enemy_skill['dmg'] / enemy_skill['hits'], enemy_skill['min_sum'] / enemy_skill['count'])
+
+	for minions_skills in player_minion_damage_mitigation.values():
+		for minion_skills in minions_skills.values():
+			for skill_name, entry in minion_skills.items():
+				enemy_skill = enemy_avg_damage_per_skill.get(skill_name)
+				entry['total_dmg'] = enemy_skill['dmg'] if enemy_skill else 0
+				entry['total_hits'] = enemy_skill['hits'] if enemy_skill else 0
+				if entry['skill_hits'] > 0:
+					if enemy_skill is None:
+						set_avoided_damage(entry, 1, 0)
 					else:
-						enemy_min_dmg = sum(enemy_avg_damage_per_skill[skill_name]['min']) / len(enemy_avg_damage_per_skill[skill_name]['min']) if skill_name in enemy_avg_damage_per_skill else 0
-						enemy_avg_dmg = enemy_avg_damage_per_skill[skill_name]['dmg'] / enemy_avg_damage_per_skill[skill_name]['hits'] if enemy_avg_damage_per_skill[skill_name]['hits'] > 0 else 0
-					player_minion_damage_mitigation[name_prof][minion_name][skill_name]['blocked'] += skill['blocked']
-					player_minion_damage_mitigation[name_prof][minion_name][skill_name]['evaded'] += skill['evaded']
-					player_minion_damage_mitigation[name_prof][minion_name][skill_name]['glanced'] += skill['glance']
-					player_minion_damage_mitigation[name_prof][minion_name][skill_name]['missed'] += skill['missed']
-					player_minion_damage_mitigation[name_prof][minion_name][skill_name]['invulned'] += skill['invulned']
-					player_minion_damage_mitigation[name_prof][minion_name][skill_name]['interrupted'] += skill['interrupted']
-					player_minion_damage_mitigation[name_prof][minion_name][skill_name]['skill_hits'] += skill['hits']
-					player_minion_damage_mitigation[name_prof][minion_name][skill_name]['total_dmg'] = enemy_avg_damage_per_skill[skill_name]['dmg'] if skill_name in enemy_avg_damage_per_skill else 0
-					player_minion_damage_mitigation[name_prof][minion_name][skill_name]['total_hits'] = enemy_avg_damage_per_skill[skill_name]['hits'] if skill_name in enemy_avg_damage_per_skill else 0
-
-					if player_minion_damage_mitigation[name_prof][minion_name][skill_name]['skill_hits'] > 0:
-						player_minion_damage_mitigation[name_prof][minion_name][skill_name]['avg_dmg'] = enemy_avg_dmg
-						if skill_name in enemy_avg_damage_per_skill:
-							player_minion_damage_mitigation[name_prof][minion_name][skill_name]['min_dmg'] = enemy_min_dmg
-						else:
-							player_minion_damage_mitigation[name_prof][minion_name][skill_name]['min_dmg'] = 0
-						avoided_damage = (
-							player_minion_damage_mitigation[name_prof][minion_name][skill_name]['glanced'] * player_minion_damage_mitigation[name_prof][minion_name][skill_name]['avg_dmg']/2
-							+(
-								(
-									#player_minion_damage_mitigation[name_prof][minion_name][
-									player_minion_damage_mitigation[name_prof][minion_name][skill_name]['blocked']
-									+ player_minion_damage_mitigation[name_prof][minion_name][skill_name]['evaded']
-									+ player_minion_damage_mitigation[name_prof][minion_name][skill_name]['missed']
-									+ player_minion_damage_mitigation[name_prof][minion_name][skill_name]['invulned']
-									+ player_minion_damage_mitigation[name_prof][minion_name][skill_name]['interrupted']
-
-								)* player_minion_damage_mitigation[name_prof][minion_name][skill_name]['avg_dmg']
-							)
-						)
-						min_avoided_damage = (
-							player_minion_damage_mitigation[name_prof][minion_name][skill_name]['glanced'] * player_minion_damage_mitigation[name_prof][minion_name][skill_name]['min_dmg']/2
-							+(
-								(
-									player_minion_damage_mitigation[name_prof][minion_name][skill_name]['blocked']
-									+player_minion_damage_mitigation[name_prof][minion_name][skill_name]['evaded']
-									+player_minion_damage_mitigation[name_prof][minion_name][skill_name]['missed']
-									+player_minion_damage_mitigation[name_prof][minion_name][skill_name]['invulned']
-									+player_minion_damage_mitigation[name_prof][minion_name][skill_name]['interrupted']
-
-								)*player_minion_damage_mitigation[name_prof][minion_name][skill_name]['min_dmg']
-							)
-						)
-						player_minion_damage_mitigation[name_prof][minion_name][skill_name]['blocked_dmg'] = player_minion_damage_mitigation[name_prof][minion_name][skill_name]['blocked'] * player_minion_damage_mitigation[name_prof][minion_name][skill_name]['avg_dmg']
-						player_minion_damage_mitigation[name_prof][minion_name][skill_name]['evaded_dmg'] = player_minion_damage_mitigation[name_prof][minion_name][skill_name]['evaded'] * player_minion_damage_mitigation[name_prof][minion_name][skill_name]['avg_dmg']
-						player_minion_damage_mitigation[name_prof][minion_name][skill_name]['glanced_dmg'] = player_minion_damage_mitigation[name_prof][minion_name][skill_name]['glanced'] * (player_minion_damage_mitigation[name_prof][minion_name][skill_name]['avg_dmg']/2)
-						player_minion_damage_mitigation[name_prof][minion_name][skill_name]['missed_dmg'] = player_minion_damage_mitigation[name_prof][minion_name][skill_name]['missed'] * player_minion_damage_mitigation[name_prof][minion_name][skill_name]['avg_dmg']
-						player_minion_damage_mitigation[name_prof][minion_name][skill_name]['invulned_dmg'] = player_minion_damage_mitigation[name_prof][minion_name][skill_name]['invulned'] * player_minion_damage_mitigation[name_prof][minion_name][skill_name]['avg_dmg']
-						player_minion_damage_mitigation[name_prof][minion_name][skill_name]['interrupted_dmg'] = player_minion_damage_mitigation[name_prof][minion_name][skill_name]['interrupted'] * player_minion_damage_mitigation[name_prof][minion_name][skill_name]['avg_dmg']
-						player_minion_damage_mitigation[name_prof][minion_name][skill_name]['avoided_damage'] = avoided_damage
-						player_minion_damage_mitigation[name_prof][minion_name][skill_name]['min_avoided_damage'] = min_avoided_damage
+						avg_dmg = enemy_skill['dmg'] / enemy_skill['hits'] if enemy_skill['hits'] > 0 else 0
+						set_avoided_damage(entry, avg_dmg, enemy_skill['min_sum'] / enemy_skill['count'])
 
 def get_minions_by_player(player_data: dict, player_name: str, profession: str) -> None:
 	"""
@@ -2594,7 +3120,7 @@ def get_minions_by_player(player_data: dict, player_name: str, profession: str)
 	Returns:
 		None
 	"""
-	player_name = player_name+"|"+profession+"|"+get_player_account(player_data)
+	player_name = player_name+"|"+profession+"|"+get_actor(player_data)['account']
 	if "minions" in player_data:
 		if profession not in minions:
 			minions[profession] = {"player": {}, "pets_list": [], "pet_skills_list": []}
@@ -2783,12 +3309,7 @@ def parse_file(file_path, fight_num, guild_data, fight_data_charts):
 	"""
 	json_stats = config.json_stats
 
-	if file_path.endswith('.gz'):
-		with gzip.open(file_path, mode="r") as f:
-			json_data = json.loads(f.read().decode('utf-8'))
-	else:
-		json_datafile = open(file_path, encoding='utf-8')
-		json_data = json.load(json_datafile)
+	json_data = load_log_json(file_path)
 
 	if 'usedExtensions' not in json_data:
 		players_running_healing_addon = []
@@ -2798,10 +3319,10 @@ def parse_file(file_path, fight_num, guild_data, fight_data_charts):
 			if extension['name'] == "Healing Stats":
 				players_running_healing_addon = extension['runningExtension']
 	
-	players = json_data['players']
-	targets = json_data['targets']
-	skill_map = json_data['skillMap']
-	buff_map = json_data['buffMap']
+	players = json_data.players
+	targets = json_data.targets
+	skill_map = json_data.skillMap
+	buff_map = json_data.buffMap
 	if 'mechanics' in json_data:
 		mechanics_map = json_data['mechanics']
 	else:
@@ -2809,22 +3330,26 @@ def parse_file(file_path, fight_num, guild_data, fight_data_charts):
 	damage_mod_map = json_data.get('damageModMap', {})
 	personal_buffs = json_data.get('personalBuffs', {})
 	personal_damage_mods = json_data.get('personalDamageMods', {})
-	fight_date, fight_end, fight_utc = json_data['timeEnd'].split(' ')
+	fight_date, fight_end, fight_utc = json_data.timeEnd.split(' ')
 	if 'combatReplayMetaData' in json_data:
 		inches_to_pixel = json_data['combatReplayMetaData']['inchToPixel']
 		polling_rate = json_data['combatReplayMetaData']['pollingRate']
-	upload_link = json_data['uploadLinks'][0]
-	fight_duration = json_data['duration']
-	fight_duration_ms = json_data['durationMS']
-	fight_name = json_data['fightName']
-	fight_link = json_data['uploadLinks'][0]
+	upload_link = json_data.uploadLinks[0]
+	fight_duration = json_data.duration
+	fight_duration_ms = json_data.durationMS
+	fight_name = json_data.fightName
+	fight_link = json_data.uploadLinks[0]
 	dist_to_com = []
 	player_in_combat = 0
 
-	enemy_engaged_count = sum(1 for enemy in targets if not enemy['isFake'])
+	enemy_engaged_count = sum(1 for enemy in targets if not enemy.isFake)
 
 	log_type, fight_name = determine_log_type_and_extract_fight_name(fight_name)
 
+	#index the squad members once, every stage below reads their keys and combat time from it
+	build_actor_index(players)
+	clear_stat_facts()
+
 	calculate_dps_stats(json_data)
 
 	top_stats['overall']['last_fight'] = f"{fight_date}-{fight_end}"
@@ -2857,6 +3382,7 @@ def parse_file(file_path, fight_num, guild_data, fight_data_charts):
 
 	#get commander data
 	commander_tag_positions, dead_tag_mark, dead_tag = get_commander_tag_data(json_data)
+	tag_distances = get_tag_distance_index(players, commander_tag_positions, inches_to_pixel)
 
 	#collect player counts and parties
 	get_parties_by_fight(fight_num, players)
@@ -2879,36 +3405,40 @@ def parse_file(file_path, fight_num, guild_data, fight_data_charts):
 	#collect personal buff data
 	get_personal_buff_data(personal_buffs)
 
-	#collect mechanics data
-	get_mechanics_by_fight(fight_num, mechanics_map, players, log_type)
+	#collect mechanics data, their actors are only named so the players are indexed by name once
+	actor_names = index_actor_names(players)
+	get_mechanics_by_fight(fight_num, mechanics_map, actor_names, log_type)
 
 	#top_stats['fight'][fight_num]['rallies'] = get_rally_mechanics_by_fight(mechanics_map)
-	top_stats['fight'][fight_num]['rallies'] = get_rally_mechanics_by_fight(mechanics_map, players)
+	top_stats['fight'][fight_num]['rallies'] = get_rally_mechanics_by_fight(mechanics_map, actor_names)
 	top_stats['overall']['rallies'] = top_stats['overall'].get('rallies', 0) + top_stats['fight'][fight_num]['rallies']
 
-	#collect damage mitigation data
+	#collect damage mitigation counts, the avoided damage is estimated once the session is merged
 	get_damage_mitigation_data(fight_num, players, targets, skill_map, buff_map)
 
 	get_illusion_of_life_data(players, fight_duration_ms)
+
+	#walk the target buffs once for all squad members
+	target_buff_sources = get_target_buff_sources(targets, players, fight_duration_ms) if 'targetBuffs' in json_stats else {}
 	
 	#process each player in the fight
 	for player in players:
 		# skip players not in squad
-		if player['notInSquad']:
+		if player.notInSquad:
 			continue
-		name = player['name']
-		profession = player['profession']
-		account = get_player_account(player)
-		group = player['group']
+		actor = get_actor(player)
+		name = actor['name']
+		profession = actor['profession']
+		account = actor['account']
+		group = actor['group']
 		group_count = len(top_stats['parties_by_fight'][fight_num][group])
 		squad_count = top_stats['fight'][fight_num]['squad_count']
 
-		name_prof = name + "|" + profession + "|" + account
-		tag = player['hasCommanderTag']
-		if tag:	#Commander Tracking
+		name_prof = actor['name_prof']
+		if actor['commander']:	#Commander Tracking
 			top_stats['fight'][fight_num]['commander'] = name_prof
 
-		combat_time = round(sum_breakpoints(get_combat_time_breakpoints(player)) / 1000)
+		combat_time = actor['combat_time']
 		if not combat_time:
 			continue
 		
@@ -2933,7 +3463,6 @@ def parse_file(file_path, fight_num, guild_data, fight_data_charts):
 			guild_status = ""
 
 		if name_prof not in top_stats['player']:
-			print('Found new player: '+name_prof)
 			top_stats['player'][name_prof] = {
 				'name': name,
 				'profession': profession,
@@ -2964,7 +3493,7 @@ def parse_file(file_path, fight_num, guild_data, fight_data_charts):
 		if player["profession"] in ["Mesmer", "Chronomancer", "Mirage"]:
 			determine_clone_usage(player, skill_map, mesmer_shatter_skills)
 
-		get_player_death_on_tag(player, commander_tag_positions, dead_tag_mark, dead_tag, inches_to_pixel, polling_rate)
+		get_player_death_on_tag(player, commander_tag_positions, tag_distances, dead_tag_mark, dead_tag, inches_to_pixel, polling_rate)
 
 		# Cumulative group and squad supported counts
 		top_stats['player'][name_prof]['num_fights'] = top_stats['player'][name_prof].get('num_fights', 0) + 1
@@ -3034,7 +3563,409 @@ def parse_file(file_path, fight_num, guild_data, fight_data_charts):
 					get_barrier_skill_data(player, stat_cat, name_prof)
 
 			if stat_cat in ['targetBuffs']:
-				get_target_buff_data(fight_num, player, targets, stat_cat, name_prof)
+				get_target_buff_data(fight_num, player, target_buff_sources, stat_cat, name_prof)
 
 			if stat_cat in ['damageModifiers']:
 				get_damage_mod_by_player(fight_num, player, name_prof)
+
+	#sum the fight's stat facts into the player, fight and overall totals
+	rollup_stat_facts()
+
+	#release the fight's players held by the actor index
+	fight_actors.clear()
+
+
+def get_accumulators() -> dict:
+	"""
+	Map the name of each accumulator filled in by parse_file to its live object.
+
+	Returns:
+		dict: The accumulator objects keyed by name.
+	"""
+	return {
+		"top_stats": top_stats,
+		"team_code_missing": team_code_missing,
+		"personal_damage_mod_data": personal_damage_mod_data,
+		"personal_buff_data": personal_buff_data,
+		"buff_data": buff_data,
+		"skill_data": skill_data,
+		"damage_mod_data": damage_mod_data,
+		"high_scores": high_scores,
+		"fb_pages": fb_pages,
+		"mechanics": mechanics,
+		"minions": minions,
+		"mesmer_clone_usage": mesmer_clone_usage,
+		"death_on_tag": death_on_tag,
+		"commander_summary_data": commander_summary_data,
+		"DPSStats": DPSStats,
+		"stacking_uptime_Table": stacking_uptime_Table,
+		"IOL_revive": IOL_revive,
+		"fight_data": fight_data,
+		"killing_blow_rallies": killing_blow_rallies,
+		"enemy_avg_damage_per_skill": enemy_avg_damage_per_skill,
+		"player_damage_mitigation": player_damage_mitigation,
+		"player_minion_damage_mitigation": player_minion_damage_mitigation,
+	}
+
+def new_accumulators() -> dict:
+	"""
+	Build an empty set of accumulators with the same layout as the module globals.
+
+	Returns:
+		dict: Empty accumulators keyed by name.
+	"""
+	accumulators = {name: type(value)() for name, value in get_accumulators().items()}
+	accumulators["top_stats"] = copy.deepcopy(empty_top_stats)
+	accumulators["personal_damage_mod_data"]["total"] = []
+	accumulators["personal_buff_data"]["total"] = []
+	accumulators["killing_blow_rallies"].update({"total": 0, 'kb_players': {}})
+	return accumulators
+
+def restore_accumulators(accumulators: dict) -> None:
+	"""
+	Replace the contents of the module accumulators in place, keeping the objects
+	imported by other modules valid.
+
+	Args:
+		accumulators (dict): The accumulators to load, keyed by name.
+	"""
+	for name, target in get_accumulators().items():
+		target.clear()
+		if isinstance(target, list):
+			target.extend(accumulators[name])
+		else:
+			target.update(accumulators[name])
+
+def merge_accumulator(dest: dict, src: dict, list_mode: str, extreme_values: bool = False) -> None:
+	"""
+	Merge one fight's accumulator into the session accumulator in place.
+
+	Numbers are summed, except the keys in merge_last_value_keys / merge_first_value_keys which
+	keep the newest / oldest value, and 'max' / 'min' below merge_extreme_value_keys which keep
+	the extreme value (a 'min' of 0 counts as unset). Strings, booleans and None keep the first
+	value seen. Lists are combined according to list_mode.
+
+	Args:
+		dest (dict): The session accumulator.
+		src (dict): The fight accumulator, which may be reused by dest.
+		list_mode (str): "unique", "extend" or "add".
+		extreme_values (bool): Whether 'max' and 'min' keep the extreme value. Defaults to False.
+	"""
+	for key, value in src.items():
+		if key not in dest:
+			dest[key] = value
+			continue
+		current = dest[key]
+		if isinstance(current, dict) and isinstance(value, dict):
+			merge_accumulator(current, value, list_mode, extreme_values or key in merge_extreme_value_keys)
+		elif isinstance(current, list) and isinstance(value, list):
+			merge_accumulator_list(current, value, "max" if key in merge_list_max_keys else list_mode)
+		elif key in merge_last_value_keys:
+			if value not in ("", None):
+				dest[key] = value
+		elif key in merge_first_value_keys:
+			continue
+		elif isinstance(current, (int, float)) and isinstance(value, (int, float)) and not isinstance(current, bool):
+			if extreme_values and key == 'max':
+				dest[key] = max(current, value)
+			elif extreme_values and key == 'min':
+				dest[key] = current if value == 0 else value if current == 0 else min(current, value)
+			else:
+				dest[key] = current + value
+
+def merge_accumulator_list(dest: list, src: list, list_mode: str) -> None:
+	"""
+	Merge one fight's list into the session list in place.
+
+	Args:
+		dest (list): The session list.
+		src (list): The fight list.
+		list_mode (str): "unique" appends unseen items, "extend" appends everything,
+			"add" sums the values element-wise, "max" keeps the element-wise max.
+	"""
+	if list_mode in ("add", "max"):
+		for index, value in enumerate(src):
+			if index >= len(dest):
+				dest.append(value)
+			elif list_mode == "max":
+				dest[index] = max(dest[index], value)
+			else:
+				dest[index] += value
+	elif list_mode == "extend":
+		dest.extend(src)
+	else:
+		for value in src:
+			if value not in dest:
+				dest.append(value)
+
+# parse_fight_partial hands its spans to the main process before returning, so it is profiled as a file span
+profile_exclude = ("parse_fight_partial",)
+
+def get_worker_settings() -> dict:
+	"""
+	Returns:
+		dict: The module settings of the main process that ingest workers must share.
+	"""
+	return {
+		"json_backend": json_backend.json_backend,
+		"native_log_decoding": log_reader.native_log_decoding,
+		"extracted_archives": log_reader.extracted_archives,
+		"dps_engine": dps_engine,
+		"burst_windows": ",".join(str(seconds) for seconds in burst_windows),
+		"damage_debuffs": get_damage_debuffs_setting(),
+		"profile": run_profiler.profiler_enabled,
+		"profile_memory": run_profiler.memory_tracing,
+	}
+
+def init_parse_worker(settings: dict) -> None:
+	"""
+	Set up an ingest worker process with the settings of the main process.
+
+	Args:
+		settings (dict): The settings from get_worker_settings.
+	"""
+	json_backend.set_json_backend(settings["json_backend"])
+	log_reader.set_native_log_decoding(settings["native_log_decoding"])
+	log_reader.set_extracted_archives(settings["extracted_archives"])
+	set_dps_engine(settings["dps_engine"])
+	set_burst_windows(settings["burst_windows"])
+	set_damage_debuffs(settings["damage_debuffs"])
+	if settings["profile"]:
+		run_profiler.enable_profiler(settings["profile_memory"])
+		run_profiler.reset_profiler()
+		run_profiler.instrument_namespace(globals(), "parser", exclude=profile_exclude)
+
+def parse_fight_partial(task: tuple) -> dict:
+	"""
+	Parse a single log into freshly reset accumulators and return them as a partial aggregate.
+
+	This is the unit of work of the ingest pool, so it only depends on its arguments.
+
+	Args:
+		task (tuple): (file_path, fight_num, guild_data, fight_data_charts)
+
+	Returns:
+		dict: The fight's accumulators keyed by name, plus its high score candidates.
+	"""
+	file_path, fight_num, guild_data, fight_data_charts = task
+	print("parsing " + get_log_name(file_path))
+
+	with run_profiler.profile_span(get_log_name(file_path), "file", fight_num=fight_num):
+		for name, value in new_accumulators().items():
+			target = get_accumulators()[name]
+			target.clear()
+			if isinstance(target, list):
+				target.extend(value)
+			else:
+				target.update(value)
+		high_score_candidates.clear()
+
+		parse_file(file_path, fight_num, guild_data, fight_data_charts)
+
+		partial = {name: copy.copy(value) for name, value in get_accumulators().items()}
+		partial["fight_num"] = fight_num
+		partial["high_score_candidates"] = list(high_score_candidates)
+
+	# spans recorded in a worker process travel back with the partial, they are never cached
+	if run_profiler.profiler_enabled:
+		partial["profile"] = run_profiler.take_profile()
+	return partial
+
+def renumber_fight_partial(partial: dict, fight_num: int) -> None:
+	"""
+	Move a fight's partial aggregate to another fight number in place.
+
+	Cached partials are keyed by log content only, so a log is merged under a new number
+	when earlier logs are added to or removed from the run.
+
+	Args:
+		partial (dict): The partial returned by parse_fight_partial.
+		fight_num (int): The fight number to merge the partial as.
+	"""
+	parsed_num = partial["fight_num"]
+	if parsed_num == fight_num:
+		return
+	for path in fight_keyed_accumulators:
+		accumulator = partial
+		for name in path:
+			accumulator = accumulator[name]
+		if parsed_num in accumulator:
+			accumulator[fight_num] = accumulator.pop(parsed_num)
+	partial["high_score_candidates"] = [
+		(stat_name, dict(record, fight=fight_num)) for stat_name, record in partial["high_score_candidates"]
+	]
+	partial["fight_num"] = fight_num
+
+def merge_fight_partial(session: dict, partial: dict, fight_num: int) -> None:
+	"""
+	Merge a fight's partial aggregate into the session accumulators.
+
+	Partials must be merged in fight order; high score candidates are ranked here so ties
+	resolve exactly as they would when parsing one file after the other.
+
+	Args:
+		session (dict): The session accumulators, see new_accumulators.
+		partial (dict): The partial returned by parse_fight_partial, renumbered when it was
+			parsed as another fight number.
+		fight_num (int): The fight number of the partial in the session.
+	"""
+	renumber_fight_partial(partial, fight_num)
+	for name_prof in partial["top_stats"]["player"]:
+		if name_prof not in session["top_stats"]["player"]:
+			print('Found new player: '+name_prof)
+
+	for name, list_mode in accumulator_list_modes.items():
+		if name == "damage_mod_data":
+			# shared flag depends on the personal mods seen in all fights so far
+			for mod_id, mod_data in partial[name].items():
+				if mod_id not in session[name]:
+					mod_data['shared'] = mod_id not in session["personal_damage_mod_data"]['total']
+		if isinstance(session[name], list):
+			merge_accumulator_list(session[name], partial[name], list_mode)
+		else:
+			merge_accumulator(session[name], partial[name], list_mode, name in merge_extreme_value_keys)
+
+	for stat_name, record in partial["high_score_candidates"]:
+		rank_high_score(session["high_scores"], stat_name, record)
+
+def ingest_log_files(file_paths: list, guild_data, fight_data_charts: bool, workers: int = 1, first_fight_num: int = 1, cache: dict = None, session: dict = None) -> int:
+	"""
+	Parse a list of logs and load the combined results into the module accumulators.
+
+	Each log is reduced to a partial aggregate, in worker processes when workers > 1, and the
+	partials are merged in file order so the result is the same for any number of workers.
+	Fights found in the cache are loaded instead of parsed, and new partials are stored in it.
+
+	Args:
+		file_paths (list): The logs to parse, in fight order.
+		guild_data: The guild roster used to determine guild status, or None.
+		fight_data_charts (bool): Whether to collect the fight line chart data.
+		workers (int): The number of worker processes. Defaults to 1.
+		first_fight_num (int): The fight number of the first log. Defaults to 1.
+		cache (dict): The parsed fight cache from open_fight_cache, or None. Defaults to None.
+		session (dict): Accumulators of earlier fights to merge the logs into, see
+			load_session_state, or None to start empty. Defaults to None.
+
+	Returns:
+		int: The fight number of the last log parsed.
+	"""
+	tasks = [
+		(file_path, fight_num, guild_data, fight_data_charts)
+		for fight_num, file_path in enumerate(file_paths, start=first_fight_num)
+	]
+	cached_partials = {}
+	if cache is not None:
+		for file_path, fight_num, _, _ in tasks:
+			with run_profiler.profile_span(get_log_name(file_path), "file", fight_num=fight_num, cached=True):
+				partial = load_cached_fight(cache, file_path)
+			if partial is not None:
+				print("using cached " + get_log_name(file_path))
+				cached_partials[fight_num] = partial
+	parse_tasks = [task for task in tasks if task[1] not in cached_partials]
+	if session is None:
+		session = new_accumulators()
+
+	pool = None
+	if workers > 1 and len(parse_tasks) > 1:
+		pool = multiprocessing.Pool(min(workers, len(parse_tasks)), initializer=init_parse_worker, initargs=(get_worker_settings(),))
+		parsed_partials = pool.imap(parse_fight_partial, parse_tasks)
+	else:
+		parsed_partials = map(parse_fight_partial, parse_tasks)
+
+	try:
+		for file_path, fight_num, _, _ in tasks:
+			if fight_num in cached_partials:
+				partial = cached_partials.pop(fight_num)
+			else:
+				partial = next(parsed_partials)
+				if "profile" in partial:
+					run_profiler.merge_profile(partial.pop("profile"))
+				if cache is not None:
+					store_cached_fight(cache, file_path, partial)
+			merge_fight_partial(session, partial, fight_num)
+	finally:
+		if pool is not None:
+			pool.close()
+			pool.join()
+
+	restore_accumulators(session)
+	calculate_damage_mitigation()
+
+	return first_fight_num + len(tasks) - 1
+
+def save_session_state(state_path: str, ingested_files: list, last_fight_num: int, options: dict) -> None:
+	"""
+	Snapshot the merged accumulators so a later run can append new logs to them.
+
+	Must be called right after ingest_log_files, before the tiddlers are built. Damage mitigation
+	keeps its avoided hits and enemy aggregates, the estimates are recalculated once new fights are merged.
+
+	Args:
+		state_path (str): The path of the session state file.
+		ingested_files (list): The names of all logs in the session, in fight order.
+		last_fight_num (int): The fight number of the last log in the session.
+		options (dict): Parse options that change a fight's output, e.g. fight_data_charts.
+	"""
+	state = {
+		"parser_version": get_parser_version(),
+		"options": options,
+		"ingested_files": ingested_files,
+		"last_fight_num": last_fight_num,
+		"accumulators": get_accumulators(),
+	}
+	temp_path = state_path + ".tmp"
+	with open(temp_path, "wb") as f:
+		pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+	os.replace(temp_path, state_path)
+	print(f"Session state saved: {state_path}")
+
+def load_session_state(state_path: str, options: dict) -> Optional[dict]:
+	"""
+	Load a session state file written by save_session_state.
+
+	Args:
+		state_path (str): The path of the session state file.
+		options (dict): Parse options of this run, which must match the saved session.
+
+	Returns:
+		Optional[dict]: The state with the session accumulators under "session", ready to pass
+			to ingest_log_files, or None when the file is missing or was written by another
+			parser version or with other options.
+	"""
+	if not os.path.exists(state_path):
+		print(f"No session state found at {state_path}, parsing all logs")
+		return None
+	try:
+		with open(state_path, "rb") as f:
+			state = pickle.load(f)
+	except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+		print(f"Session state {state_path} is unreadable, parsing all logs")
+		return None
+	if state.get("parser_version") != get_parser_version():
+		print(f"Session state {state_path} is from another parser version, parsing all logs")
+		return None
+	if state.get("options") != options:
+		print(f"Session state {state_path} was saved with other options, parsing all logs")
+		return None
+
+	session = new_accumulators()
+	session.update(state["accumulators"])
+	state["session"] = session
+	return state
+
+def get_new_log_names(log_names: list, state: dict) -> list:
+	"""
+	Select the logs that are not part of a saved session yet.
+
+	Logs are matched by name instead of being compared to the last ingested name, since the
+	planner orders fights by their start time and a new log may be named before older ones.
+
+	Args:
+		log_names (list): The names of the logs in the input directory.
+		state (dict): The session state from load_session_state.
+
+	Returns:
+		list: The names in log_names that are not in the session, in the same order.
+	"""
+	ingested_files = set(state["ingested_files"])
+	return [log_name for log_name in log_names if log_name not in ingested_files]
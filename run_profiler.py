@@ -0,0 +1,372 @@
+#    This file contains the configuration for computing the detailed top stats in arcdps logs as parsed by Elite Insights.
+#    Copyright (C) 2024 John Long (Drevarr)
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import functools
+import inspect
+import json_backend
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+# Peak process memory is only available on Unix
+try:
+	import resource
+except ImportError:
+	resource = None
+
+# Function spans shorter than this are only aggregated, not written to the trace
+trace_min_duration_ns = 100_000
+# Span categories always written to the trace, they also record the resident memory of the process
+trace_categories = {"stage", "file"}
+
+profiler_enabled = False
+# Whether allocations are traced with tracemalloc to give every span its own peak memory
+memory_tracing = False
+profile_start_ns = 0
+# (category, name) -> [calls, wall ns, cpu ns, traced peak bytes, peak rss bytes], wall and cpu are cumulative
+profile_stats = {}
+profile_events = []
+profile_counts = {}
+# open spans: [name, category, args, wall start, cpu start, traced memory at start, peak traced memory]
+span_stack = []
+open_stage = None
+
+
+def enable_profiler(trace_memory: bool = False) -> None:
+	"""
+	Start recording spans.
+
+	Spans are timed, and stages and files record the resident memory of the process. Tracing
+	allocations gives every span its own peak memory, but slows the run down about tenfold and
+	inflates its memory, so it is only done with --profile-memory.
+
+	Args:
+		trace_memory (bool): Whether to trace memory allocations with tracemalloc. Defaults to False.
+	"""
+	global profiler_enabled, memory_tracing, profile_start_ns
+	if trace_memory and not tracemalloc.is_tracing():
+		tracemalloc.start()
+	if not profiler_enabled:
+		profile_start_ns = time.perf_counter_ns()
+	profiler_enabled = True
+	memory_tracing = trace_memory
+
+def reset_profiler() -> None:
+	"""
+	Drop everything recorded so far, e.g. the state a forked worker inherited from the main process.
+	"""
+	global open_stage
+	profile_stats.clear()
+	profile_events.clear()
+	profile_counts.clear()
+	span_stack.clear()
+	open_stage = None
+
+def start_span(name: str, category: str, args: dict = None) -> list:
+	"""
+	Open a profiling span.
+
+	Args:
+		name (str): The name of the span, e.g. the function name.
+		category (str): The category of the span: stage, file, parser or output.
+		args (dict): Extra values written with the span in the trace. Defaults to None.
+
+	Returns:
+		list: The span, to pass to end_span.
+	"""
+	current = 0
+	if memory_tracing:
+		current, peak = tracemalloc.get_traced_memory()
+		if span_stack:
+			span_stack[-1][6] = max(span_stack[-1][6], peak)
+		tracemalloc.reset_peak()
+	span = [name, category, args, time.perf_counter_ns(), time.process_time_ns(), current, current]
+	span_stack.append(span)
+	return span
+
+def end_span(span: list) -> None:
+	"""
+	Close a profiling span and record its wall time, CPU time and memory.
+
+	Stages and files record the peak resident memory of the process when they end. With memory
+	tracing, the peak memory of every span is the highest traced memory above what was allocated
+	when it started, nested spans included.
+
+	Args:
+		span (list): The span returned by start_span.
+	"""
+	wall_end = time.perf_counter_ns()
+	cpu_end = time.process_time_ns()
+	if span in span_stack:
+		span_stack.remove(span)
+	name, category, args, wall_start, cpu_start, start_memory, span_peak = span
+	peak_bytes = 0
+	if memory_tracing:
+		_, peak = tracemalloc.get_traced_memory()
+		tracemalloc.reset_peak()
+		span_peak = max(span_peak, peak)
+		if span_stack:
+			span_stack[-1][6] = max(span_stack[-1][6], span_peak)
+		peak_bytes = span_peak - start_memory
+	peak_rss = get_peak_rss() if category in trace_categories else 0
+
+	wall = wall_end - wall_start
+	cpu = cpu_end - cpu_start
+	stats = profile_stats.setdefault((category, name), [0, 0, 0, 0, 0])
+	stats[0] += 1
+	stats[1] += wall
+	stats[2] += cpu
+	stats[3] = max(stats[3], peak_bytes)
+	stats[4] = max(stats[4], peak_rss)
+
+	if category in trace_categories or wall >= trace_min_duration_ns:
+		event_args = dict(args or {}, cpu_ms=round(cpu / 1e6, 3))
+		if memory_tracing:
+			event_args["peak_kb"] = round(peak_bytes / 1024, 1)
+		if peak_rss:
+			event_args["peak_rss_mb"] = round(peak_rss / (1024 * 1024), 1)
+		profile_events.append({
+			"name": name, "cat": category, "ph": "X", "pid": 0, "tid": os.getpid(),
+			"ts": wall_start, "dur": wall, "args": event_args,
+		})
+
+@contextmanager
+def profile_span(name: str, category: str, **args):
+	"""
+	Profile the enclosed block as a span, does nothing while the profiler is disabled.
+
+	Args:
+		name (str): The name of the span.
+		category (str): The category of the span.
+		**args: Extra values written with the span in the trace.
+	"""
+	if not profiler_enabled:
+		yield
+		return
+	span = start_span(name, category, args)
+	try:
+		yield
+	finally:
+		end_span(span)
+
+def begin_stage(name: str) -> None:
+	"""
+	Close the current stage of the run, if any, and open the next one.
+
+	Args:
+		name (str): The name of the stage.
+	"""
+	global open_stage
+	if not profiler_enabled:
+		return
+	end_stage()
+	open_stage = start_span(name, "stage")
+
+def end_stage() -> None:
+	"""
+	Close the current stage of the run, if any.
+	"""
+	global open_stage
+	if open_stage is not None:
+		end_span(open_stage)
+		open_stage = None
+
+def add_count(name: str, value: int) -> None:
+	"""
+	Add to a run counter such as the number of log bytes decoded.
+
+	Args:
+		name (str): The name of the counter.
+		value (int): The amount to add.
+	"""
+	if profiler_enabled:
+		profile_counts[name] = profile_counts.get(name, 0) + value
+
+def profiled(function, category: str):
+	"""
+	Wrap a function so each call is recorded as a span.
+
+	Args:
+		function: The function to wrap.
+		category (str): The category of its spans.
+
+	Returns:
+		The wrapped function.
+	"""
+	@functools.wraps(function)
+	def profiled_function(*args, **kwargs):
+		span = start_span(function.__name__, category)
+		try:
+			return function(*args, **kwargs)
+		finally:
+			end_span(span)
+	profiled_function.profiled = True
+	return profiled_function
+
+def instrument_namespace(namespace: dict, category: str, prefixes: tuple = None, exclude: tuple = ()) -> None:
+	"""
+	Replace the functions of a module namespace with profiled wrappers.
+
+	Calls between functions of the namespace go through its globals, so they are profiled too.
+
+	Args:
+		namespace (dict): The namespace, e.g. vars(parser_functions) or globals().
+		category (str): The category of the spans.
+		prefixes (tuple): Only wrap the functions whose name starts with one of these, None for all. Defaults to None.
+		exclude (tuple): Names of functions to leave as they are. Defaults to ().
+	"""
+	for name, value in list(namespace.items()):
+		if not inspect.isfunction(value) or getattr(value, "profiled", False) or value.__module__ == __name__ or name in exclude:
+			continue
+		if prefixes is None or name.startswith(prefixes):
+			namespace[name] = profiled(value, category)
+
+def take_profile() -> dict:
+	"""
+	Remove the spans and counters recorded so far, to send them from a worker to the main process.
+
+	Returns:
+		dict: The recorded stats, events and counts for merge_profile.
+	"""
+	profile = {"stats": dict(profile_stats), "events": list(profile_events), "counts": dict(profile_counts)}
+	profile_stats.clear()
+	profile_events.clear()
+	profile_counts.clear()
+	return profile
+
+def merge_profile(profile: dict) -> None:
+	"""
+	Add the spans and counters recorded by take_profile, e.g. in a worker process.
+
+	Args:
+		profile (dict): The profile returned by take_profile.
+	"""
+	for key, (calls, wall, cpu, peak_bytes, peak_rss) in profile["stats"].items():
+		stats = profile_stats.setdefault(key, [0, 0, 0, 0, 0])
+		stats[0] += calls
+		stats[1] += wall
+		stats[2] += cpu
+		stats[3] = max(stats[3], peak_bytes)
+		stats[4] = max(stats[4], peak_rss)
+	profile_events.extend(profile["events"])
+	for name, value in profile["counts"].items():
+		profile_counts[name] = profile_counts.get(name, 0) + value
+
+def get_peak_rss(children: bool = False) -> int:
+	"""
+	Get the peak resident memory of this process, or of its largest exited worker process.
+
+	Args:
+		children (bool): Whether to read the peak of the worker processes instead. Defaults to False.
+
+	Returns:
+		int: The peak resident memory in bytes, 0 when unavailable.
+	"""
+	if resource is None:
+		return 0
+	# ru_maxrss is in kilobytes on Linux and bytes on macOS
+	scale = 1 if os.uname().sysname == "Darwin" else 1024
+	return resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF).ru_maxrss * scale
+
+def get_peak_rss_mb(children: bool = False):
+	"""
+	Args:
+		children (bool): Whether to read the peak of the worker processes instead. Defaults to False.
+
+	Returns:
+		The peak resident memory of this process, or of its largest worker, in MB, or None when unavailable.
+	"""
+	peak = get_peak_rss(children)
+	return round(peak / (1024 * 1024), 1) if peak else None
+
+def format_stats(key: tuple, stats: list) -> dict:
+	"""
+	Returns:
+		dict: The stats of a span in milliseconds and megabytes.
+	"""
+	calls, wall, cpu, peak_bytes, peak_rss = stats
+	formatted = {"name": key[1], "calls": calls, "wall_ms": round(wall / 1e6, 3), "cpu_ms": round(cpu / 1e6, 3)}
+	if memory_tracing:
+		formatted["peak_mb"] = round(peak_bytes / (1024 * 1024), 3)
+	if peak_rss:
+		formatted["peak_rss_mb"] = round(peak_rss / (1024 * 1024), 1)
+	return formatted
+
+def write_profile_report(report_path: str, trace_path: str, run_info: dict) -> dict:
+	"""
+	Write the profile report and the Chrome trace of the run.
+
+	The report holds the wall time and CPU time of each stage, file and profiled function, the
+	peak resident memory of the process at the end of each stage and file, the traced peak memory
+	of every span with memory tracing, and the parse throughput. The peak resident memory of the
+	main process and of the largest worker are reported separately. The trace opens in
+	chrome://tracing, Perfetto or speedscope.
+
+	Args:
+		report_path (str): The path of the JSON report.
+		trace_path (str): The path of the Chrome trace.
+		run_info (dict): Settings of the run written at the top of the report, e.g. workers.
+
+	Returns:
+		dict: The report.
+	"""
+	wall_seconds = (time.perf_counter_ns() - profile_start_ns) / 1e9
+	grouped = {}
+	for key, stats in profile_stats.items():
+		grouped.setdefault(key[0], []).append(format_stats(key, stats))
+	for category in grouped:
+		grouped[category].sort(key=lambda stats: stats["wall_ms"], reverse=True)
+
+	stage_names = [event["name"] for event in sorted(profile_events, key=lambda event: event["ts"]) if event["cat"] == "stage"]
+	stages = sorted(grouped.pop("stage", []), key=lambda stats: stage_names.index(stats["name"]) if stats["name"] in stage_names else len(stage_names))
+	files = grouped.pop("file", [])
+
+	ingest_seconds = next((stats["wall_ms"] / 1000 for stats in stages if stats["name"] == "ingest"), wall_seconds)
+	log_mb = profile_counts.get("log_bytes", 0) / (1024 * 1024)
+	# worker processes are counted once they have exited
+	process_times = os.times()
+	cpu_seconds = process_times.user + process_times.system + process_times.children_user + process_times.children_system
+	report = dict(run_info)
+	report.update({
+		"wall_seconds": round(wall_seconds, 3),
+		"cpu_seconds": round(cpu_seconds, 3),
+		"memory_tracing": memory_tracing,
+		"peak_rss_mb": get_peak_rss_mb(),
+		"worker_peak_rss_mb": get_peak_rss_mb(children=True),
+		"throughput": {
+			"files": len(files),
+			"log_mb": round(log_mb, 3),
+			"files_per_second": round(len(files) / ingest_seconds, 3) if ingest_seconds else None,
+			"mb_per_second": round(log_mb / ingest_seconds, 3) if ingest_seconds else None,
+		},
+		"stages": stages,
+		"files": files,
+		"functions": grouped,
+	})
+	json_backend.dump_to_file(report, report_path)
+
+	# the trace is relative to the start of the run, in microseconds
+	trace_events = [
+		dict(event, ts=(event["ts"] - profile_start_ns) / 1000, dur=event["dur"] / 1000)
+		for event in profile_events
+	]
+	json_backend.dump_to_file({"traceEvents": trace_events, "displayTimeUnit": "ms"}, trace_path, compact=True)
+
+	throughput = report["throughput"]
+	print(f"Profile: {throughput['files']} files, {throughput['files_per_second']} files/s, {throughput['mb_per_second']} MB/s, report written to {report_path}")
+	return report
@@ -0,0 +1,147 @@
+#    This file contains the configuration for computing the detailed top stats in arcdps logs as parsed by Elite Insights.
+#    Copyright (C) 2024 John Long (Drevarr)
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import itertools
+import math
+
+# Optional NumPy support for the array version used by the NumPy DPS engine
+try:
+	import numpy as np
+except ImportError:
+	np = None
+
+
+# A tag distance index holds, for every squad member, the prefix sums of their distance to the commander
+# tag and of the samples within each range, so averages and time in range are O(1) lookups. Replay positions
+# are sampled every polling rate from the start of each replay; sample i of a player is compared with sample i
+# of the commander, the way the death review always paired them. Distances and ranges are in pixels.
+
+def build_tag_distance_index(tracks: dict, tag_positions: list, ranges: list) -> dict:
+	"""
+	Build the tag distance index of a fight with one pass over each player's positions.
+
+	Args:
+		tracks (dict): The [x, y] replay positions of each player, keyed by any hashable player key.
+		tag_positions (list): The [x, y] replay positions of the commander tag.
+		ranges (list): The distances counted by count_in_range.
+
+	Returns:
+		dict: The index, "count" the samples compared for each player, "distance_sums" and
+			"in_range" the prefix sums of each player with one more value than samples.
+	"""
+	index = {"count": {}, "distance_sums": {}, "in_range": {}}
+	for key, positions in tracks.items():
+		distances = [math.hypot(px - tx, py - ty) for (px, py), (tx, ty) in zip(positions, tag_positions)]
+		index["count"][key] = len(distances)
+		index["distance_sums"][key] = [0.0, *itertools.accumulate(distances)]
+		index["in_range"][key] = [
+			[0, *itertools.accumulate(distance <= limit for distance in distances)]
+			for limit in ranges
+		]
+	return index
+
+def build_tag_distance_index_array(tracks: dict, tag_positions: list, ranges: list) -> dict:
+	"""
+	Build the same tag distance index as build_tag_distance_index with NumPy.
+
+	The tracks are padded into one players x samples array so the distances of the whole squad
+	are a single operation. The padded samples are dropped from the prefix sums.
+
+	Args:
+		tracks (dict): The [x, y] replay positions of each player, keyed by any hashable player key.
+		tag_positions (list): The [x, y] replay positions of the commander tag.
+		ranges (list): The distances counted by count_in_range.
+
+	Returns:
+		dict: The index, see build_tag_distance_index.
+	"""
+	keys = list(tracks)
+	tag = np.asarray(tag_positions, dtype=float).reshape(-1, 2)
+	counts = [min(len(tracks[key]), len(tag)) for key in keys]
+	positions = np.zeros((len(keys), len(tag), 2))
+	for row, key in enumerate(keys):
+		if counts[row]:
+			positions[row, :counts[row]] = np.asarray(tracks[key][:counts[row]], dtype=float)
+	distances = np.hypot(positions[:, :, 0] - tag[:, 0], positions[:, :, 1] - tag[:, 1])
+	distance_sums = np.zeros((len(keys), len(tag) + 1))
+	np.cumsum(distances, axis=1, out=distance_sums[:, 1:])
+	in_range = []
+	for limit in ranges:
+		counts_in_range = np.zeros((len(keys), len(tag) + 1), dtype=np.int64)
+		np.cumsum(distances <= limit, axis=1, out=counts_in_range[:, 1:])
+		in_range.append(counts_in_range)
+
+	index = {"count": {}, "distance_sums": {}, "in_range": {}}
+	for row, key in enumerate(keys):
+		index["count"][key] = counts[row]
+		index["distance_sums"][key] = distance_sums[row, :counts[row] + 1].tolist()
+		index["in_range"][key] = [counts_in_range[row, :counts[row] + 1].tolist() for counts_in_range in in_range]
+	return index
+
+def average_tag_distance(index: dict, key, samples: int) -> float:
+	"""
+	Get a player's average distance to the tag over their first samples in O(1).
+
+	Args:
+		index (dict): The tag distance index.
+		key: The player key.
+		samples (int): The number of samples, capped to the samples compared.
+
+	Returns:
+		float: The average distance, 0 when there is no sample.
+	"""
+	samples = min(samples, index["count"][key])
+	if samples <= 0:
+		return 0
+	return index["distance_sums"][key][samples] / samples
+
+def count_samples(index: dict, key, start: int, end: int) -> int:
+	"""
+	Count a player's compared samples between two sample positions.
+
+	Args:
+		index (dict): The tag distance index.
+		key: The player key.
+		start (int): The first sample.
+		end (int): The sample after the last one.
+
+	Returns:
+		int: The number of samples.
+	"""
+	count = index["count"][key]
+	start = min(max(start, 0), count)
+	return min(max(end, start), count) - start
+
+def count_in_range(index: dict, key, range_index: int, start: int, end: int) -> int:
+	"""
+	Count a player's samples within one of the ranges between two sample positions in O(1).
+
+	Args:
+		index (dict): The tag distance index.
+		key: The player key.
+		range_index (int): The position of the range in the ranges the index was built with.
+		start (int): The first sample.
+		end (int): The sample after the last one.
+
+	Returns:
+		int: The number of samples within the range.
+	"""
+	count = index["count"][key]
+	start = min(max(start, 0), count)
+	end = min(max(end, start), count)
+	prefix = index["in_range"][key][range_index]
+	return prefix[end] - prefix[start]
@@ -0,0 +1,80 @@
+import copy
+import json
+
+import pytest
+
+import log_reader
+import parser_functions
+
+
+def write_log(path, players, targets):
+	"""Write a minimal Elite Insights log with the fields the log schema requires."""
+	log = {
+		"fightName": "Detailed WvW - Eternal Battlegrounds",
+		"timeStart": "2026-10-16 20:00:00 -05:00",
+		"timeEnd": "2026-10-16 20:00:10 -05:00",
+		"duration": "00m 10s 000ms",
+		"durationMS": 10000,
+		"recordedBy": "Player0",
+		"uploadLinks": [""],
+		"players": players,
+		"targets": targets,
+		"skillMap": {},
+		"buffMap": {},
+	}
+	path.write_text(json.dumps(log), encoding="utf-8")
+
+def new_player(name, **series):
+	player = {
+		"name": name, "account": name + ".1234", "profession": "Scourge", "group": 1,
+		"notInSquad": False, "hasCommanderTag": False,
+	}
+	player.update(series)
+	return player
+
+@pytest.fixture
+def debuff_settings():
+	"""Restore the damage debuffs and log decoding settings changed by a test."""
+	debuffs = parser_functions.get_damage_debuffs_setting()
+	native_log_decoding = log_reader.native_log_decoding
+	yield
+	parser_functions.set_damage_debuffs(debuffs)
+	log_reader.set_native_log_decoding(native_log_decoding)
+
+@pytest.mark.parametrize("native_log_decoding", [False, True])
+def test_condition_damage_debuff_is_credited(tmp_path, monkeypatch, debuff_settings, native_log_decoding):
+	# 100 condition damage per second on the only target, the debuff is on from 2s to 5s
+	condition_damage = [[[tick * 100 for tick in range(11)]]]
+	log_path = tmp_path / "20261016-200000_wvw.json"
+	write_log(
+		log_path,
+		[new_player("Player0", targetConditionDamage1S=condition_damage, targetDamage1S=[[[0] * 11]])],
+		[{"name": "Enemy", "isFake": False, "buffs": [{"id": 737, "statesPerSource": {"Player0": [[0, 0], [2000, 1], [5000, 0]]}}]}],
+	)
+	parser_functions.set_damage_debuffs("b737:0.10:targetConditionDamage1S")
+	log_reader.set_native_log_decoding(native_log_decoding)
+
+	json_data = log_reader.load_log_json(str(log_path))
+	player = json_data["players"][0]
+	assert player["targetConditionDamage1S"] == condition_damage
+
+	name_prof = "Player0|Scourge|Player0.1234"
+	top_stats = copy.deepcopy(parser_functions.empty_top_stats)
+	top_stats["player"][name_prof] = {}
+	top_stats["fight"][1] = {}
+	monkeypatch.setattr(parser_functions, "top_stats", top_stats)
+	sources = parser_functions.get_target_buff_sources(json_data["targets"], json_data["players"], 10000)
+	parser_functions.get_target_buff_data(1, player, sources, "targetBuffs", name_prof)
+	parser_functions.rollup_stat_facts()
+
+	# ticks 2 to 5 hold 300 damage, 10% of which is credited to the debuff
+	assert top_stats["player"][name_prof]["targetBuffs"]["b737"]["damage_gained"] == pytest.approx(30.0)
+
+def test_unused_damage_series_stay_skipped(tmp_path, debuff_settings):
+	log_path = tmp_path / "20261016-200000_wvw.json"
+	write_log(log_path, [new_player("Player0", targetConditionDamage1S=[[[0, 100]]])], [])
+	parser_functions.set_damage_debuffs("b70350:0.10:targetDamage1S")
+
+	player = log_reader.load_log_json(str(log_path))["players"][0]
+
+	assert "targetConditionDamage1S" not in player
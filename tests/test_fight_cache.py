@@ -0,0 +1,116 @@
+import os
+
+import pytest
+
+import fight_cache
+
+
+OPTIONS = {"fight_data_charts": True, "guild_data": None, "burst_windows": [1, 2, 5]}
+
+def new_partial(fight_num):
+	"""A parsed partial with the value types the cache must keep: int keys, tuples, floats and nested lists."""
+	return {
+		"fight_num": fight_num,
+		"top_stats": {"fight": {fight_num: {"squad_count": 3}}, "overall": {"damage": 1250.5}},
+		"high_score_candidates": [("statTarget_max", {"fight": fight_num, "value": 300})],
+		"DPSStats": {"Player0|Scourge|Player0.1234": {"burstDamage": [0, 5, 9]}},
+		"identities": {("Scourge", "Player0", 9226): None},
+	}
+
+@pytest.fixture
+def log_dir(tmp_path, monkeypatch):
+	"""An input directory with two logs, whose parser version only depends on one module file."""
+	parser_module = tmp_path / "parser_module.py"
+	parser_module.write_text("VERSION = 1\n", encoding="utf-8")
+	monkeypatch.setattr(fight_cache, "parser_modules", [str(parser_module)])
+	input_directory = tmp_path / "logs"
+	input_directory.mkdir()
+	for name in ("20261016-200000_wvw.json", "20261016-201000_wvw.json"):
+		(input_directory / name).write_text('{"fightName": "%s"}' % name, encoding="utf-8")
+	return input_directory
+
+def log_path(log_dir, index):
+	return str(sorted(log_dir.glob("*.json"))[index])
+
+def test_cached_fight_round_trips(log_dir):
+	cache = fight_cache.open_fight_cache(str(log_dir), OPTIONS, 100)
+	fight_cache.store_cached_fight(cache, log_path(log_dir, 0), new_partial(1))
+	fight_cache.close_fight_cache(cache)
+
+	cache = fight_cache.open_fight_cache(str(log_dir), OPTIONS, 100)
+
+	assert fight_cache.load_cached_fight(cache, log_path(log_dir, 0)) == new_partial(1)
+	assert fight_cache.load_cached_fight(cache, log_path(log_dir, 1)) is None
+	assert (cache["hits"], cache["misses"]) == (1, 1)
+
+def test_changed_option_misses_the_entry(log_dir):
+	cache = fight_cache.open_fight_cache(str(log_dir), OPTIONS, 100)
+	fight_cache.store_cached_fight(cache, log_path(log_dir, 0), new_partial(1))
+	fight_cache.close_fight_cache(cache)
+
+	changed = fight_cache.open_fight_cache(str(log_dir), dict(OPTIONS, burst_windows=[1, 2]), 100)
+	assert fight_cache.load_cached_fight(changed, log_path(log_dir, 0)) is None
+	fight_cache.close_fight_cache(changed)
+
+	# the entry of the original options is kept
+	cache = fight_cache.open_fight_cache(str(log_dir), OPTIONS, 100)
+	assert fight_cache.load_cached_fight(cache, log_path(log_dir, 0)) == new_partial(1)
+
+def test_changed_parser_module_clears_the_cache(log_dir):
+	cache = fight_cache.open_fight_cache(str(log_dir), OPTIONS, 100)
+	fight_cache.store_cached_fight(cache, log_path(log_dir, 0), new_partial(1))
+	fight_cache.store_cached_header(cache, log_path(log_dir, 0), {"fightName": "Fight"})
+	fight_cache.close_fight_cache(cache)
+
+	with open(fight_cache.parser_modules[0], "a", encoding="utf-8") as parser_module:
+		parser_module.write("VERSION = 2\n")
+	cache = fight_cache.open_fight_cache(str(log_dir), OPTIONS, 100)
+
+	assert fight_cache.load_cached_fight(cache, log_path(log_dir, 0)) is None
+	assert fight_cache.load_cached_header(cache, log_path(log_dir, 0)) is None
+	assert not [name for name in os.listdir(cache["dir"]) if name.endswith(fight_cache.cache_entry_ext)]
+
+def test_changed_log_misses_the_entry(log_dir):
+	cache = fight_cache.open_fight_cache(str(log_dir), OPTIONS, 100)
+	fight_cache.store_cached_fight(cache, log_path(log_dir, 0), new_partial(1))
+
+	with open(log_path(log_dir, 0), "a", encoding="utf-8") as log_file:
+		log_file.write(" ")
+
+	assert fight_cache.load_cached_fight(cache, log_path(log_dir, 0)) is None
+
+def test_headers_are_kept_until_their_log_is_removed(log_dir):
+	headers = [{"fightName": "First", "playerCount": 10}, {"fightName": "Second", "playerCount": 0}]
+	cache = fight_cache.open_fight_cache(str(log_dir), OPTIONS, 100)
+	for index, header in enumerate(headers):
+		fight_cache.store_cached_header(cache, log_path(log_dir, index), header)
+	fight_cache.close_fight_cache(cache)
+
+	cache = fight_cache.open_fight_cache(str(log_dir), OPTIONS, 100)
+	assert [fight_cache.load_cached_header(cache, log_path(log_dir, index)) for index in range(2)] == headers
+
+	removed_hash = cache["index"]["files"][os.path.abspath(log_path(log_dir, 1))][2]
+	os.remove(log_path(log_dir, 1))
+	fight_cache.close_fight_cache(cache)
+	cache = fight_cache.open_fight_cache(str(log_dir), OPTIONS, 100)
+
+	assert fight_cache.load_cached_header(cache, log_path(log_dir, 0)) == headers[0]
+	assert removed_hash not in cache["index"]["headers"]
+
+def test_eviction_drops_the_least_recently_used_fights(log_dir):
+	for index in range(2, 5):
+		(log_dir / f"20261016-20{index}000_wvw.json").write_text('{"fightName": "%d"}' % index, encoding="utf-8")
+	cache = fight_cache.open_fight_cache(str(log_dir), OPTIONS, 100)
+	entry_paths = []
+	for index in range(5):
+		fight_cache.store_cached_fight(cache, log_path(log_dir, index), new_partial(index))
+		entry_paths.append(fight_cache.get_cache_entry_path(cache, log_path(log_dir, index)))
+		os.utime(entry_paths[-1], (1000 + index, 1000 + index))
+	# loading the oldest fight makes it the most recently used
+	fight_cache.load_cached_fight(cache, log_path(log_dir, 0))
+	entry_size = os.path.getsize(entry_paths[1])
+	cache["max_size"] = 2 * entry_size + entry_size // 2
+
+	fight_cache.close_fight_cache(cache)
+
+	assert [os.path.exists(entry_path) for entry_path in entry_paths] == [True, False, False, False, True]
@@ -0,0 +1,130 @@
+import copy
+import json
+import multiprocessing
+import os
+
+import pytest
+
+import parser_functions
+from top_k import get_top_k
+
+
+# Synthetic fights: each player entry is (name_prof, damage, max hit, min hit, chunk damage, burst damage, distances to tag)
+FIGHTS = [
+	{"date": "20:00", "players": [
+		("Player0|Scourge|Player0.1234", 1000, 300, 12, [10, 20, 30], [5, 9, 2], [150, 600]),
+		("Player1|Firebrand|Player1.1234", 400, 120, 0, [4, 0, 8], [1, 2, 3], []),
+	]},
+	# a fight without squad members leaves an empty partial
+	{"date": "20:05", "players": []},
+	{"date": "20:10", "players": [
+		("Player1|Firebrand|Player1.1234", 250, 200, 7, [1, 1, 1], [7, 0, 4], [90]),
+	]},
+	{"date": "20:15", "players": [
+		("Player0|Scourge|Player0.1234", 50, 0, 0, [0, 0, 0], [0, 0, 0], []),
+		("Player2|Mirage|Player2.1234", 800, 500, 3, [2, 4, 6], [2, 11, 1], [40, 2500, 300]),
+	]},
+]
+
+
+def parse_synthetic_fight(file_path, fight_num, guild_data, fight_data_charts):
+	"""Fill the accumulators from a synthetic fight, with each of the merge modes parse_file relies on."""
+	with open(file_path, encoding="utf-8") as fight_file:
+		fight = json.load(fight_file)
+	top_stats = parser_functions.top_stats
+	top_stats["overall"]["last_fight"] = fight["date"]
+	top_stats["fight"][fight_num] = {"fight_date": fight["date"], "squad_count": len(fight["players"])}
+	parser_functions.fight_data[fight_num] = {"players": [player[0] for player in fight["players"]]}
+	for name_prof, damage, max_hit, min_hit, chunk_damage, burst_damage, distances in fight["players"]:
+		profession = name_prof.split("|")[1]
+		player = top_stats["player"].setdefault(name_prof, {"prof": profession, "team": fight["date"], "num_fights": 0, "guild_status": []})
+		player["num_fights"] += 1
+		# a unique list only gains unseen items
+		if fight["date"] not in player["guild_status"]:
+			player["guild_status"].append(fight["date"])
+		player["targetDamageDist"] = {9226: {"totalDamage": damage, "max": max_hit, "min": min_hit}}
+		top_stats["overall"]["damage"] = top_stats["overall"].get("damage", 0) + damage
+		parser_functions.DPSStats[name_prof] = {
+			"damageTotal": damage,
+			"chunkDamage": list(chunk_damage),
+			"burstDamage": list(burst_damage),
+		}
+		parser_functions.death_on_tag[name_prof] = {"distToTag": list(distances), "Total": len(distances)}
+		parser_functions.enemy_avg_damage_per_skill["Meteor Shower"] = {
+			"dmg": damage, "hits": 1 if min_hit else 0, "count": 1, "min_sum": min_hit, "min": min_hit,
+		}
+		parser_functions.update_high_score("statTarget_max", profession, name_prof.split("|")[0], name_prof.split("|")[2], fight_num, max_hit, 9226)
+
+@pytest.fixture
+def synthetic_logs(tmp_path, monkeypatch):
+	"""Write the synthetic fights and parse them with parse_synthetic_fight, restoring the accumulators afterwards."""
+	monkeypatch.setattr(parser_functions, "parse_file", parse_synthetic_fight)
+	log_paths = []
+	for fight_num, fight in enumerate(FIGHTS, start=1):
+		log_path = tmp_path / f"20261016-20{fight_num:02d}00_wvw.json"
+		log_path.write_text(json.dumps(fight), encoding="utf-8")
+		log_paths.append(str(log_path))
+	yield log_paths
+	parser_functions.restore_accumulators(parser_functions.new_accumulators())
+
+def ingest(log_paths, workers):
+	parser_functions.ingest_log_files(log_paths, None, False, workers)
+	return copy.deepcopy(parser_functions.get_accumulators())
+
+@pytest.mark.skipif(multiprocessing.get_start_method() != "fork", reason="the workers must inherit the synthetic parser")
+def test_workers_give_the_same_accumulators(synthetic_logs):
+	serial = ingest(synthetic_logs, 1)
+	parallel = ingest(synthetic_logs, 3)
+
+	assert parallel == serial
+
+def test_merge_modes(synthetic_logs):
+	accumulators = ingest(synthetic_logs, 1)
+	top_stats = accumulators["top_stats"]
+	player0 = top_stats["player"]["Player0|Scourge|Player0.1234"]
+
+	# sums, first and last values
+	assert top_stats["overall"]["damage"] == 2500
+	assert top_stats["overall"]["last_fight"] == "20:15"
+	assert player0["num_fights"] == 2
+	assert player0["team"] == "20:00"
+	assert player0["guild_status"] == ["20:00", "20:15"]
+	assert sorted(top_stats["fight"]) == [1, 2, 3, 4]
+	# extreme max and min, a 0 from the fight without hits is unset
+	assert player0["targetDamageDist"][9226] == {"totalDamage": 1050, "max": 300, "min": 12}
+	assert accumulators["enemy_avg_damage_per_skill"]["Meteor Shower"]["min"] == 3
+	# element-wise "add" and "max" lists, appended "extend" lists
+	assert accumulators["DPSStats"]["Player0|Scourge|Player0.1234"]["chunkDamage"] == [10, 20, 30]
+	assert accumulators["DPSStats"]["Player1|Firebrand|Player1.1234"]["chunkDamage"] == [5, 1, 9]
+	assert accumulators["DPSStats"]["Player1|Firebrand|Player1.1234"]["burstDamage"] == [7, 2, 4]
+	assert accumulators["death_on_tag"]["Player1|Firebrand|Player1.1234"] == {"distToTag": [90], "Total": 1}
+	assert accumulators["death_on_tag"]["Player0|Scourge|Player0.1234"]["distToTag"] == [150, 600]
+	# high score candidates of every fight are ranked by value
+	assert [record["fight"] for record in get_top_k(accumulators["high_scores"]["statTarget_max"])] == [4, 1, 3, 1, 4]
+
+def test_renumbered_partial_merges_like_a_fresh_parse(synthetic_logs):
+	fresh = parser_functions.new_accumulators()
+	renumbered = parser_functions.new_accumulators()
+	for fight_num, log_path in enumerate(synthetic_logs, start=1):
+		parser_functions.merge_fight_partial(fresh, parser_functions.parse_fight_partial((log_path, fight_num, None, False)), fight_num)
+		parser_functions.merge_fight_partial(renumbered, parser_functions.parse_fight_partial((log_path, fight_num + 100, None, False)), fight_num)
+
+	assert renumbered == fresh
+
+def test_appended_session_matches_a_full_ingest(synthetic_logs, tmp_path):
+	# the third fight's log is named before the fights already in the session
+	log_paths = list(synthetic_logs)
+	log_paths[2] = str(tmp_path / "20261015-200300_wvw.json")
+	os.replace(synthetic_logs[2], log_paths[2])
+	full = ingest(log_paths, 1)
+	state_path = str(tmp_path / "session.pickle")
+	options = {"fight_data_charts": False}
+
+	last_fight_num = parser_functions.ingest_log_files(log_paths[:2], None, False, 1)
+	parser_functions.save_session_state(state_path, [os.path.basename(log_path) for log_path in log_paths[:2]], last_fight_num, options)
+	state = parser_functions.load_session_state(state_path, options)
+	new_log_names = parser_functions.get_new_log_names(sorted(os.path.basename(log_path) for log_path in log_paths), state)
+	assert new_log_names == ["20261015-200300_wvw.json", "20261016-200400_wvw.json"]
+	parser_functions.ingest_log_files([str(tmp_path / log_name) for log_name in new_log_names], None, False, 1, state["last_fight_num"] + 1, session=state["session"])
+
+	assert parser_functions.get_accumulators() == full
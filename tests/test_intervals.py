@@ -0,0 +1,74 @@
+import pytest
+
+from intervals import build_state_index, intersect, overlap_length, state_at, to_active_intervals, to_step_intervals
+
+
+@pytest.mark.parametrize("intervals, windows, expected", [
+	([], [[0, 10]], []),
+	([[0, 5, 1]], [], []),
+	([[3, 3, 1]], [[0, 10]], []),
+	# touching intervals and windows share no time
+	([[0, 5, 1]], [[5, 10]], []),
+	([[5, 10, 1]], [[0, 5]], []),
+	([[0, 5, 1], [5, 10, 2]], [[3, 7]], [[3, 5, 1], [5, 7, 2]]),
+	([[0, 5], [5, 8]], [[0, 5], [5, 8]], [[0, 5], [5, 8]]),
+	# an interval spanning several windows is split, the payload is kept
+	([[0, 20, 3]], [[2, 4], [6, 8], [18, 25]], [[2, 4, 3], [6, 8, 3], [18, 20, 3]]),
+	# a window spanning several intervals clips the first and last
+	([[0, 2], [4, 6], [8, 10]], [[1, 9]], [[1, 2], [4, 6], [8, 9]]),
+	([[0, 4, "a"], [6, 12, "b"]], [[2, 7], [7, 8], [11, 15]], [[2, 4, "a"], [6, 7, "b"], [7, 8, "b"], [11, 12, "b"]]),
+	([[0, 10]], [[0, 10]], [[0, 10]]),
+])
+def test_intersect(intervals, windows, expected):
+	assert intersect(intervals, windows) == expected
+	assert intersect(windows, intervals) == [part[:2] for part in expected]
+	assert overlap_length(intervals, windows) == sum(stop - start for start, stop, *_ in expected)
+
+@pytest.mark.parametrize("states, end, expected", [
+	([], 10, []),
+	([[0, 1], [5, 2]], 10, [[0, 5, 1], [5, 10, 2]]),
+	([[5, 2], [0, 1]], 10, [[0, 5, 1], [5, 10, 2]]),
+	# a state changed twice on the same tick lasts no time
+	([[0, 1], [3, 2], [3, 4]], 10, [[0, 3, 1], [3, 10, 4]]),
+	# states are clipped at end
+	([[0, 1], [12, 2]], 10, [[0, 10, 1]]),
+	([[0, 1], [10, 2]], 10, [[0, 10, 1]]),
+	([[0, 1]], 0, []),
+])
+def test_to_step_intervals(states, end, expected):
+	assert to_step_intervals(states, end) == expected
+
+@pytest.mark.parametrize("states, end, expected", [
+	([], 10, []),
+	([[0, 1], [5, 0]], None, [[0, 5]]),
+	# gaining stacks keeps a single interval
+	([[0, 1], [2, 3], [5, 0]], None, [[0, 5]]),
+	([[0, 1], [5, 0], [8, 2]], None, [[0, 5]]),
+	([[0, 1], [5, 0], [8, 2]], 10, [[0, 5], [8, 10]]),
+	# removed and reapplied on the same tick gives touching intervals
+	([[0, 1], [5, 0], [5, 1], [9, 0]], None, [[0, 5], [5, 9]]),
+	([[3, 1], [3, 0]], 10, []),
+	([[0, 0], [4, 1]], 6, [[4, 6]]),
+	([[4, 1]], 4, []),
+	([[4, 0], [0, 2]], None, [[0, 4]]),
+])
+def test_to_active_intervals(states, end, expected):
+	assert to_active_intervals(states, end) == expected
+
+@pytest.mark.parametrize("time, expected", [
+	(-1, "unset"),
+	(0, 0),
+	(4.9, 0),
+	(5, 3),
+	(8, 3),
+	(9, 0),
+	(100, 0),
+])
+def test_state_at(time, expected):
+	# the last value set on a tick wins
+	state_index = build_state_index([[0, 0], [5, 2], [5, 3], [9, 0]])
+
+	assert state_at(state_index, time, "unset") == expected
+
+def test_state_at_without_states():
+	assert state_at(build_state_index([]), 5, "unset") == "unset"
@@ -0,0 +1,148 @@
+import io
+import json
+import os
+import tarfile
+
+import pytest
+
+import log_reader
+
+
+def add_tar_member(archive, name, data):
+	member = tarfile.TarInfo(name)
+	member.size = len(data)
+	archive.addfile(member, io.BytesIO(data))
+
+def write_tar_logs(archive_path, log_count):
+	"""Write a .tar.gz of small logs, returning the JSON text of each log by member name."""
+	logs = {}
+	with tarfile.open(archive_path, "w:gz") as archive:
+		add_tar_member(archive, "readme.txt", b"not a log")
+		for index in range(log_count):
+			name = f"week1/20261016-20{index:02d}00_wvw.json"
+			logs[name] = json.dumps({"fightName": f"Fight {index}", "players": []})
+			add_tar_member(archive, name, logs[name].encode("utf-8"))
+	return logs
+
+@pytest.fixture
+def tar_opens(monkeypatch):
+	"""Count the passes over tar archives, and remove the extracted logs after the test."""
+	opens = []
+	open_tar_archive = log_reader.open_tar_archive
+	def counted_open_tar_archive(archive_path, stack):
+		opens.append(archive_path)
+		return open_tar_archive(archive_path, stack)
+	monkeypatch.setattr(log_reader, "open_tar_archive", counted_open_tar_archive)
+	yield opens
+	log_reader.remove_extracted_archives()
+
+def test_tar_logs_are_read_in_one_pass(tmp_path, tar_opens):
+	archive_path = tmp_path / "week1.tar.gz"
+	logs = write_tar_logs(archive_path, 5)
+
+	log_files = log_reader.list_log_files(str(tmp_path))
+	assert [log_name for log_name, _ in log_files] == sorted(os.path.basename(name) for name in logs)
+	for _, log_path in log_files:
+		member_name = log_reader.split_log_path(log_path)[1]
+		assert bytes(log_reader.read_log_bytes(log_path)) == logs[member_name].encode("utf-8")
+	# listing again reuses the extraction of the unchanged archive
+	log_reader.list_log_files(str(tmp_path))
+
+	assert tar_opens == [str(archive_path)]
+
+def test_changed_tar_is_extracted_again(tmp_path, tar_opens):
+	archive_path = tmp_path / "week1.tar.gz"
+	write_tar_logs(archive_path, 2)
+	log_reader.list_log_files(str(tmp_path))
+	directory = log_reader.extracted_archives[str(archive_path)]["directory"]
+
+	write_tar_logs(archive_path, 3)
+	os.utime(archive_path, ns=(0, 1))
+
+	assert len(log_reader.list_log_files(str(tmp_path))) == 3
+	assert len(tar_opens) == 2
+	assert not os.path.exists(directory)
+	log_reader.remove_extracted_archives()
+	assert not log_reader.extracted_archives
+
+def test_unlisted_tar_member_is_still_read(tmp_path, tar_opens):
+	archive_path = tmp_path / "week1.tar.gz"
+	logs = write_tar_logs(archive_path, 2)
+	member_name = sorted(logs)[1]
+
+	log_path = str(archive_path) + log_reader.archive_member_sep + member_name
+
+	assert bytes(log_reader.read_log_bytes(log_path)) == logs[member_name].encode("utf-8")
+	assert not log_reader.extracted_archives
+
+# Players and targets keep every key except actor_skip_keys, other top-level keys are skipped
+ACTOR_PROJECTION = {
+	"keep": {"fightName", "players", "targets", "skillMap"},
+	"skip": set(),
+	"fields": {"players": {"items": log_reader.actor_projection}, "targets": {"items": log_reader.actor_projection}},
+}
+ESCAPED_TEXT = 'quote " backslash \\ slash / tab \t newline \n é ü 漢字 😀 \u0000  '
+
+def new_projection_log():
+	"""A log whose kept and skipped values hold escapes, nested arrays, unicode and numbers of every form."""
+	return {
+		"fightName": "Détailed WvW - \"Eternal\" Battlegrounds",
+		"skipped": {"text": ESCAPED_TEXT, "nested": [[1, [2, [3, "]"]]], [], [{}], "}{"], "numbers": [0, -0.0, 1e-7, -15E+3, 123456789012345678]},
+		"players": [{
+			"name": ESCAPED_TEXT,
+			"notInSquad": False,
+			"damage1S": [[0, 10, 25], [0, 0, 5]],
+			"boonsStates": [[0, 1], [1500, 0], {"\\": "[\"]"}],
+			"weapons": ["Staff", "Unknown", "😀"],
+			"statsAll": [{"distToCom": "Infinity", "stackDist": 1.25e2, "wasted": -3}],
+		}],
+		"targets": [{"name": "Ennemi ✓", "isFake": True, "deathRecap": [{"toDown": [{"src": "a\\\"b"}]}], "hitboxWidth": 0}],
+		"skillMap": {"s9226": {"name": "Pommel Bash™", "autoAttack": False, "icon": None}},
+		"uploadLinks": [""],
+	}
+
+@pytest.mark.parametrize("ensure_ascii", [True, False])
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64, 1 << 20])
+def test_projected_decode_matches_json_load(monkeypatch, ensure_ascii, chunk_size):
+	text = json.dumps(new_projection_log(), ensure_ascii=ensure_ascii, indent=None if chunk_size % 2 else 1)
+	expected = log_reader.project_decoded(json.loads(text), ACTOR_PROJECTION)
+	monkeypatch.setattr(log_reader, "read_chunk_size", chunk_size)
+
+	source = log_reader.JsonSource(io.BytesIO(text.encode("utf-8")))
+	streamed = log_reader.decode_source(source, ACTOR_PROJECTION)
+
+	assert streamed == expected
+	assert log_reader.decode_projected(text, ACTOR_PROJECTION) == expected
+	assert source.bytes_read == len(text.encode("utf-8"))
+	assert streamed["players"][0]["name"] == ESCAPED_TEXT
+	assert "boonsStates" not in streamed["players"][0] and "skipped" not in streamed
+
+@pytest.mark.parametrize("text", [
+	'"héllo wörld ✓"', "-1500.25", " [ ] ", "true", '{"a": [1, {"b": "x\\u00e9y"}], "c": null}',
+])
+@pytest.mark.parametrize("chunk_size", [1, 2, 5])
+def test_projected_decode_of_bare_values(monkeypatch, text, chunk_size):
+	monkeypatch.setattr(log_reader, "read_chunk_size", chunk_size)
+
+	assert log_reader.decode_source(log_reader.JsonSource(io.BytesIO(text.encode("utf-8"))), None) == json.loads(text)
+
+@pytest.mark.parametrize("text", ['{"a": 1', '{"a": 1} x', "[1, 2", '{"a" 1}', '{"skipped": [1, 2}', '{"a": "unterminated}'])
+def test_projected_decode_rejects_malformed_json(monkeypatch, text):
+	monkeypatch.setattr(log_reader, "read_chunk_size", 2)
+	projection = {"keep": None, "skip": {"skipped"}, "fields": {}}
+
+	with pytest.raises(json.JSONDecodeError):
+		log_reader.decode_source(log_reader.JsonSource(io.BytesIO(text.encode("utf-8"))), projection)
+
+def test_log_header_stops_at_the_kept_keys(tmp_path, monkeypatch):
+	log = new_projection_log()
+	log.update({"timeStart": "2026-10-16 20:00:00 -05:00", "timeEnd": "2026-10-16 20:05:00 -05:00", "durationMS": 300000, "recordedBy": "Ĳsbrand"})
+	log["players"].append({"name": "Ally", "notInSquad": True})
+	log_path = tmp_path / "20261016-200000_wvw.json"
+	log_path.write_text(json.dumps(log, ensure_ascii=False), encoding="utf-8")
+	monkeypatch.setattr(log_reader, "read_chunk_size", 3)
+
+	assert log_reader.read_log_header(str(log_path)) == {
+		"fightName": log["fightName"], "timeStart": log["timeStart"], "timeEnd": log["timeEnd"],
+		"durationMS": 300000, "recordedBy": "Ĳsbrand", "playerCount": 1,
+	}
@@ -0,0 +1,42 @@
+import pytest
+
+import parser_functions
+
+
+def new_partial(fight_num, **accumulators):
+	"""A fight's partial aggregate with empty accumulators except the ones given."""
+	partial = parser_functions.new_accumulators()
+	partial.update(accumulators)
+	partial["fight_num"] = fight_num
+	partial["high_score_candidates"] = []
+	return partial
+
+def enemy_skill(dmg, hits, minimum):
+	return {"dmg": dmg, "hits": hits, "count": 1, "min_sum": minimum, "min": minimum}
+
+@pytest.mark.parametrize("current, value, expected", [
+	(5, 0, 5),
+	(0, 5, 5),
+	(5, 3, 3),
+	(3, 5, 3),
+	(0, 0, 0),
+])
+def test_merge_keeps_the_smallest_set_min(current, value, expected):
+	dest = {"min": current, "max": current}
+	parser_functions.merge_accumulator(dest, {"min": value, "max": value}, "unique", True)
+
+	assert dest == {"min": expected, "max": max(current, value)}
+
+def test_fight_without_hits_keeps_the_enemy_skill_min():
+	session = parser_functions.new_accumulators()
+	fights = [
+		enemy_skill(500, 5, 40),
+		# the skill was cast in the second fight but never hit, its min of 0 is unset
+		enemy_skill(0, 0, 0),
+		enemy_skill(90, 1, 90),
+	]
+	for fight_num, skill in enumerate(fights, start=1):
+		partial = new_partial(fight_num, enemy_avg_damage_per_skill={"Meteor Shower": skill})
+		parser_functions.merge_fight_partial(session, partial, fight_num)
+
+	assert session["enemy_avg_damage_per_skill"]["Meteor Shower"] == {"dmg": 590, "hits": 6, "count": 3, "min_sum": 130, "min": 40}
@@ -0,0 +1,79 @@
+import copy
+import json
+
+import pytest
+
+import parser_functions
+from parser_functions import FACT_FIGHT, FACT_GROUP, FACT_PLAYER
+
+
+PLAYERS = ["Player0|Scourge|Player0.1234", "Player1|Firebrand|Player1.1234"]
+
+# (fight_num, name_prof, stat_category, key, stats, levels, group) in the order a fight adds them
+FACTS = [
+	(1, PLAYERS[0], "statsAll", None, {"wasted": 2, "timeWasted": 0.5}, FACT_PLAYER | FACT_FIGHT, None),
+	(1, PLAYERS[1], "statsAll", None, {"wasted": 1, "saved": 3}, FACT_PLAYER | FACT_FIGHT, None),
+	(1, PLAYERS[0], "targetDamageDist", 5, {"totalDamage": 100, "max": 60, "min": 4}, FACT_PLAYER | FACT_FIGHT, None),
+	(1, PLAYERS[1], "targetDamageDist", 5, {"totalDamage": 50, "max": 70, "min": 0}, FACT_PLAYER | FACT_FIGHT, None),
+	(1, PLAYERS[0], "targetDamageDist", 5, {"totalDamage": 10, "max": 0, "min": 2}, FACT_PLAYER | FACT_FIGHT, None),
+	(1, PLAYERS[0], "buffUptimes", 740, {"uptime_ms": 1500.0}, FACT_PLAYER | FACT_FIGHT | FACT_GROUP, 1),
+	(1, PLAYERS[0], "buffUptimes", 740, {"state_changes": 4}, FACT_PLAYER, None),
+	(1, PLAYERS[1], "buffUptimes", 740, {"uptime_ms": 500}, FACT_PLAYER | FACT_FIGHT | FACT_GROUP, 2),
+	(1, PLAYERS[1], "buffUptimes", 1187, {"uptime_ms": 250}, FACT_PLAYER | FACT_FIGHT | FACT_GROUP, 2),
+	(1, PLAYERS[0], "statsAll", None, {"saved": 1, "wasted": 0.25}, FACT_PLAYER | FACT_FIGHT, None),
+]
+
+
+def new_top_stats():
+	top_stats = copy.deepcopy(parser_functions.empty_top_stats)
+	for name_prof in PLAYERS:
+		top_stats["player"][name_prof] = {}
+	top_stats["fight"][1] = {}
+	return top_stats
+
+def add_sequentially(top_stats, fight_num, name_prof, stat_category, key, stats, levels, group):
+	"""Add each value to its totals as it is read, the way the stat extractors wrote top_stats before the fact table."""
+	def add_values(parent, category):
+		totals = parent.setdefault(category, {})
+		if key is not None:
+			totals = totals.setdefault(key, {})
+		for stat, value in stats.items():
+			if stat_category in parser_functions.merge_extreme_value_keys and stat == "max":
+				if value > totals.get(stat, 0):
+					totals[stat] = value
+			elif stat_category in parser_functions.merge_extreme_value_keys and stat == "min":
+				if value <= totals.get(stat, 0):
+					totals[stat] = value
+			else:
+				totals[stat] = totals.get(stat, 0) + value
+
+	if levels & FACT_PLAYER:
+		add_values(top_stats["player"][name_prof], stat_category)
+	if levels & FACT_FIGHT:
+		add_values(top_stats["fight"][fight_num], stat_category)
+		add_values(top_stats["overall"], stat_category)
+	if levels & FACT_GROUP:
+		add_values(top_stats["overall"].setdefault(stat_category, {}).setdefault("group", {}), group)
+
+@pytest.mark.parametrize("dps_engine", ["numpy", "python"])
+def test_rollup_matches_sequential_totals(monkeypatch, dps_engine):
+	if dps_engine == "numpy" and parser_functions.np is None:
+		pytest.skip("numpy is not installed")
+	expected = new_top_stats()
+	for fact in FACTS:
+		add_sequentially(expected, *fact)
+
+	top_stats = new_top_stats()
+	monkeypatch.setattr(parser_functions, "top_stats", top_stats)
+	monkeypatch.setattr(parser_functions, "dps_engine", dps_engine)
+	parser_functions.clear_stat_facts()
+	for fact in FACTS:
+		parser_functions.add_stat_facts(*fact)
+	parser_functions.rollup_stat_facts()
+
+	# same totals, value types and key order
+	assert json.dumps(top_stats, default=str) == json.dumps(expected, default=str)
+	assert top_stats["overall"]["targetDamageDist"][5] == {"totalDamage": 160, "max": 70, "min": 0}
+	assert "min" not in top_stats["player"][PLAYERS[0]]["targetDamageDist"][5]
+	assert top_stats["overall"]["buffUptimes"]["group"] == {1: {740: {"uptime_ms": 1500.0}}, 2: {740: {"uptime_ms": 500}, 1187: {"uptime_ms": 250}}}
+	assert not parser_functions.stat_facts["value"]
@@ -0,0 +1,60 @@
+import math
+import random
+
+import pytest
+
+import tag_distance
+from tag_distance import average_tag_distance, build_tag_distance_index, count_in_range
+
+RANGES = [5, 150, 600]
+
+
+def new_tracks():
+	"""A commander and uneven player tracks: none, shorter and longer than the tag's, and one exactly at a range limit."""
+	rng = random.Random(25)
+	tag_positions = [[rng.randrange(-400, 400), rng.randrange(-400, 400)] for _ in range(40)]
+	tracks = {
+		"empty": [],
+		"single": [[0, 0]],
+		"short": [[rng.randrange(-800, 800), rng.randrange(-800, 800)] for _ in range(7)],
+		"full": [[rng.randrange(-800, 800), rng.randrange(-800, 800)] for _ in range(40)],
+		"long": [[rng.randrange(-800, 800), rng.randrange(-800, 800)] for _ in range(55)],
+		# 3-4-5 triangles put every sample exactly 5 away
+		"on_limit": [[x + 3, y + 4] for x, y in tag_positions[:20]],
+	}
+	return tracks, tag_positions
+
+def distances_to_tag(positions, tag_positions):
+	return [math.hypot(px - tx, py - ty) for (px, py), (tx, ty) in zip(positions, tag_positions)]
+
+@pytest.mark.parametrize("builder", ["build_tag_distance_index", "build_tag_distance_index_array"])
+def test_index_matches_direct_distances(builder):
+	if builder.endswith("_array") and tag_distance.np is None:
+		pytest.skip("numpy is not installed")
+	tracks, tag_positions = new_tracks()
+	index = getattr(tag_distance, builder)(tracks, tag_positions, RANGES)
+
+	for key, positions in tracks.items():
+		distances = distances_to_tag(positions, tag_positions)
+		assert index["count"][key] == len(distances)
+		for samples in [-1, 0, 1, 6, 20, 40, 100]:
+			used = distances[:max(samples, 0)]
+			assert average_tag_distance(index, key, samples) == pytest.approx(sum(used) / len(used) if used else 0)
+		for range_index, limit in enumerate(RANGES):
+			for start, end in [(0, 100), (-5, 3), (2, 7), (6, 6), (9, 4), (10, 40), (39, 60)]:
+				expected = sum(distance <= limit for distance in distances[max(start, 0):max(end, 0)])
+				assert count_in_range(index, key, range_index, start, end) == expected
+
+@pytest.mark.skipif(tag_distance.np is None, reason="numpy is not installed")
+def test_array_index_matches_the_list_index():
+	tracks, tag_positions = new_tracks()
+	index = build_tag_distance_index(tracks, tag_positions, RANGES)
+	array_index = tag_distance.build_tag_distance_index_array(tracks, tag_positions, RANGES)
+
+	assert array_index["count"] == index["count"]
+	assert array_index["in_range"] == index["in_range"]
+	assert count_in_range(array_index, "on_limit", 0, 0, 40) == 20
+	for key in tracks:
+		assert array_index["distance_sums"][key] == pytest.approx(index["distance_sums"][key])
+		for samples in range(-1, 60):
+			assert average_tag_distance(array_index, key, samples) == pytest.approx(average_tag_distance(index, key, samples))
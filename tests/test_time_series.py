@@ -0,0 +1,109 @@
+from array import array
+
+import pytest
+
+import time_series
+from time_series import add_series, add_to_array, add_window_deltas, moving_average, to_cumulative, to_deltas, window_max, window_sum
+
+needs_numpy = pytest.mark.skipif(time_series.np is None, reason="numpy is not installed")
+
+CUMULATIVE = [0, 2, 5, 5, 9, 10]
+
+
+@pytest.mark.parametrize("cumulative, initial, expected", [
+	([], 0, []),
+	([5], 0, [5]),
+	([5], 2, [3]),
+	([1, 3, 3, 7], 0, [1, 2, 0, 4]),
+	(CUMULATIVE, 0, [0, 2, 3, 0, 4, 1]),
+])
+def test_to_deltas(cumulative, initial, expected):
+	assert to_deltas(cumulative, initial) == expected
+	if not initial:
+		assert to_cumulative(expected) == cumulative
+
+@needs_numpy
+@pytest.mark.parametrize("cumulative, initial, expected", [
+	([5], 2, [3]),
+	([1, 3, 3, 7], 0, [1, 2, 0, 4]),
+	([[1, 3, 3], [0, 0, 4]], 0, [[1, 2, 0], [0, 0, 4]]),
+])
+def test_to_deltas_array(cumulative, initial, expected):
+	assert time_series.to_deltas_array(time_series.np.array(cumulative), initial).tolist() == expected
+
+@pytest.mark.parametrize("start, end, expected", [
+	(0, 5, 10),
+	(1, 3, 3),
+	(2, 3, 0),
+	(4, 4, 0),
+])
+def test_window_sum(start, end, expected):
+	assert window_sum(CUMULATIVE, start, end) == expected
+
+@pytest.mark.parametrize("cumulative, windows, expected", [
+	(CUMULATIVE, [1, 2], [4, 5]),
+	# the longest window covers the whole series, a longer one has no value
+	(CUMULATIVE, [5, 6, 10], [10, None, None]),
+	([7], [1], [None]),
+	([], [1], [None]),
+])
+def test_window_max(cumulative, windows, expected):
+	assert window_max(cumulative, windows) == expected
+
+@needs_numpy
+def test_window_max_array():
+	rows = [CUMULATIVE, [0, 0, 0, 1, 1, 1], [3, 3, 3, 3, 3, 3]]
+	windows = [1, 2, 5, 6]
+
+	assert time_series.window_max_array(time_series.np.array(rows), windows) == [
+		[window_max(row, [seconds])[0] for row in rows] if seconds < len(CUMULATIVE) else None
+		for seconds in windows
+	]
+
+@pytest.mark.parametrize("values, window_size, expected", [
+	([], 2, []),
+	([4, 0, 2, 6], 0, [4.0, 0.0, 2.0, 6.0]),
+	# windows are clipped at the ends of the series
+	([4, 0, 2, 6], 1, [2.0, 2.0, 8 / 3, 4.0]),
+	([4, 0, 2, 6], 3, [3.0, 3.0, 3.0, 3.0]),
+	([4, 0, 2, 6], 10, [3.0, 3.0, 3.0, 3.0]),
+	([9], 1, [9.0]),
+])
+def test_moving_average(values, window_size, expected):
+	assert moving_average(values, window_size) == expected
+	if time_series.np is not None:
+		assert time_series.moving_average_array(time_series.np.array(values, dtype=int), window_size).tolist() == expected
+
+@pytest.mark.parametrize("start, end, expected", [
+	(0, 5, [3, 4, 1, 5, 2]),
+	(1, 3, [1, 4, 1, 1, 1]),
+	# an empty or reversed window adds nothing
+	(3, 3, [1, 1, 1, 1, 1]),
+	(4, 2, [1, 1, 1, 1, 1]),
+	(4, 5, [1, 1, 1, 1, 2]),
+])
+def test_add_window_deltas(start, end, expected):
+	total = [1] * 5
+	add_window_deltas(total, CUMULATIVE, start, end)
+
+	assert total == expected
+
+@pytest.mark.parametrize("total, values, expected", [
+	([], [], []),
+	([1, 2, 3], [1, 1, 1], [2, 3, 4]),
+])
+def test_add_series(total, values, expected):
+	add_series(total, values)
+
+	assert total == expected
+
+@pytest.mark.parametrize("total, values, expected", [
+	([1, 2], [1, 1, 1], [2, 3, 1]),
+	([1, 2], [5], [6, 2]),
+	([], [], []),
+])
+def test_add_to_array(total, values, expected):
+	total = array("q", total)
+	add_to_array(total, values)
+
+	assert total.tolist() == expected
@@ -0,0 +1,62 @@
+import random
+
+import pytest
+
+from top_k import get_top_k, new_top_k, push_top_k
+
+
+def rank_with_dict(scores, size, identity, value):
+	"""The dict and min() ranking that high scores used before the top-K tables."""
+	if identity in scores:
+		if value > scores[identity]:
+			scores[identity] = value
+	elif len(scores) < size:
+		scores[identity] = value
+	elif size:
+		lowest_identity = min(scores, key=scores.get)
+		if value > scores[lowest_identity]:
+			del scores[lowest_identity]
+			scores[identity] = value
+
+def push_all(size, pushes):
+	table = new_top_k(size)
+	for identity, value in pushes:
+		push_top_k(table, identity, {"identity": identity, "value": value})
+	return [(record["identity"], record["value"]) for record in get_top_k(table)]
+
+def rank_all_with_dict(size, pushes):
+	scores = {}
+	for identity, value in pushes:
+		rank_with_dict(scores, size, identity, value)
+	return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+@pytest.mark.parametrize("size, pushes, expected", [
+	# equal values keep the order they were first added in
+	(3, [("a", 5), ("b", 5), ("c", 5)], [("a", 5), ("b", 5), ("c", 5)]),
+	# the earliest of the tied lowest records is evicted first
+	(2, [("a", 5), ("b", 5), ("c", 6)], [("c", 6), ("b", 5)]),
+	(2, [("a", 5), ("b", 5), ("c", 6), ("d", 6)], [("c", 6), ("d", 6)]),
+	# a new record tying the lowest one is not kept
+	(2, [("a", 5), ("b", 7), ("c", 5)], [("b", 7), ("a", 5)]),
+	# an identity is only replaced by a higher value, and keeps its first-added order
+	(3, [("a", 5), ("b", 5), ("a", 5), ("a", 4)], [("a", 5), ("b", 5)]),
+	(2, [("a", 5), ("b", 5), ("a", 6), ("c", 6)], [("a", 6), ("c", 6)]),
+	(2, [("a", 5), ("b", 6), ("a", 6), ("c", 7)], [("c", 7), ("b", 6)]),
+	# an improved record is ranked by its new value
+	(2, [("a", 1), ("b", 2), ("a", 3), ("c", 2)], [("a", 3), ("b", 2)]),
+	# an evicted identity comes back as a new record
+	(1, [("a", 5), ("b", 6), ("a", 7)], [("a", 7)]),
+	(0, [("a", 5), ("b", 6)], []),
+])
+def test_ties_and_replacement(size, pushes, expected):
+	assert push_all(size, pushes) == expected
+	assert rank_all_with_dict(size, pushes) == expected
+
+@pytest.mark.parametrize("size", [0, 1, 2, 5, 20])
+@pytest.mark.parametrize("seed", range(20))
+def test_matches_the_dict_ranking(size, seed):
+	rng = random.Random(seed)
+	# few identities and values, so most pushes repeat an identity or tie a value
+	pushes = [(rng.randrange(12), rng.randrange(8)) for _ in range(rng.randrange(1, 200))]
+
+	assert push_all(size, pushes) == rank_all_with_dict(size, pushes)
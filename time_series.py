@@ -0,0 +1,201 @@
+#    This file contains the configuration for computing the detailed top stats in arcdps logs as parsed by Elite Insights.
+#    Copyright (C) 2024 John Long (Drevarr)
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import itertools
+import operator
+from array import array
+
+# Optional NumPy support for the array versions used by the NumPy DPS engine
+try:
+	import numpy as np
+except ImportError:
+	np = None
+
+
+# Elite Insights series such as damage1S, targetDamage1S and damageTaken1S are cumulative per second.
+# The list functions take lists of ints, the *_array functions NumPy arrays; both give the same numbers.
+
+def to_deltas(cumulative: list, initial: int = 0) -> list:
+	"""
+	Convert a cumulative series to the amount added on each tick.
+
+	Args:
+		cumulative (list): The cumulative series.
+		initial (int): The value before the first tick, the first delta is cumulative[0] - initial. Defaults to 0.
+
+	Returns:
+		list: The per tick deltas, as long as the series.
+	"""
+	if not len(cumulative):
+		return []
+	deltas = [cumulative[0] - initial]
+	deltas.extend(map(operator.sub, cumulative[1:], cumulative))
+	return deltas
+
+def to_cumulative(deltas: list) -> list:
+	"""
+	Convert per tick deltas back to a cumulative series.
+
+	Args:
+		deltas (list): The per tick deltas.
+
+	Returns:
+		list: The cumulative series, as long as the deltas.
+	"""
+	return list(itertools.accumulate(deltas))
+
+def add_series(total: list, values: list) -> None:
+	"""
+	Add a series to a running total of the same length, element by element.
+
+	Args:
+		total (list): The running total, updated in place.
+		values (list): The series to add.
+	"""
+	total[:] = map(operator.add, total, values)
+
+def add_to_array(total: array, values) -> None:
+	"""
+	Add a series to a typed array in place, growing the array with zeros when the series is longer.
+
+	Args:
+		total (array): The running total.
+		values: The series to add.
+	"""
+	if len(values) > len(total):
+		total.extend(itertools.repeat(0, len(values) - len(total)))
+	count = len(values)
+	total[:count] = array(total.typecode, map(operator.add, total[:count], values))
+
+def add_window_deltas(total: list, cumulative: list, start: int, end: int) -> None:
+	"""
+	Add the amount a cumulative series gains on each tick of a [start, end) window to a per tick total.
+
+	The amount gained on tick i is cumulative[i + 1] - cumulative[i].
+
+	Args:
+		total (list): The per tick total, updated in place.
+		cumulative (list): The cumulative series.
+		start (int): The first tick of the window.
+		end (int): The tick after the window.
+	"""
+	if end > start:
+		total[start:end] = map(operator.add, total[start:end], map(operator.sub, cumulative[start + 1:end + 1], cumulative[start:end]))
+
+def moving_average(values: list, window_size: int) -> list:
+	"""
+	Calculate the centred moving average of a series with a running sum.
+
+	Each average covers window_size elements on each side, clipped at the ends of the series,
+	so the cost is O(n) whatever the window size.
+
+	Args:
+		values (list): The integer series.
+		window_size (int): The number of elements on each side included in the average.
+
+	Returns:
+		list: The moving average of each element.
+	"""
+	count = len(values)
+	prefix = [0]
+	prefix.extend(itertools.accumulate(values))
+	return [
+		(prefix[min(count, index + window_size + 1)] - prefix[max(0, index - window_size)]) / (min(count, index + window_size + 1) - max(0, index - window_size))
+		for index in range(count)
+	]
+
+def window_sum(cumulative: list, start: int, end: int):
+	"""
+	Get the amount added to a cumulative series between two ticks in O(1).
+
+	Args:
+		cumulative (list): The cumulative series.
+		start (int): The start tick.
+		end (int): The end tick.
+
+	Returns:
+		The amount added after the start tick up to and including the end tick.
+	"""
+	return cumulative[end] - cumulative[start]
+
+def window_max(cumulative: list, windows: list) -> list:
+	"""
+	Get the largest amount added to a cumulative series within each window length.
+
+	Args:
+		cumulative (list): The cumulative series.
+		windows (list): The window lengths in ticks.
+
+	Returns:
+		list: The largest amount for each window length, None when the series is shorter than the window.
+	"""
+	return [
+		max(map(operator.sub, cumulative[seconds:], cumulative[:-seconds])) if seconds < len(cumulative) else None
+		for seconds in windows
+	]
+
+def to_deltas_array(cumulative, initial: int = 0, axis: int = -1):
+	"""
+	Convert a cumulative NumPy array to the amount added on each tick, see to_deltas.
+
+	Args:
+		cumulative (np.ndarray): The cumulative series, one row per series for 2D arrays.
+		initial (int): The value before the first tick. Defaults to 0.
+		axis (int): The tick axis. Defaults to -1.
+
+	Returns:
+		np.ndarray: The per tick deltas.
+	"""
+	return np.diff(cumulative, axis=axis, prepend=initial)
+
+def moving_average_array(values, window_size: int):
+	"""
+	Calculate the same moving average as moving_average on a NumPy array.
+
+	Args:
+		values (np.ndarray): The integer series.
+		window_size (int): The number of elements on each side included in the average.
+
+	Returns:
+		np.ndarray: The moving averages.
+	"""
+	count = len(values)
+	prefix = np.concatenate(([0], np.cumsum(values)))
+	positions = np.arange(count)
+	starts = np.maximum(0, positions - window_size)
+	stops = np.minimum(count, positions + window_size + 1)
+	return (prefix[stops] - prefix[starts]) / (stops - starts)
+
+def window_max_array(cumulative, windows: list) -> list:
+	"""
+	Get the largest amount added within each window length, for every row of a cumulative NumPy array.
+
+	Each window length is one subtraction of the array shifted by the window, so all rows are
+	handled together and long windows cost no more than short ones.
+
+	Args:
+		cumulative (np.ndarray): The cumulative series, one row per series.
+		windows (list): The window lengths in ticks.
+
+	Returns:
+		list: For each window length, the largest amount of each row, None when the series is shorter than the window.
+	"""
+	ticks = cumulative.shape[1]
+	return [
+		(cumulative[:, seconds:] - cumulative[:, :-seconds]).max(axis=1).tolist() if seconds < ticks else None
+		for seconds in windows
+	]
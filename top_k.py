@@ -0,0 +1,128 @@
+#    This file contains the configuration for computing the detailed top stats in arcdps logs as parsed by Elite Insights.
+#    Copyright (C) 2024 John Long (Drevarr)
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import heapq
+
+
+# A top-K table keeps the K records with the highest "value", at most one record per identity.
+# The lowest kept record sits on top of a min-heap of (value, order, identity) entries, so adding a
+# record costs O(log K). A record that improves drops its old heap entry lazily: the entry is left in
+# the heap and skipped once it no longer matches the record. Ties are resolved by the order the
+# identities were first added, the earlier record is the lower one.
+
+def new_top_k(size: int) -> dict:
+	"""
+	Create an empty top-K table.
+
+	Args:
+		size (int): The number of records to keep.
+
+	Returns:
+		dict: The table.
+	"""
+	return {
+		"size": size,
+		"records": {},
+		"orders": {},
+		"heap": [],
+		"count": 0,
+	}
+
+def is_current_entry(table: dict, entry: tuple) -> bool:
+	"""
+	Check whether a heap entry still matches the record of its identity.
+
+	Args:
+		table (dict): The top-K table.
+		entry (tuple): The (value, order, identity) heap entry.
+
+	Returns:
+		bool: True when the identity is kept with this value and order.
+	"""
+	value, order, identity = entry
+	record = table["records"].get(identity)
+	return record is not None and record["value"] == value and table["orders"][identity] == order
+
+def get_lowest_entry(table: dict) -> tuple:
+	"""
+	Get the heap entry of the lowest kept record, dropping the outdated entries above it.
+
+	Args:
+		table (dict): A top-K table holding at least one record.
+
+	Returns:
+		tuple: The (value, order, identity) entry.
+	"""
+	heap = table["heap"]
+	while not is_current_entry(table, heap[0]):
+		heapq.heappop(heap)
+	return heap[0]
+
+def push_top_k(table: dict, identity, record: dict) -> None:
+	"""
+	Add a record to a top-K table if it ranks among the K highest values.
+
+	A record for an identity already in the table replaces it only when its value is higher.
+
+	Args:
+		table (dict): The top-K table.
+		identity: A hashable key identifying what the record is for.
+		record (dict): The record, ranked by its "value".
+	"""
+	records = table["records"]
+	heap = table["heap"]
+	value = record["value"]
+
+	current = records.get(identity)
+	if current is not None:
+		if value > current["value"]:
+			records[identity] = record
+			heapq.heappush(heap, (value, table["orders"][identity], identity))
+			if len(heap) > 2 * table["size"]:
+				heap[:] = [entry for entry in heap if is_current_entry(table, entry)]
+				heapq.heapify(heap)
+		return
+
+	if len(records) >= table["size"]:
+		if not table["size"]:
+			return
+		lowest_value, _, lowest_identity = get_lowest_entry(table)
+		if value <= lowest_value:
+			return
+		heapq.heappop(heap)
+		del records[lowest_identity]
+		del table["orders"][lowest_identity]
+
+	order = table["count"]
+	table["count"] += 1
+	records[identity] = record
+	table["orders"][identity] = order
+	heapq.heappush(heap, (value, order, identity))
+
+def get_top_k(table: dict) -> list:
+	"""
+	Get the records of a top-K table from the highest value to the lowest.
+
+	Records with the same value keep the order their identities were first added.
+
+	Args:
+		table (dict): The top-K table.
+
+	Returns:
+		list: The records.
+	"""
+	return sorted(table["records"].values(), key=lambda record: record["value"], reverse=True)
@@ -20,15 +20,24 @@ import configparser
 import sys
 import os
 import datetime
+import multiprocessing
 
 from collections import OrderedDict
 
 import config_output
+import json_backend
+import parser_functions
+import run_profiler
+from log_planner import parse_date_bound, plan_log_files
+from log_reader import list_log_files, set_native_log_decoding, snapshot_log_files, wait_for_new_logs
+from fight_cache import open_fight_cache, close_fight_cache
 from parser_functions import *
 from output_functions import *
 
 
 if __name__ == '__main__':
+	multiprocessing.freeze_support()
+
 	parser = argparse.ArgumentParser(
 		description='This reads a set of arcdps reports in xml format and generates top stats.'
 	)
@@ -38,6 +47,13 @@ if __name__ == '__main__':
 	parser.add_argument('-j', '--json_output', dest="json_output_filename", help="Override .json file to write the computed stats data")
 	parser.add_argument('-c', '--config_file', dest="config_file", help="Select a specific config file. Defaults to top_stats_config.ini")
 	parser.add_argument('-d', '--description_append', dest="description_append", help="Appended to the description of the summary caption.")
+	parser.add_argument('-a', '--append', dest="append", action="store_true", help="Append logs not in the saved session state instead of parsing all logs")
+	parser.add_argument('--watch', dest="watch", action="store_true", help="Keep running and update the summary whenever new logs are added to the input directory")
+	parser.add_argument('--from', dest="date_start", help="Only parse fights starting on or after this date, YYYY-MM-DD or YYYY-MM-DD HH:MM")
+	parser.add_argument('--to', dest="date_end", help="Only parse fights starting on or before this date, YYYY-MM-DD or YYYY-MM-DD HH:MM")
+	parser.add_argument('--profile', dest="profile", action="store_true", help="Write a timing and memory report and a Chrome trace of the run next to the outputs")
+	parser.add_argument('--profile-memory', dest="profile_memory", action="store_true", help="Like --profile, and trace allocations for the peak memory of every function (much slower)")
+	parser.add_argument('-w', '--workers', dest="workers", type=int, help="Number of processes used to parse the logs. Defaults to 1")
 
 	args = parser.parse_args()
 
@@ -110,6 +126,34 @@ if __name__ == '__main__':
 	excel_output_filename = config_ini.get('TopStatsCfg', 'excel_output_filename', fallback='Top_Stats.xlsx')
 	excel_path = config_ini.get('TopStatsCfg', 'excel_path', fallback='.')
 
+	workers = args.workers or config_ini.getint('TopStatsCfg', 'workers', fallback=1)
+	json_compact = config_ini.getboolean('TopStatsCfg', 'json_compact', fallback=False)
+	print("JSON backend: " + json_backend.set_json_backend(config_ini.get('TopStatsCfg', 'json_backend', fallback='auto')))
+	native_log_decoding = set_native_log_decoding(config_ini.getboolean('TopStatsCfg', 'native_log_decoding', fallback=False))
+	print("Log decoding: " + ("native" if native_log_decoding else "streamed"))
+	print("DPS engine: " + set_dps_engine(config_ini.get('TopStatsCfg', 'dps_engine', fallback='auto')))
+	set_burst_windows(config_ini.get('TopStatsCfg', 'burst_windows', fallback='1-20'))
+	set_high_score_count(config_ini.getint('TopStatsCfg', 'high_score_count', fallback=5))
+	set_damage_debuffs(config_ini.get('TopStatsCfg', 'damage_debuffs', fallback='b70350:0.10:targetDamage1S, b70806:0.10:targetPowerDamage1S'))
+	parse_cache = config_ini.getboolean('TopStatsCfg', 'parse_cache', fallback=False)
+	parse_cache_size_mb = config_ini.getint('TopStatsCfg', 'parse_cache_size_mb', fallback=1024)
+	save_session = config_ini.getboolean('TopStatsCfg', 'save_session_state', fallback=False) or args.append
+	watch_poll_seconds = config_ini.getfloat('TopStatsCfg', 'watch_poll_seconds', fallback=2)
+	watch_settle_seconds = config_ini.getfloat('TopStatsCfg', 'watch_settle_seconds', fallback=5)
+	log_filters = {
+		'min_fight_duration': config_ini.getfloat('TopStatsCfg', 'min_fight_duration', fallback=0),
+		'min_squad_size': config_ini.getint('TopStatsCfg', 'min_squad_size', fallback=0),
+		'date_start': args.date_start or config_ini.get('TopStatsCfg', 'fight_date_start', fallback=''),
+		'date_end': args.date_end or config_ini.get('TopStatsCfg', 'fight_date_end', fallback=''),
+	}
+	try:
+		parse_date_bound(log_filters['date_start'])
+		parse_date_bound(log_filters['date_end'], end=True)
+	except ValueError as error:
+		print(error)
+		sys.exit()
+	session_state_file = os.path.join(input_directory, config_ini.get('TopStatsCfg', 'session_state_file', fallback='TW5_top_stats_session.pickle'))
+
 	skill_casts_by_role_limit = config_ini.getint('TopStatsCfg', 'skill_casts_by_role_limit', fallback=40)
 	enable_hide_columns = config_ini.getboolean('TopStatsCfg', 'hide_columns', fallback=False)
 
@@ -123,12 +167,18 @@ if __name__ == '__main__':
 	excel_output_full_path = os.path.join(excel_path, excel_output_filename)
 
 	# Process files
-	sorted_files = sorted(os.listdir(input_directory))
 	file_date = datetime.datetime.now()
-	fight_num = 0
 
 	print(f"Using input directory {input_directory}, writing output to {args.output_filename}")
 
+	args.profile = args.profile or args.profile_memory
+	if args.profile:
+		run_profiler.enable_profiler(args.profile_memory)
+		run_profiler.instrument_namespace(vars(parser_functions), "parser", exclude=parser_functions.profile_exclude)
+		run_profiler.instrument_namespace(globals(), "output", ("build_", "write_", "output_"))
+		profile_report_path = os.path.splitext(args.output_filename)[0] + "_profile.json"
+		profile_trace_path = os.path.splitext(args.output_filename)[0] + "_trace.json"
+
 	guild_data = None
 	if guild_id and api_key:
 		guild_data = fetch_guild_data(guild_id, api_key, max_retries=3, backoff_factor=0.5)
@@ -136,265 +186,322 @@ if __name__ == '__main__':
 	print("guild_id: ", guild_id)
 	print("API_KEY: ", api_key)
 
-	for filename in sorted_files:
-		
-		# skip files of incorrect filetype
-		file_start, file_extension = os.path.splitext(filename)
-		# if args.filetype not in file_extension or "top_stats" in file_start:
-		if file_extension not in ['.json', '.gz'] or "Drag_and_Drop_" in file_start or "TW5_top_stats_" in file_start:
-			continue
-
-		print_string = "parsing " + filename
-		print(print_string)
-		file_path = "".join((input_directory, "/", filename))
-
-		fight_num += 1
-		
-		parse_file(file_path, fight_num, guild_data, fight_data_charts)
-
-	print("Parsing Complete")
-
-	tag_data, tag_list = build_tag_summary(top_stats)
-	tid_date_time = top_stats['overall']['last_fight']
+	parse_options = {'fight_data_charts': fight_data_charts, 'guild_data': guild_data, 'burst_windows': list(burst_windows), 'damage_debuffs': get_damage_debuffs_setting()}
+	# a session can only be appended to with the filters it was built with
+	session_options = dict(parse_options, log_filters=log_filters)
+
+	append_logs = args.append
+	watching = args.watch
+	while True:
+		# in watch mode the database and Discord are only updated once, when watching stops
+		publish = not watching
+
+		tid_list.clear()
+		log_file_signatures = snapshot_log_files(input_directory)
+
+		run_profiler.begin_stage("plan")
+		session_state = None
+		if append_logs:
+			session_state = load_session_state(session_state_file, session_options)
+
+		log_paths = dict(list_log_files(input_directory))
+		log_names = list(log_paths)
+
+		first_fight_num = 1
+		new_log_names = log_names
+		if session_state:
+			new_log_names = get_new_log_names(log_names, session_state)
+			first_fight_num = session_state['last_fight_num'] + 1
+			print(f"Appending {len(new_log_names)} new logs to {len(session_state['ingested_files'])} fights from {session_state_file}")
+		# the fight cache also keeps the log headers read by the planner
+		fight_cache = None
+		if parse_cache:
+			fight_cache = open_fight_cache(input_directory, parse_options, parse_cache_size_mb)
+		planned_logs = plan_log_files([(filename, log_paths[filename]) for filename in new_log_names], log_filters, workers, fight_cache)
+		new_log_names = [filename for filename, _ in planned_logs]
+		log_files = [log_path for _, log_path in planned_logs]
+
+		run_profiler.begin_stage("ingest")
+		fight_num = ingest_log_files(
+			log_files, guild_data, fight_data_charts, workers, first_fight_num,
+			cache=fight_cache, session=session_state['session'] if session_state else None
+		)
+
+		if fight_cache is not None:
+			close_fight_cache(fight_cache)
+
+		if (save_session or args.watch) and fight_num:
+			ingested_files = (session_state['ingested_files'] if session_state else []) + new_log_names
+			save_session_state(session_state_file, ingested_files, fight_num, session_options)
+
+		print("Parsing Complete")
+		run_profiler.begin_stage("tiddlers")
+
+		tag_data, tag_list = build_tag_summary(top_stats)
+		tid_date_time = top_stats['overall']['last_fight']
 	
-	#create the main tiddler and append to tid_list
-	build_main_tid(tid_date_time, tag_list, guild_name, args.description_append)
+		#create the main tiddler and append to tid_list
+		build_main_tid(tid_date_time, tag_list, guild_name, args.description_append)
 
-	output_tag_summary(tag_data, tid_date_time)
+		output_tag_summary(tag_data, tid_date_time)
 
-	#create the menu tiddler and append to tid_list
-	build_menu_tid(tid_date_time, db_update)
+		#create the menu tiddler and append to tid_list
+		build_menu_tid(tid_date_time, db_update)
 
-	build_dashboard_menu_tid(tid_date_time)
+		build_dashboard_menu_tid(tid_date_time)
 	
-	build_general_stats_tid(tid_date_time)
+		build_general_stats_tid(tid_date_time)
 
-	build_buffs_stats_tid(tid_date_time)
+		build_buffs_stats_tid(tid_date_time)
 
-	build_boon_stats_tid(tid_date_time)
-	for boon_other in ["Defensive", "Offensive", "Support"]:
-		build_other_boon_stats_tid(tid_date_time, boon_other)
+		build_boon_stats_tid(tid_date_time)
+		for boon_other in ["Defensive", "Offensive", "Support"]:
+			build_other_boon_stats_tid(tid_date_time, boon_other)
 
-	build_damage_modifiers_menu_tid(tid_date_time)
+		build_damage_modifiers_menu_tid(tid_date_time)
 
-	build_healer_menu_tabs(top_stats, "Healers", tid_date_time)
-	build_healer_outgoing_tids(top_stats, skill_data, buff_data, "Healers", tid_date_time)
+		build_healer_menu_tabs(top_stats, "Healers", tid_date_time)
+		build_healer_outgoing_tids(top_stats, skill_data, buff_data, "Healers", tid_date_time)
 
-	build_profession_damage_modifier_stats_tid(personal_damage_mod_data, "Damage Modifiers", tid_date_time)
+		build_profession_damage_modifier_stats_tid(personal_damage_mod_data, "Damage Modifiers", tid_date_time)
 
-	build_shared_damage_modifier_summary(top_stats, damage_mod_data, "Shared Damage Mods", tid_date_time)
+		build_shared_damage_modifier_summary(top_stats, damage_mod_data, "Shared Damage Mods", tid_date_time)
 		
-	defense_stats = config_output.defenses_table
-	build_category_summary_table(top_stats, defense_stats, enable_hide_columns, "Defenses", tid_date_time)
-
-	support_stats = config_output.support_table
-	build_category_summary_table(top_stats, support_stats, enable_hide_columns, "Support", tid_date_time)
-
-	offensive_stats = config_output.offensive_table
-	build_category_summary_table(top_stats, offensive_stats, enable_hide_columns, "Offensive", tid_date_time)
-
-	boons = config_output.boons
-	build_uptime_summary(top_stats, boons, buff_data, "Uptimes", tid_date_time)
-
-	boon_categories = {"selfBuffs", "groupBuffs", "squadBuffs"}
-	for boon_category in boon_categories:
-		build_boon_summary(top_stats, boons, boon_category, buff_data, tid_date_time)
-
-	#get incoming condition uptimes on Squad Players
-	conditions = config_output.buffs_conditions
-	condition_list = {}
-	for condition in conditions:
-		if condition in top_stats["overall"]["buffUptimes"]:
-			if top_stats["overall"]["buffUptimes"][condition]["uptime_ms"] > 0:
-				condition_list[condition] = conditions[condition]
-	build_uptime_summary(top_stats, condition_list, buff_data, "Conditions-In", tid_date_time)
-
-	#get outgoing debuff uptimes on Enemy Players
-	debuffs = config_output.buffs_debuff
-	debuff_list = {}
-	for debuff in debuffs:
-		if debuff in top_stats["overall"]["targetBuffs"]:
-			if top_stats["overall"]["targetBuffs"][debuff]["uptime_ms"] > 0:
-				debuff_list[debuff] = debuffs[debuff]
-	build_debuff_uptime_summary(top_stats, debuff_list, buff_data, "Debuffs-Out", tid_date_time)
-
-	#get outgoing condition uptimes on Enemy Players
-	conditions = config_output.buffs_conditions
-	condition_list = {}
-	for condition in conditions:
-		if condition in top_stats["overall"]["targetBuffs"]:
-			if top_stats["overall"]["targetBuffs"][condition]["uptime_ms"] > 0:
-				condition_list[condition] = conditions[condition]
-	build_debuff_uptime_summary(top_stats, condition_list, buff_data, "Conditions-Out", tid_date_time)
-
-	#get support buffs found and output table
-	support_buffs = config_output.buffs_support
-	support_buff_list = {}
-	for buff in support_buffs:
-		if buff in top_stats["overall"]["buffUptimes"]:
-			if top_stats["overall"]["buffUptimes"][buff]["uptime_ms"] > 0:
-				support_buff_list[buff] = support_buffs[buff]
-	build_uptime_summary(top_stats, support_buff_list, buff_data, "Support Uptimes", tid_date_time)
-	boon_categories = {"selfBuffs", "groupBuffs", "squadBuffs"}
-	for boon_category in boon_categories:
-		build_boon_summary(top_stats, support_buff_list, boon_category, buff_data, tid_date_time, boon_type="Support")
-
-
-	#get defensive buffs found and output table
-	defensive_buffs = config_output.buffs_defensive
-	defensive_buff_list = {}
-	for buff in defensive_buffs:
-		if buff in top_stats["overall"]["buffUptimes"]:
-			if top_stats["overall"]["buffUptimes"][buff]["uptime_ms"] > 0:
-				defensive_buff_list[buff] = defensive_buffs[buff]
-	build_uptime_summary(top_stats, defensive_buff_list, buff_data, "Defensive Uptimes", tid_date_time)
-	boon_categories = {"selfBuffs", "groupBuffs", "squadBuffs"}
-	for boon_category in boon_categories:
-		build_boon_summary(top_stats, defensive_buff_list, boon_category, buff_data, tid_date_time, boon_type="Defensive")
-
-	#get offensive buffs found and output table
-	offensive_buffs = config_output.buffs_offensive
-	offensive_buff_list = {}
-	for buff in offensive_buffs:
-		if buff in top_stats["overall"]["buffUptimes"]:
-			if top_stats["overall"]["buffUptimes"][buff]["uptime_ms"] > 0:
-				offensive_buff_list[buff] = offensive_buffs[buff]
-	build_uptime_summary(top_stats, offensive_buff_list, buff_data, "Offensive Uptimes", tid_date_time)
-	boon_categories = {"selfBuffs", "groupBuffs", "squadBuffs"}
-	for boon_category in boon_categories:
-		build_boon_summary(top_stats, offensive_buff_list, boon_category, buff_data, tid_date_time, boon_type="Offensive")
-
-
-	#get offensive debuffs found and output table
-	debuffs_buffs = config_output.buffs_debuff
-	debuff_list = {}
-	for buff in debuffs_buffs:
-		if buff in top_stats["overall"]["buffUptimes"]:
-			if top_stats["overall"]["buffUptimes"][buff]["uptime_ms"] > 0:
-				debuff_list[buff] = debuffs_buffs[buff]
-	build_uptime_summary(top_stats, debuff_list, buff_data, "Debuffs-In", tid_date_time)
-
-	#get squad comp and output table
-	build_squad_composition(top_stats, tid_date_time, tid_list)
-
-
-	#get heal stats found and output table
-	build_healing_summary(top_stats, "Heal Stats", tid_date_time)
-
-	#get personal buffs found and output table
-	build_personal_buff_summary(top_stats, buff_data, personal_buff_data, "Personal Buffs", tid_date_time)
-
-	#get profession damage modifiers found and output table
-	build_personal_damage_modifier_summary(top_stats, personal_damage_mod_data, damage_mod_data, "Damage Modifiers", tid_date_time)
-
-	#get skill casts by profession and role and output table
-	build_skill_cast_summary(top_stats["skill_casts_by_role"], skill_data, "Skill Usage", skill_casts_by_role_limit, tid_date_time)
-
-	build_skill_usage_stats_tid(top_stats["skill_casts_by_role"], "Skill Usage", tid_date_time)
-
-	#get overview stats found and output table
-	#overview_stats = config_output.overview_stats
-	build_fight_summary(top_stats, fight_data_charts, "Overview", tid_date_time)
-
-	#get combat resurrection stats found and output table
-	build_combat_resurrection_stats_tid(top_stats, skill_data, buff_data, IOL_revive, killing_blow_rallies, "Combat Resurrect", tid_date_time)
-
-	#get FB Pages and output table
-	build_fb_pages_tid(fb_pages, "FB Pages", tid_date_time)
+		defense_stats = config_output.defenses_table
+		build_category_summary_table(top_stats, defense_stats, enable_hide_columns, "Defenses", tid_date_time)
+
+		support_stats = config_output.support_table
+		build_category_summary_table(top_stats, support_stats, enable_hide_columns, "Support", tid_date_time)
+
+		offensive_stats = config_output.offensive_table
+		build_category_summary_table(top_stats, offensive_stats, enable_hide_columns, "Offensive", tid_date_time)
+
+		boons = config_output.boons
+		build_uptime_summary(top_stats, boons, buff_data, "Uptimes", tid_date_time)
+
+		boon_categories = {"selfBuffs", "groupBuffs", "squadBuffs"}
+		for boon_category in boon_categories:
+			build_boon_summary(top_stats, boons, boon_category, buff_data, tid_date_time)
+
+		#get incoming condition uptimes on Squad Players
+		conditions = config_output.buffs_conditions
+		condition_list = {}
+		for condition in conditions:
+			if condition in top_stats["overall"]["buffUptimes"]:
+				if top_stats["overall"]["buffUptimes"][condition]["uptime_ms"] > 0:
+					condition_list[condition] = conditions[condition]
+		build_uptime_summary(top_stats, condition_list, buff_data, "Conditions-In", tid_date_time)
+
+		#get outgoing debuff uptimes on Enemy Players
+		debuffs = config_output.buffs_debuff
+		debuff_list = {}
+		for debuff in debuffs:
+			if debuff in top_stats["overall"]["targetBuffs"]:
+				if top_stats["overall"]["targetBuffs"][debuff]["uptime_ms"] > 0:
+					debuff_list[debuff] = debuffs[debuff]
+		build_debuff_uptime_summary(top_stats, debuff_list, buff_data, "Debuffs-Out", tid_date_time)
+
+		#get outgoing condition uptimes on Enemy Players
+		conditions = config_output.buffs_conditions
+		condition_list = {}
+		for condition in conditions:
+			if condition in top_stats["overall"]["targetBuffs"]:
+				if top_stats["overall"]["targetBuffs"][condition]["uptime_ms"] > 0:
+					condition_list[condition] = conditions[condition]
+		build_debuff_uptime_summary(top_stats, condition_list, buff_data, "Conditions-Out", tid_date_time)
+
+		#get support buffs found and output table
+		support_buffs = config_output.buffs_support
+		support_buff_list = {}
+		for buff in support_buffs:
+			if buff in top_stats["overall"]["buffUptimes"]:
+				if top_stats["overall"]["buffUptimes"][buff]["uptime_ms"] > 0:
+					support_buff_list[buff] = support_buffs[buff]
+		build_uptime_summary(top_stats, support_buff_list, buff_data, "Support Uptimes", tid_date_time)
+		boon_categories = {"selfBuffs", "groupBuffs", "squadBuffs"}
+		for boon_category in boon_categories:
+			build_boon_summary(top_stats, support_buff_list, boon_category, buff_data, tid_date_time, boon_type="Support")
+
+
+		#get defensive buffs found and output table
+		defensive_buffs = config_output.buffs_defensive
+		defensive_buff_list = {}
+		for buff in defensive_buffs:
+			if buff in top_stats["overall"]["buffUptimes"]:
+				if top_stats["overall"]["buffUptimes"][buff]["uptime_ms"] > 0:
+					defensive_buff_list[buff] = defensive_buffs[buff]
+		build_uptime_summary(top_stats, defensive_buff_list, buff_data, "Defensive Uptimes", tid_date_time)
+		boon_categories = {"selfBuffs", "groupBuffs", "squadBuffs"}
+		for boon_category in boon_categories:
+			build_boon_summary(top_stats, defensive_buff_list, boon_category, buff_data, tid_date_time, boon_type="Defensive")
+
+		#get offensive buffs found and output table
+		offensive_buffs = config_output.buffs_offensive
+		offensive_buff_list = {}
+		for buff in offensive_buffs:
+			if buff in top_stats["overall"]["buffUptimes"]:
+				if top_stats["overall"]["buffUptimes"][buff]["uptime_ms"] > 0:
+					offensive_buff_list[buff] = offensive_buffs[buff]
+		build_uptime_summary(top_stats, offensive_buff_list, buff_data, "Offensive Uptimes", tid_date_time)
+		boon_categories = {"selfBuffs", "groupBuffs", "squadBuffs"}
+		for boon_category in boon_categories:
+			build_boon_summary(top_stats, offensive_buff_list, boon_category, buff_data, tid_date_time, boon_type="Offensive")
+
+
+		#get offensive debuffs found and output table
+		debuffs_buffs = config_output.buffs_debuff
+		debuff_list = {}
+		for buff in debuffs_buffs:
+			if buff in top_stats["overall"]["buffUptimes"]:
+				if top_stats["overall"]["buffUptimes"][buff]["uptime_ms"] > 0:
+					debuff_list[buff] = debuffs_buffs[buff]
+		build_uptime_summary(top_stats, debuff_list, buff_data, "Debuffs-In", tid_date_time)
+
+		#get squad comp and output table
+		build_squad_composition(top_stats, tid_date_time, tid_list)
+
+
+		#get heal stats found and output table
+		build_healing_summary(top_stats, "Heal Stats", tid_date_time)
+
+		#get personal buffs found and output table
+		build_personal_buff_summary(top_stats, buff_data, personal_buff_data, "Personal Buffs", tid_date_time)
+
+		#get profession damage modifiers found and output table
+		build_personal_damage_modifier_summary(top_stats, personal_damage_mod_data, damage_mod_data, "Damage Modifiers", tid_date_time)
+
+		#get skill casts by profession and role and output table
+		build_skill_cast_summary(top_stats["skill_casts_by_role"], skill_data, "Skill Usage", skill_casts_by_role_limit, tid_date_time)
+
+		build_skill_usage_stats_tid(top_stats["skill_casts_by_role"], "Skill Usage", tid_date_time)
+
+		#get overview stats found and output table
+		#overview_stats = config_output.overview_stats
+		build_fight_summary(top_stats, fight_data_charts, "Overview", tid_date_time)
+
+		#get combat resurrection stats found and output table
+		build_combat_resurrection_stats_tid(top_stats, skill_data, buff_data, IOL_revive, killing_blow_rallies, "Combat Resurrect", tid_date_time)
+
+		#get FB Pages and output table
+		build_fb_pages_tid(fb_pages, "FB Pages", tid_date_time)
  
-	build_high_scores_tid(high_scores, skill_data, buff_data, "High Scores", tid_date_time)
+		build_high_scores_tid(high_scores, skill_data, buff_data, "High Scores", tid_date_time)
 
-	build_mechanics_tid(mechanics, top_stats['player'], "Mechanics", tid_date_time)
+		build_mechanics_tid(mechanics, top_stats['player'], "Mechanics", tid_date_time)
 
-	build_minions_tid(minions, top_stats['player'], skill_data, "Minions", tid_date_time)
+		build_minions_tid(minions, top_stats['player'], skill_data, "Minions", tid_date_time)
 
-	build_top_damage_by_skill(top_stats['overall']['totalDamageTaken'], top_stats['overall']['targetDamageDist'], skill_data, buff_data, "Top Damage By Skill", tid_date_time)
+		build_top_damage_by_skill(top_stats['overall']['totalDamageTaken'], top_stats['overall']['targetDamageDist'], skill_data, buff_data, "Top Damage By Skill", tid_date_time)
 
 
-	#build_damage_outgoing_by_player_skill_tids
-	build_damage_outgoing_by_skill_tid(tid_date_time, tid_list)
-	build_damage_outgoing_by_player_skill_tids(top_stats, skill_data, buff_data, tid_date_time, tid_list)
+		#build_damage_outgoing_by_player_skill_tids
+		build_damage_outgoing_by_skill_tid(tid_date_time, tid_list)
+		build_damage_outgoing_by_player_skill_tids(top_stats, skill_data, buff_data, tid_date_time, tid_list)
 
-	#build_gear_buff_summary
-	gear_buff_ids, gear_skill_ids = extract_gear_buffs_and_skills(buff_data, skill_data)
-	build_gear_buff_summary(top_stats, gear_buff_ids, buff_data, tid_date_time)
-	build_gear_skill_summary(top_stats, gear_skill_ids, skill_data, tid_date_time)
+		#build_gear_buff_summary
+		gear_buff_ids, gear_skill_ids = extract_gear_buffs_and_skills(buff_data, skill_data)
+		build_gear_buff_summary(top_stats, gear_buff_ids, buff_data, tid_date_time)
+		build_gear_skill_summary(top_stats, gear_skill_ids, skill_data, tid_date_time)
 
-	build_damage_summary_table(top_stats, "Damage", tid_date_time)
+		build_damage_summary_table(top_stats, "Damage", tid_date_time)
 
-	build_on_tag_review(death_on_tag, tid_date_time)
+		build_on_tag_review(death_on_tag, tid_date_time)
 
-	build_mesmer_clone_usage(mesmer_clone_usage, tid_date_time, tid_list)
+		build_mesmer_clone_usage(mesmer_clone_usage, tid_date_time, tid_list)
 
-	profession_color = config_output.profession_color
-	build_support_bubble_chart(top_stats, buff_data, weights, tid_date_time, tid_list, profession_color)
-	build_DPS_bubble_chart(top_stats, tid_date_time, tid_list, profession_color)
-	build_utility_bubble_chart(top_stats, buff_data, weights, tid_date_time, tid_list, profession_color)
-	boons = config_output.boons
-	build_boon_generation_bar_chart(top_stats, boons, weights, tid_date_time, tid_list)
-	conditions = config_output.buffs_conditions
-	build_condition_generation_bar_chart(top_stats, conditions, weights, tid_date_time, tid_list)
+		profession_color = config_output.profession_color
+		build_support_bubble_chart(top_stats, buff_data, weights, tid_date_time, tid_list, profession_color)
+		build_DPS_bubble_chart(top_stats, tid_date_time, tid_list, profession_color)
+		build_utility_bubble_chart(top_stats, buff_data, weights, tid_date_time, tid_list, profession_color)
+		boons = config_output.boons
+		build_boon_generation_bar_chart(top_stats, boons, weights, tid_date_time, tid_list)
+		conditions = config_output.buffs_conditions
+		build_condition_generation_bar_chart(top_stats, conditions, weights, tid_date_time, tid_list)
 
-	build_dps_stats_tids(DPSStats, tid_date_time, tid_list)
-	build_dps_stats_menu(tid_date_time)
+		build_dps_stats_tids(DPSStats, tid_date_time, tid_list)
+		build_dps_stats_menu(tid_date_time)
 
-	#attendance
-	build_attendance_table(top_stats,tid_date_time, tid_list)
+		#attendance
+		build_attendance_table(top_stats,tid_date_time, tid_list)
 
-	build_defense_damage_mitigation(player_damage_mitigation, player_minion_damage_mitigation, top_stats, tid_date_time, tid_list)
+		build_defense_damage_mitigation(player_damage_mitigation, player_minion_damage_mitigation, top_stats, tid_date_time, tid_list)
 	
-	build_stacking_buffs(stacking_uptime_Table, top_stats, tid_date_time, tid_list)
+		build_stacking_buffs(stacking_uptime_Table, top_stats, tid_date_time, tid_list)
 
-	build_damage_with_buffs(stacking_uptime_Table, DPSStats, top_stats, tid_date_time, tid_list)
+		build_damage_with_buffs(stacking_uptime_Table, DPSStats, top_stats, tid_date_time, tid_list)
 
-	build_pull_stats_tid(tid_date_time, top_stats, skill_data, tid_list)
+		build_pull_stats_tid(tid_date_time, top_stats, skill_data, tid_list)
 	
-	#Fight Data line charts
-	if fight_data_charts:
-		build_fight_line_chart(fight_data, tid_date_time, tid_list)
+		#Fight Data line charts
+		if fight_data_charts:
+			build_fight_line_chart(fight_data, tid_date_time, tid_list)
 
-	#commander Tag summary
-	if build_commander_summary_menu:
-		build_commander_summary(commander_summary_data, skill_data, buff_data, tid_date_time, tid_list)
-		build_commander_summary_menu(commander_summary_data, tid_date_time, tid_list)
+		#commander Tag summary
+		if build_commander_summary_menu:
+			build_commander_summary(commander_summary_data, skill_data, buff_data, tid_date_time, tid_list)
+			build_commander_summary_menu(commander_summary_data, tid_date_time, tid_list)
 
-	if write_all_data_to_json:
-		output_top_stats_json(top_stats, buff_data, skill_data, damage_mod_data, high_scores, personal_damage_mod_data, personal_buff_data, fb_pages, mechanics, minions, mesmer_clone_usage, death_on_tag, DPSStats, commander_summary_data, enemy_avg_damage_per_skill, player_damage_mitigation, player_minion_damage_mitigation, stacking_uptime_Table, IOL_revive, fight_data, args.json_output_filename)
+		run_profiler.begin_stage("output")
+		if write_all_data_to_json:
+			output_top_stats_json(top_stats, buff_data, skill_data, damage_mod_data, high_scores, personal_damage_mod_data, personal_buff_data, fb_pages, mechanics, minions, mesmer_clone_usage, death_on_tag, DPSStats, commander_summary_data, enemy_avg_damage_per_skill, player_damage_mitigation, player_minion_damage_mitigation, stacking_uptime_Table, IOL_revive, fight_data, args.json_output_filename, json_compact)
 
-	if write_excel:
-		write_data_to_excel(top_stats, top_stats['overall']['last_fight'], excel_output_full_path)
+		if write_excel:
+			write_data_to_excel(top_stats, top_stats['overall']['last_fight'], excel_output_full_path)
 		
-	if db_update:
-		write_data_to_db(top_stats, top_stats['overall']['last_fight'], db_output_full_path)
-
-		update_glicko_ratings(db_output_full_path)
-
-		leaderboard_stats = config_output.leaderboard_stats
-		build_leaderboard_tids(tid_date_time, leaderboard_stats , tid_list, db_output_full_path)
-		build_leaderboard_menu_tid(tid_date_time, leaderboard_stats, tid_list)
-
-		write_high_scores_to_db(high_scores, top_stats['fight'], skill_data, db_output_full_path)
-		build_high_scores_leaderboard_tids(tid_date_time, db_output_full_path)
-
-	write_tid_list_to_json(tid_list, args.output_filename)
-
-	if team_code_missing:
-		print("Missing team codes: " + str(team_code_missing))
-		print("Please review and add to config.py file")
-	else:
-		print("No new team codes found")
-
-	if webhook_url and support_profs:
-		discord_colors = config_output.profession_discord_color
-		boon_support_data = build_boon_support_data(top_stats, support_profs, config_output.boons)
-		profession_icons = config_output.profession_icons
-
-		for profession, support_data in boon_support_data.items():
-			print("Sending boon support data for " + profession)
-			send_profession_boon_support_embed(webhook_url, profession, profession_icons[profession], discord_colors[profession], tid_date_time, support_data)
-	else:
-		if not support_profs: 
-			print("No support professions found")
-		if not webhook_url:
-			print("No webhook URL found")
-	input("Press Enter to exit...")
\ No newline at end of file
+		if db_update and publish:
+			write_data_to_db(top_stats, top_stats['overall']['last_fight'], db_output_full_path)
+
+			update_glicko_ratings(db_output_full_path)
+
+			leaderboard_stats = config_output.leaderboard_stats
+			build_leaderboard_tids(tid_date_time, leaderboard_stats , tid_list, db_output_full_path)
+			build_leaderboard_menu_tid(tid_date_time, leaderboard_stats, tid_list)
+
+			write_high_scores_to_db(high_scores, top_stats['fight'], skill_data, db_output_full_path)
+			build_high_scores_leaderboard_tids(tid_date_time, db_output_full_path)
+
+		write_tid_list_to_json(tid_list, args.output_filename, json_compact)
+		run_profiler.end_stage()
+
+		if args.profile:
+			run_profiler.write_profile_report(
+				profile_report_path, profile_trace_path,
+				{"workers": workers, "json_backend": json_backend.json_backend, "parse_cache": parse_cache}
+			)
+
+		if team_code_missing:
+			print("Missing team codes: " + str(team_code_missing))
+			print("Please review and add to config.py file")
+		else:
+			print("No new team codes found")
+
+		if not publish:
+			pass
+		elif webhook_url and support_profs:
+			discord_colors = config_output.profession_discord_color
+			boon_support_data = build_boon_support_data(top_stats, support_profs, config_output.boons)
+			profession_icons = config_output.profession_icons
+
+			for profession, support_data in boon_support_data.items():
+				print("Sending boon support data for " + profession)
+				send_profession_boon_support_embed(webhook_url, profession, profession_icons[profession], discord_colors[profession], tid_date_time, support_data)
+		else:
+			if not support_profs: 
+				print("No support professions found")
+			if not webhook_url:
+				print("No webhook URL found")
+
+		if not watching:
+			break
+		try:
+			print(f"Watching {input_directory} for new logs, press Ctrl+C to stop")
+			wait_for_new_logs(input_directory, log_file_signatures, watch_poll_seconds, watch_settle_seconds)
+		except KeyboardInterrupt:
+			watching = False
+			if not (db_update or (webhook_url and support_profs)):
+				break
+			print("Publishing the final summary")
+		append_logs = True
+
+	if not args.watch:
+		input("Press Enter to exit...")
\ No newline at end of file
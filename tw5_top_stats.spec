@@ -5,7 +5,7 @@ a = Analysis(
     ['tw5_top_stats.py'],
     pathex=[],
     binaries=[],
-    datas=[],
+    datas=[('elite_iInsights_log_schema.json', '.')],
     hiddenimports=[],
     hookspath=[],
     hooksconfig={},